@@ -1 +1,12 @@
-from . import agent
\ No newline at end of file
+import os
+import sys
+
+# The agent modules import the shared helpers as top-level modules (tools_common,
+# metrics, ...) and supabase_client from the project root. Add both directories
+# once, here, instead of appending to sys.path from every module on each import.
+_HERE = os.path.dirname(os.path.abspath(__file__))
+for _path in (_HERE, os.path.dirname(_HERE)):
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+from . import agent
@@ -1,11 +1,18 @@
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
-from google.adk.events import Event
-from typing import AsyncGenerator
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing import Any, AsyncGenerator, Optional
 from typing_extensions import override
-from .sub_agents.authenticator_agent.agent import authenticator_agent
-from .sub_agents.orchestrator_agent.agent import orchestrator_agent
-from .sub_agents.fallback_agent.agent import fallback_agent
+import os
+import time
+from fast_router import KeywordRouter, GREETING, PLANNING_AGENT
+from supabase_client import run_db_call, load_env
+from outbox import write_behind_enabled, get_outbox
+from metrics import start_turn, end_turn, timed_agent, count_llm_call, incr, get_logger
+from loop_watchdog import ensure_watchdog
+
+log = get_logger("manager")
 
 class ManagerAgent(BaseAgent):
     """
@@ -13,19 +20,123 @@ class ManagerAgent(BaseAgent):
     session state by routing them based on their authentication status.
     It is simple, robust, and doesn't handle any specific tasks itself.
     """
-    authenticator_agent: BaseAgent
+    # Sub-agents are built on first use (see the _authenticator/_orchestrator/
+    # _fallback helpers), so importing root_agent doesn't construct every
+    # LlmAgent and tool dependency up front. Passing them in skips that.
+    authenticator_agent: Optional[BaseAgent] = None
     
-    fallback_agent: BaseAgent
-    orchestrator_agent: BaseAgent
+    fallback_agent: Optional[BaseAgent] = None
+    orchestrator_agent: Optional[BaseAgent] = None
+    # Optional deterministic router tried before the orchestrator's LLM call.
+    # Anything with a route(text) -> RouteDecision method can be plugged in.
+    pre_router: Optional[Any] = None
+    # Rule-based extraction of trip details ahead of planning_and_booking_agent.
+    trip_prefill: bool = True
 
-    def __init__(self, name: str):
+    def __init__(
+        self,
+        name: str,
+        pre_router: Optional[Any] = None,
+        authenticator_agent: Optional[BaseAgent] = None,
+        orchestrator_agent: Optional[BaseAgent] = None,
+        fallback_agent: Optional[BaseAgent] = None,
+    ):
+        if pre_router is None and os.environ.get("FAST_ROUTER", "1") != "0":
+            pre_router = KeywordRouter()
+        if write_behind_enabled():
+            # Start the outbox flusher now so rows journaled before a restart are replayed.
+            get_outbox()
         super().__init__(
             name=name,
             authenticator_agent=authenticator_agent,
-            orchestrator_agent= orchestrator_agent,
+            orchestrator_agent=orchestrator_agent,
             fallback_agent=fallback_agent,
+            pre_router=pre_router,
+            trip_prefill=os.environ.get("TRIP_PREFILL", "1") != "0",
         )
 
+    # --- Lazy sub-agents ---
+
+    def _authenticator(self) -> BaseAgent:
+        if self.authenticator_agent is None:
+            load_env()
+            from .sub_agents.authenticator_agent.agent import authenticator_agent
+            self.authenticator_agent = authenticator_agent
+        return self.authenticator_agent
+
+    def _orchestrator(self) -> BaseAgent:
+        if self.orchestrator_agent is None:
+            load_env()
+            from .sub_agents.orchestrator_agent.agent import orchestrator_agent
+            self.orchestrator_agent = orchestrator_agent
+        return self.orchestrator_agent
+
+    def _fallback(self) -> BaseAgent:
+        if self.fallback_agent is None:
+            load_env()
+            from .sub_agents.fallback_agent.agent import fallback_agent
+            self.fallback_agent = fallback_agent
+        return self.fallback_agent
+
+    def _user_text(self, ctx: InvocationContext) -> str:
+        content = ctx.user_content
+        if not content or not content.parts:
+            return ""
+        return " ".join(part.text for part in content.parts if part.text)
+
+    def _reply(self, ctx: InvocationContext, text: Optional[str] = None, state_delta: Optional[dict] = None) -> Event:
+        """An event authored by the manager itself: a templated reply and/or a state update."""
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]) if text else None,
+            actions=EventActions(state_delta=state_delta or {}),
+        )
+
+    async def _run_timed(self, agent: BaseAgent, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """Runs a sub-agent, timing the whole run and counting its LLM responses."""
+        with timed_agent(agent.name):
+            async for event in agent.run_async(ctx):
+                if event.content and event.content.role == "model" and not event.partial and event.author != self.name:
+                    count_llm_call(event.author)
+                yield event
+
+    async def _run_orchestrated(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """
+        Runs an authenticated turn. The pre-router answers greetings itself and
+        sends clear-cut requests straight to the specialist; everything else
+        goes through the orchestrator's LLM delegation as before.
+        Turns routed to the planner first go through the rule-based trip
+        extractor, which saves the details to state and answers details-only
+        messages itself. Other turns leave trip state alone.
+        """
+        started = time.perf_counter()
+        text = self._user_text(ctx)
+        decision = self.pre_router.route(text) if self.pre_router else None
+        route = decision.route if decision else None
+        reply = decision.reply if route == GREETING else None
+        state_delta = {}
+
+        if route == PLANNING_AGENT and self.trip_prefill:
+            from trip_extractor import prefill_turn
+            prefill = await run_db_call(prefill_turn, text, dict(ctx.session.state))
+            state_delta = prefill.state_delta
+            reply = prefill.reply
+
+        if reply:
+            # One manager event carries the templated answer and any extracted details.
+            yield self._reply(ctx, text=reply, state_delta=state_delta)
+        else:
+            if state_delta:
+                yield self._reply(ctx, state_delta=state_delta)
+            agent = self._orchestrator().find_sub_agent(route) if route else self._orchestrator()
+            async for event in self._run_timed(agent, ctx):
+                yield event
+
+        if self.pre_router:
+            self.pre_router.observe_turn(bool(reply or route), time.perf_counter() - started)
+
     @override
     async def _run_async_impl(
         self, ctx: InvocationContext
@@ -34,17 +145,24 @@ class ManagerAgent(BaseAgent):
         Directs the entire conversation based on a single, critical piece of state:
         'user_authenticated'.
         """
+        # LOOP_WATCHDOG=1: report anything that blocks this event loop.
+        ensure_watchdog()
+        turn = start_turn(ctx.session.id)
         try:
-            if not ctx.session.state.get("user_authenticated"):
-                async for event in self.authenticator_agent.run_async(ctx):
-                    yield event
-            else:
-                async for event in self.orchestrator_agent.run_async(ctx):
-                    yield event
+            try:
+                if not ctx.session.state.get("user_authenticated"):
+                    async for event in self._run_timed(self._authenticator(), ctx):
+                        yield event
+                else:
+                    async for event in self._run_orchestrated(ctx):
+                        yield event
 
-        except Exception as e:
-            print(f"!! FALLBACK TRIGGERED !! An error occurred in the top-level Manager. Error: {e}")
-            async for event in self.fallback_agent.run_async(ctx):
-                yield event
+            except Exception as e:
+                log.error(f"!! FALLBACK TRIGGERED !! An error occurred in the top-level Manager. Error: {e}")
+                incr("fallbacks", self.name)
+                async for event in self._run_timed(self._fallback(), ctx):
+                    yield event
+        finally:
+            end_turn(turn)
 
 root_agent = ManagerAgent(name="ManagerAgent")
\ No newline at end of file
@@ -0,0 +1,245 @@
+# File: booking_commit.py
+# One-round-trip, idempotent booking commit. confirm_booking used to look up the
+# hotel, look up the transport and then insert, with a random confirmation number
+# each time, so an LLM retry created a second booking. Now a single call to the
+# commit_booking database function (sql/commit_booking.sql) validates the IDs and
+# inserts, keyed by an idempotency key; a retry gets the original booking back.
+# A SQLite backend implements the same function locally for tests and benchmarks.
+# With WRITE_BEHIND=1 the booking is journaled to the outbox instead (see outbox.py).
+
+import abc
+import base64
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from supabase_client import get_supabase_client, report_supabase_success, report_supabase_failure
+from catalog_snapshot import active_snapshot
+from catalog_cache import catalog_cache, make_key
+from metrics import timed_db, get_logger
+from outbox import write_behind_enabled, get_outbox, BOOKINGS
+
+log = get_logger("booking")
+
+
+def booking_key(session_id: str, user_contact: str, hotel_id: str, transport_id: Optional[str] = None) -> str:
+    """The idempotency key for one booking: the same session, user and selections always map to the same key."""
+    raw = "|".join([session_id or "", user_contact or "", str(hotel_id or ""), str(transport_id or "")])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def confirmation_number_for(key: str) -> str:
+    """A deterministic, human-friendly confirmation number, e.g. 'TRV-7QK2M4XA'."""
+    digest = hashlib.sha256(("confirmation|" + key).encode("utf-8")).digest()
+    return "TRV-" + base64.b32encode(digest).decode("ascii")[:8]
+
+
+class BookingBackend(abc.ABC):
+    """
+    Interface for committing a booking. Returns the commit_booking result:
+    {"status": "success", "confirmation_number", "hotel_name", "transport_info", "replayed"}
+    or {"status": "error", "error_message"}.
+    """
+
+    @abc.abstractmethod
+    def commit(self, key: str, confirmation_number: str, user_contact: str,
+               hotel_id: str, transport_id: Optional[str] = None) -> Dict[str, Any]:
+        ...
+
+
+class SupabaseBookingBackend(BookingBackend):
+    """Calls the commit_booking Postgres function through PostgREST (one round trip)."""
+
+    def commit(self, key, confirmation_number, user_contact, hotel_id, transport_id=None):
+        db = get_supabase_client()
+        if not db:
+            return {"status": "error", "error_message": "Database connection is not available."}
+        try:
+            with timed_db('bookings'):
+                response = db.rpc("commit_booking", {
+                    "p_idempotency_key": key,
+                    "p_confirmation_number": confirmation_number,
+                    "p_user_contact": user_contact,
+                    "p_hotel_id": hotel_id,
+                    "p_transport_id": transport_id,
+                }).execute()
+        except Exception as e:
+            report_supabase_failure(e)
+            raise
+        report_supabase_success()
+        return response.data or {"status": "error", "error_message": "The booking service returned no result."}
+
+
+class SqliteBookingBackend(BookingBackend):
+    """
+    Local stand-in for commit_booking with the same schema and semantics.
+    Seed it with seed_catalog() before booking.
+    """
+
+    SCHEMA = """
+        create table if not exists hotels (id text primary key, name text not null);
+        create table if not exists transport_options (id text primary key, provider text, mode text);
+        create table if not exists bookings (
+            id integer primary key autoincrement,
+            idempotency_key text unique,
+            confirmation_number text unique not null,
+            user_contact text not null,
+            booked_hotel_id text not null references hotels(id),
+            booked_transport_id text references transport_options(id),
+            created_at text default current_timestamp not null
+        );
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.executescript(self.SCHEMA)
+
+    def seed_catalog(self, hotels: Iterable[Dict[str, Any]] = (), transport: Iterable[Dict[str, Any]] = ()) -> None:
+        with self._lock:
+            self._conn.executemany("insert or replace into hotels (id, name) values (:id, :name)", list(hotels))
+            self._conn.executemany(
+                "insert or replace into transport_options (id, provider, mode) values (:id, :provider, :mode)",
+                list(transport),
+            )
+
+    def commit(self, key, confirmation_number, user_contact, hotel_id, transport_id=None):
+        with self._lock, timed_db('bookings'):
+            cur = self._conn.cursor()
+            cur.execute("begin immediate")
+            try:
+                hotel = cur.execute("select name from hotels where id = ?", (hotel_id,)).fetchone()
+                if not hotel:
+                    cur.execute("rollback")
+                    return {"status": "error", "error_message": f"Could not find the selected hotel with ID {hotel_id}."}
+                transport_info = "Not included"
+                if transport_id:
+                    row = cur.execute("select provider, mode from transport_options where id = ?", (transport_id,)).fetchone()
+                    if not row:
+                        cur.execute("rollback")
+                        return {"status": "error", "error_message": f"Could not find the selected transport with ID {transport_id}."}
+                    transport_info = f"{row[0]} ({row[1]})"
+                cur.execute(
+                    "insert into bookings (idempotency_key, confirmation_number, user_contact, booked_hotel_id, booked_transport_id) "
+                    "values (?, ?, ?, ?, ?) on conflict (idempotency_key) do nothing",
+                    (key, confirmation_number, user_contact, hotel_id, transport_id),
+                )
+                replayed = cur.rowcount == 0
+                stored = cur.execute("select confirmation_number from bookings where idempotency_key = ?", (key,)).fetchone()
+                cur.execute("commit")
+            except Exception:
+                cur.execute("rollback")
+                raise
+        return {
+            "status": "success",
+            "confirmation_number": stored[0],
+            "hotel_name": hotel[0],
+            "transport_info": transport_info,
+            "replayed": replayed,
+        }
+
+    def booking_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("select count(*) from bookings").fetchone()[0]
+
+
+# --- Backend selection ---
+# BOOKING_SQLITE_PATH  commit bookings to a local SQLite file instead of Supabase
+
+_backend: Optional[BookingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def set_booking_backend(backend: Optional[BookingBackend]) -> None:
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def get_booking_backend() -> BookingBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = os.environ.get("BOOKING_SQLITE_PATH")
+            _backend = SqliteBookingBackend(path) if path else SupabaseBookingBackend()
+        return _backend
+
+
+CATALOG_ROW_COLUMNS = {"hotels": "id, name", "transport_options": "id, provider, mode"}
+
+
+def _fetch_catalog_row(table: str, row_id: str) -> Optional[Dict[str, Any]]:
+    db = get_supabase_client()
+    if not db:
+        raise RuntimeError("Database connection is not available.")
+    with timed_db(table):
+        response = db.table(table).select(CATALOG_ROW_COLUMNS[table]).eq('id', row_id).limit(1).execute()
+    report_supabase_success()
+    return (response.data or [None])[0]
+
+
+def _catalog_row(table: str, row_id: str) -> Optional[Dict[str, Any]]:
+    """
+    The catalog row for an ID, from the snapshot when one is loaded, else a
+    cached (guarded) lookup by primary key. Raises if the catalog can't be read.
+    """
+    snapshot = active_snapshot()
+    if snapshot:
+        return snapshot.row(table, row_id)
+    return catalog_cache.get_or_load(table, make_key(id=row_id), lambda: _fetch_catalog_row(table, row_id))
+
+
+def _journal_booking(key: str, confirmation_number: str, user_contact: str,
+                     hotel_id: str, transport_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Write-behind path: validates the IDs against the catalog, journals the row
+    and returns at once. The flusher upserts it on idempotency_key. If the
+    catalog can't be read the row is still journaled, but the result says the
+    booking is pending rather than confirmed, since the flusher may reject it.
+    """
+    try:
+        hotel = _catalog_row('hotels', hotel_id)
+        transport = _catalog_row('transport_options', transport_id) if transport_id else None
+        verified = True
+    except Exception as e:
+        log.error(f"Could not validate booking {key[:12]}… against the catalog ({e}); journaling it as pending")
+        report_supabase_failure(e)
+        hotel, transport, verified = None, None, False
+    if verified and not hotel:
+        return {"status": "error", "error_message": f"Could not find the selected hotel with ID {hotel_id}."}
+    if verified and transport_id and not transport:
+        return {"status": "error", "error_message": f"Could not find the selected transport with ID {transport_id}."}
+
+    is_new = get_outbox().enqueue(BOOKINGS, key, {
+        "idempotency_key": key,
+        "confirmation_number": confirmation_number,
+        "user_contact": user_contact,
+        "booked_hotel_id": hotel_id,
+        "booked_transport_id": transport_id,
+    })
+    if transport:
+        transport_info = f"{transport['provider']} ({transport['mode']})"
+    else:
+        transport_info = f"Transport {transport_id}" if transport_id else "Not included"
+    return {
+        "status": "success",
+        "confirmation_number": confirmation_number,
+        "hotel_name": hotel['name'] if hotel else f"Hotel {hotel_id}",
+        "transport_info": transport_info,
+        "replayed": not is_new,
+        "queued": True,
+        "pending": not verified,
+    }
+
+
+def commit_booking(session_id: str, user_contact: str, hotel_id: str, transport_id: Optional[str] = None) -> Dict[str, Any]:
+    """Commits a booking idempotently and returns the commit_booking result."""
+    key = booking_key(session_id, user_contact, hotel_id, transport_id)
+    if write_behind_enabled():
+        return _journal_booking(key, confirmation_number_for(key), user_contact, hotel_id, transport_id)
+    result = get_booking_backend().commit(key, confirmation_number_for(key), user_contact, hotel_id, transport_id)
+    if result.get("replayed"):
+        log.info(f"Booking retry for key {key[:12]}… returned the original confirmation {result.get('confirmation_number')}")
+    return result
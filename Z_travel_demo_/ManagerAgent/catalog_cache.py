@@ -0,0 +1,166 @@
+# File: catalog_cache.py
+# In-process cache for the read-only catalog tables (hotels, transport, attractions, ...).
+# The catalog changes rarely, so repeated searches for popular cities are served
+# from memory instead of paying a PostgREST round trip on every turn. Expired
+# entries are kept until evicted: while the database is unavailable, the last
+# known answer (up to CATALOG_STALE_MAX_SECONDS past expiry, default 3600) is
+# served instead of an error.
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import incr, get_logger
+from db_resilience import guarded_read
+
+log = get_logger("cache")
+
+# Default time-to-live (seconds) per table. Override with CATALOG_CACHE_TTL_<TABLE>.
+DEFAULT_TTLS = {
+    "hotels": 600,
+    "transport_options": 300,
+    "attractions": 3600,
+    "destination_details": 86400,
+    "emergency_contacts": 86400,
+    "locations": 3600,
+}
+
+
+def make_key(**params: Any) -> Tuple:
+    """
+    Builds a cache key from tool parameters. Strings are lowercased and
+    whitespace-collapsed and lists are sorted, so "Udaipur " and "udaipur"
+    or ["Nature", "history"] and ["History", "nature"] share one entry.
+    """
+    def norm(value: Any) -> Hashable:
+        if value is None:
+            return ""
+        if isinstance(value, str):
+            return " ".join(value.lower().split())
+        if isinstance(value, (list, tuple, set)):
+            return tuple(sorted(norm(v) for v in value))
+        return value
+    return tuple(sorted((name, norm(value)) for name, value in params.items()))
+
+
+class TTLCache:
+    """
+    A bounded LRU cache whose entries expire after a per-table TTL.
+    Thread-safe, because the async tools run their lookups on a worker pool.
+    """
+
+    def __init__(self, max_entries: int = 512, ttls: Optional[Dict[str, float]] = None,
+                 guard: Optional[Callable[[str, Callable[[], Any]], Any]] = None):
+        self.max_entries = max_entries
+        # Optional wrapper for loads: guard(table, loader) -> value.
+        self.guard = guard
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self._entries: "OrderedDict[Tuple[str, Tuple], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+
+    def ttl_for(self, table: str) -> float:
+        env_ttl = os.environ.get(f"CATALOG_CACHE_TTL_{table.upper()}")
+        if env_ttl is not None:
+            return float(env_ttl)
+        return self.ttls.get(table, 300)
+
+    def get(self, table: str, key: Tuple) -> Tuple[bool, Any]:
+        """Returns (found, value). Callers get a copy they are free to mutate."""
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end((table, key))
+                self.hits[table] = self.hits.get(table, 0) + 1
+                return True, copy.deepcopy(entry[1])
+            self.misses[table] = self.misses.get(table, 0) + 1
+            return False, None
+
+    def get_stale(self, table: str, key: Tuple, max_age: float) -> Tuple[bool, Any]:
+        """Like get(), but also returns an entry that expired at most max_age seconds ago."""
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                return True, copy.deepcopy(entry[1])
+            return False, None
+
+    def put(self, table: str, key: Tuple, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_for(table)
+        with self._lock:
+            self._entries[(table, key)] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end((table, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, table: str, key: Tuple, loader: Callable[[], Any]) -> Any:
+        """Serves from memory when possible, otherwise calls loader() and caches its result."""
+        found, value = self.get(table, key)
+        if found:
+            return value
+        if self.guard is None:
+            value = loader()
+        else:
+            try:
+                value = self.guard(table, loader)
+            except Exception as e:
+                found, value = self.get_stale(table, key, float(os.environ.get("CATALOG_STALE_MAX_SECONDS", "3600")))
+                if not found:
+                    raise
+                incr("cache_stale_served", table)
+                log.info(f"CACHE: serving a stale {table} entry ({e})")
+                return value
+        self.put(table, key, value)
+        return copy.deepcopy(value)
+
+    def invalidate(self, table: Optional[str] = None) -> int:
+        """Drops every entry for one table, or the whole cache. Returns how many were removed."""
+        with self._lock:
+            if table is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            stale = [k for k in self._entries if k[0] == table]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tables = set(self.hits) | set(self.misses)
+            per_table = {}
+            for table in sorted(tables):
+                hits, misses = self.hits.get(table, 0), self.misses.get(table, 0)
+                per_table[table] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "tables": per_table,
+            }
+
+
+# The single cache shared by every catalog tool in this process.
+# Its loads go through db_resilience (deadline, hedging, circuit breaker).
+catalog_cache = TTLCache(max_entries=int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", "512")), guard=guarded_read)
+
+
+def invalidate_catalog(table: Optional[str] = None) -> int:
+    """Call this after the catalog tables are updated so the next search re-reads them."""
+    removed = catalog_cache.invalidate(table)
+    log.info(f"CACHE: invalidated {removed} entries for {table or 'all tables'}")
+    return removed
+
+
+def catalog_cache_stats() -> Dict[str, Any]:
+    return catalog_cache.stats()
@@ -0,0 +1,227 @@
+# File: catalog_snapshot.py
+# Optional local snapshot of the hotels, transport_options and attractions tables.
+# When CATALOG_SNAPSHOT=1, the tables are loaded once into in-memory indexes and
+# kept fresh in the background, so searches are answered without a PostgREST
+# round trip and keep working through database latency spikes.
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase_client import get_supabase_client
+from metrics import get_logger, timed_db
+
+log = get_logger("snapshot")
+
+SNAPSHOT_TABLES = ("hotels", "transport_options", "attractions")
+PAGE_SIZE = 1000
+
+
+def _norm(value: Any) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+class CatalogSnapshot:
+    """
+    Holds every row of the snapshot tables plus the lookup indexes the search
+    tools need. Indexes are rebuilt as a whole and swapped in under a lock, so
+    readers always see a consistent view.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[Any, Dict[str, Any]]] = {t: {} for t in SNAPSHOT_TABLES}
+        self._watermarks: Dict[str, Optional[str]] = {t: None for t in SNAPSHOT_TABLES}
+        # (location, category) -> hotels sorted by rating, best first
+        self._hotels_by_location_category: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        # (origin, destination) -> transport rows
+        self._transport_by_route: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        # location -> attractions
+        self._attractions_by_location: Dict[str, List[Dict[str, Any]]] = {}
+        self.loaded = False
+        self.last_refresh: float = 0.0
+        self.last_full_load: float = 0.0
+
+    # --- Loading ---
+
+    def _fetch_all(self, db, table: str, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows, start = [], 0
+        while True:
+            query = db.table(table).select('*')
+            if since:
+                query = query.gt('updated_at', since)
+            with timed_db(table):
+                page = query.order('id').range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    def load(self) -> None:
+        """Full reload of every snapshot table. Also picks up deleted rows."""
+        db = get_supabase_client()
+        if not db:
+            raise RuntimeError("Database connection is not available.")
+        fresh = {table: {row['id']: row for row in self._fetch_all(db, table)} for table in SNAPSHOT_TABLES}
+        with self._lock:
+            self._rows = fresh
+            self._watermarks = {t: self._max_updated_at(fresh[t].values()) for t in SNAPSHOT_TABLES}
+            self._rebuild_indexes()
+            self.loaded = True
+            self.last_refresh = self.last_full_load = time.monotonic()
+        log.info(f"SNAPSHOT: loaded {', '.join(f'{len(fresh[t])} {t}' for t in SNAPSHOT_TABLES)}")
+    def refresh(self) -> int:
+        """
+        Incremental refresh: only rows whose updated_at is newer than the last
+        one seen are fetched. Tables without an updated_at column are reloaded fully.
+        Returns the number of rows that changed.
+        """
+        if not self.loaded:
+            self.load()
+            return sum(len(rows) for rows in self._rows.values())
+
+        db = get_supabase_client()
+        if not db:
+            raise RuntimeError("Database connection is not available.")
+        changed: Dict[str, List[Dict[str, Any]]] = {}
+        reloaded: Dict[str, List[Dict[str, Any]]] = {}
+        for table in SNAPSHOT_TABLES:
+            since = self._watermarks.get(table)
+            if since is None:
+                # No updated_at column seen on this table, so there is nothing to diff against.
+                reloaded[table] = self._fetch_all(db, table)
+            else:
+                changed[table] = self._fetch_all(db, table, since=since)
+
+        with self._lock:
+            count = 0
+            for table, rows in reloaded.items():
+                self._rows[table] = {row['id']: row for row in rows}
+                count += len(rows)
+            for table, rows in changed.items():
+                for row in rows:
+                    self._rows[table][row['id']] = row
+                count += len(rows)
+                newest = self._max_updated_at(rows)
+                if newest:
+                    self._watermarks[table] = newest
+            if count:
+                self._rebuild_indexes()
+            self.last_refresh = time.monotonic()
+        return count
+
+    @staticmethod
+    def _max_updated_at(rows) -> Optional[str]:
+        # ISO-8601 timestamps from PostgREST sort correctly as strings.
+        stamps = [row.get('updated_at') for row in rows if row.get('updated_at')]
+        return max(stamps) if stamps else None
+
+    def _rebuild_indexes(self) -> None:
+        hotels: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for row in self._rows["hotels"].values():
+            hotels.setdefault((_norm(row.get('location')), _norm(row.get('category'))), []).append(row)
+        for rows in hotels.values():
+            rows.sort(key=lambda r: r.get('rating') or 0, reverse=True)
+
+        transport: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for row in self._rows["transport_options"].values():
+            transport.setdefault((_norm(row.get('origin')), _norm(row.get('destination'))), []).append(row)
+
+        attractions: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self._rows["attractions"].values():
+            attractions.setdefault(_norm(row.get('location')), []).append(row)
+
+        self._hotels_by_location_category = hotels
+        self._transport_by_route = transport
+        self._attractions_by_location = attractions
+
+    # --- Lookups (None means "not in the snapshot, ask the database") ---
+
+    def hotels(self, destination: str, category: str, limit: int = 3) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._hotels_by_location_category.get((_norm(destination), _norm(category)))
+        if not rows:
+            return None
+        return [dict(r) for r in rows[:limit]]
+
+    def transport(self, origin: str, destination: str, mode: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._transport_by_route.get((_norm(origin), _norm(destination)))
+        if not rows:
+            return None
+        if mode:
+            rows = [r for r in rows if _norm(r.get('mode')) == _norm(mode)]
+        return [dict(r) for r in rows]
+
+    def attractions(self, destination: str, interests: Optional[List[str]] = None, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._attractions_by_location.get(_norm(destination))
+        if not rows:
+            return None
+        if interests:
+            wanted = {_norm(i) for i in interests}
+            rows = [r for r in rows if _norm(r.get('type')) in wanted]
+        return [{"name": r.get('name'), "type": r.get('type'), "summary": r.get('summary')} for r in rows[:limit]]
+
+    def row(self, table: str, row_id: Any) -> Optional[Dict[str, Any]]:
+        """A single row by primary key, e.g. to name a hotel without a query."""
+        with self._lock:
+            row = self._rows.get(table, {}).get(row_id)
+        return dict(row) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "rows": {t: len(self._rows[t]) for t in SNAPSHOT_TABLES},
+                "seconds_since_refresh": round(time.monotonic() - self.last_refresh, 1) if self.loaded else None,
+            }
+
+
+# --- Snapshot mode ---
+# CATALOG_SNAPSHOT=1                  turn the mode on
+# CATALOG_SNAPSHOT_REFRESH_SECONDS    incremental refresh interval (default 60)
+# CATALOG_SNAPSHOT_RELOAD_SECONDS     full reload interval, to pick up deletes (default 3600)
+
+catalog_snapshot = CatalogSnapshot()
+_refresher: Optional[threading.Thread] = None
+_start_lock = threading.Lock()
+
+
+def _refresh_loop() -> None:
+    refresh_every = float(os.environ.get("CATALOG_SNAPSHOT_REFRESH_SECONDS", "60"))
+    reload_every = float(os.environ.get("CATALOG_SNAPSHOT_RELOAD_SECONDS", "3600"))
+    while True:
+        try:
+            if not catalog_snapshot.loaded or time.monotonic() - catalog_snapshot.last_full_load >= reload_every:
+                catalog_snapshot.load()
+            else:
+                changed = catalog_snapshot.refresh()
+                if changed:
+                    log.info(f"SNAPSHOT: refreshed {changed} changed rows")
+        except Exception as e:
+            # Keep serving the last good snapshot; the next tick will try again.
+            log.error(f"SNAPSHOT: refresh failed: {e}")
+        time.sleep(refresh_every)
+
+
+def snapshot_enabled() -> bool:
+    return os.environ.get("CATALOG_SNAPSHOT", "0").lower() in ("1", "true", "yes")
+
+
+def active_snapshot() -> Optional[CatalogSnapshot]:
+    """
+    Returns the snapshot when snapshot mode is on, starting the background
+    loader on first use. Until the first load completes, tools fall back to
+    the database, so the first request is never blocked on a full table scan.
+    """
+    global _refresher
+    if not snapshot_enabled():
+        return None
+    if _refresher is None:
+        with _start_lock:
+            if _refresher is None:
+                _refresher = threading.Thread(target=_refresh_loop, name="catalog-snapshot", daemon=True)
+                _refresher.start()
+    return catalog_snapshot if catalog_snapshot.loaded else None
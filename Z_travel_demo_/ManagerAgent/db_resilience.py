@@ -0,0 +1,172 @@
+# File: db_resilience.py
+# Guards the catalog reads (never writes) against a slow or failing PostgREST:
+#   - every read has a deadline instead of waiting for the client's read timeout;
+#   - a read still running after the table's recent p95 latency gets a second,
+#     identical request (a hedge); whichever answers first wins;
+#   - a circuit breaker opens after consecutive failures and then fails fast
+#     with DatabaseUnavailable, so callers can serve cached or snapshot data
+#     instead of queueing behind a sick database. After a cool-down one trial
+#     read is let through (half-open); its outcome closes or re-opens the breaker.
+# Hedges, wins, deadline misses and breaker state are recorded in the metrics registry.
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Optional
+
+from supabase_client import is_api_error
+from metrics import incr, set_gauge, percentile, get_logger
+
+log = get_logger("resilience")
+
+# DB_READ_DEADLINE_MS        give up on a catalog read after this long (default 3000)
+# DB_HEDGE=0                 never send hedged reads
+# DB_HEDGE_MIN_MS            earliest a hedge is sent (default 50); the delay is the
+#                            table's p95 read latency, capped at half the deadline
+# DB_HEDGE_POOL_SIZE         threads running guarded reads (default 16)
+# DB_BREAKER_FAILURES        consecutive failed reads that open the breaker (default 5)
+# DB_BREAKER_OPEN_SECONDS    how long it stays open before a trial read (default 15)
+
+
+def _setting(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+class DatabaseUnavailable(Exception):
+    """The read was not attempted (breaker open) or didn't finish before its deadline."""
+
+    # report_supabase_failure() skips errors with this flag: the breaker already
+    # accounts for them, and a fail-fast rejection says nothing about the connection.
+    fail_fast = True
+
+
+# --- Circuit breaker ---
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 15.0):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a read may go to the database now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        log.info(f"RESILIENCE: circuit breaker {self.state} -> {state} after {self.failures} failures")
+        self.state = state
+        set_gauge("db_breaker_state", "all", _STATE_GAUGE[state])
+        incr("db_breaker_transitions", state)
+
+
+breaker = CircuitBreaker(
+    failure_threshold=int(_setting("DB_BREAKER_FAILURES", 5)),
+    open_seconds=_setting("DB_BREAKER_OPEN_SECONDS", 15),
+)
+
+
+# --- Guarded reads ---
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    # Separate from the supabase-io pool the tools already run on, so a read
+    # waiting for its own request can never starve that request of a thread.
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=int(_setting("DB_HEDGE_POOL_SIZE", 16)), thread_name_prefix="supabase-read")
+    return _pool
+
+
+def hedge_delay(table: str, deadline: float) -> float:
+    p95 = percentile("db_seconds", table, 0.95)
+    floor = _setting("DB_HEDGE_MIN_MS", 50) / 1000
+    return min(max(p95 if p95 is not None else deadline / 2, floor), deadline / 2)
+
+
+def _submit(loader: Callable[[], Any]) -> Future:
+    # Carry context variables (current turn, tool, ...) into the read thread.
+    return _get_pool().submit(contextvars.copy_context().run, loader)
+
+
+def guarded_read(table: str, loader: Callable[[], Any]) -> Any:
+    """
+    Runs loader() (one idempotent read) under the breaker, a deadline and an
+    optional hedge. Raises DatabaseUnavailable when the breaker is open or the
+    deadline passes, or the loader's own error when every attempt failed.
+    """
+    if not breaker.allow():
+        incr("db_breaker_rejections", table)
+        raise DatabaseUnavailable(f"The travel database is temporarily unavailable (reading {table}). Please try again shortly.")
+
+    deadline = _setting("DB_READ_DEADLINE_MS", 3000) / 1000
+    started = time.monotonic()
+    futures: List[Future] = [_submit(loader)]
+    errors: List[Exception] = []
+
+    done, _ = wait(futures, timeout=hedge_delay(table, deadline))
+    if not done and os.environ.get("DB_HEDGE", "1") != "0" and breaker.state == CLOSED:
+        futures.append(_submit(loader))
+        incr("db_hedges", table)
+
+    pending = set(futures)
+    while pending:
+        remaining = deadline - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is None:
+                breaker.record_success()
+                if len(futures) > 1 and future is futures[1]:
+                    incr("db_hedge_wins", table)
+                return future.result()
+            errors.append(error)
+
+    if errors and all(is_api_error(e) for e in errors) and not pending:
+        # PostgREST answered with an error: the database is up, the query is wrong.
+        breaker.record_success()
+        raise errors[-1]
+    breaker.record_failure()
+    if pending:
+        incr("db_deadline_exceeded", table)
+        raise DatabaseUnavailable(f"The travel database did not answer within {deadline:.1f}s (reading {table}). Please try again shortly.")
+    raise errors[-1]
@@ -0,0 +1,163 @@
+# File: fast_router.py
+# A deterministic pre-router that runs before orchestrator_agent. When the user's
+# message clearly belongs to one specialist (or is just "hi"/"thanks"), we skip
+# the orchestrator's LLM call entirely and hand the turn straight over.
+
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+PLANNING_AGENT = "planning_and_booking_agent"
+INFO_AGENT = "info_agent"
+CONFIRMATION_AGENT = "confirmation_agent"
+GREETING = "greeting"
+
+
+class RouteDecision(NamedTuple):
+    route: Optional[str]       # GREETING, a specialist agent name, or None for "ask the LLM"
+    confidence: float
+    reply: Optional[str] = None
+
+
+# Seeded from the keyword lists in orchestrator_agent's instruction.
+GREETING_PATTERN = re.compile(
+    r"^(hi|hii+|hello|hey|hey there|good (morning|afternoon|evening)|thanks|thank you|thank u|thx|ok thanks|okay thanks)\W*$"
+)
+
+ROUTE_PATTERNS: Dict[str, List[str]] = {
+    CONFIRMATION_AGENT: [
+        r"\b(book|confirm|reserve)\s+(it|that|this|them|both)\b",
+        r"\bgo ahead\b",
+        r"\bfinali[sz]e\b",
+        r"^(yes|yep|sure)?\W*(please\s+)?(confirm|book)( please)?\W*$",
+    ],
+    INFO_AGENT: [
+        r"\bweather\b",
+        r"\bforecast\b",
+        r"\btemperature\b",
+        r"\bemergency\b",
+        r"\b(police|ambulance|helpline)\b",
+        r"\btell me about\b",
+        r"\bflight status\b",
+        r"\bdebug state\b",
+    ],
+    PLANNING_AGENT: [
+        r"\bplan (a|my) trip\b",
+        r"\bfind (me )?(a )?hotels?\b",
+        r"\bhotels?\b",
+        r"\b(search|find|look) (for )?(flights?|trains?|bus(es)?)\b",
+        r"\b(flights?|trains?|bus(es)?)\b",
+        r"\bwhat should i do in\b",
+        r"\bthings to do\b",
+        r"\bpacking( list)?\b",
+        r"\bstart over\b",
+        r"\bitinerary\b",
+        # Bare trip details ("Goa for 3 days, mid-range"); the trip extractor
+        # saves them before the planner runs.
+        r"\b\d+\s*-?\s*(days?|nights?)\b",
+        r"\b(budget|mid[- ]range|luxury|cheap)\b",
+        r"\bfrom [a-z]+ to [a-z]+\b",
+    ],
+}
+
+# "book the second hotel", "confirm the train", "go with the cheaper one": the user
+# is choosing or approving something, so a topic noun in the same message says
+# nothing about which specialist should take it.
+SELECTION_CUES = re.compile(
+    r"\b(book|confirm|reserve|select|choose|pick|take|go with|prefer)\b"
+    r"|\b(first|second|third|fourth|fifth|1st|2nd|3rd|4th|5th|last|cheaper|cheapest) (one|option|hotel|flight|train|bus)\b"
+    r"|\b(option|number|no\.?) ?\d+\b"
+)
+
+GREETING_REPLIES = {
+    "thanks": "You're welcome! Is there anything else I can help with for your trip?",
+    "hello": "Hello again! How can I help with your travel plans?",
+}
+
+
+class KeywordRouter:
+    """
+    Classifies a user message with keyword patterns. A route is only taken when
+    exactly one specialist matches; anything ambiguous goes to the LLM router.
+    Confirmation patterns and selection cues are checked before topic nouns, so
+    "book the second hotel" is never sent to planning on the word "hotel".
+    Counts every decision so we can see how many orchestrator calls it saves.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None, threshold: float = 0.8):
+        self.threshold = threshold
+        self._patterns = {
+            route: [re.compile(p) for p in pats]
+            for route, pats in (patterns or ROUTE_PATTERNS).items()
+        }
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {"turns": 0, "short_circuited": 0, "llm_fallbacks": 0}
+        # Total turn time per path, to estimate the latency each short-circuit saves.
+        self._turn_seconds: Dict[bool, List[float]] = {True: [0.0, 0], False: [0.0, 0]}
+
+    def classify(self, text: str) -> RouteDecision:
+        message = " ".join((text or "").lower().split())
+        if not message:
+            return RouteDecision(None, 0.0)
+
+        if GREETING_PATTERN.match(message):
+            key = "thanks" if message.startswith(("thank", "thx", "ok", "okay")) else "hello"
+            return RouteDecision(GREETING, 1.0, GREETING_REPLIES[key])
+
+        hits = {
+            route: sum(1 for p in pats if p.search(message))
+            for route, pats in self._patterns.items()
+        }
+        matched = {route: n for route, n in hits.items() if n}
+        if hits.get(CONFIRMATION_AGENT):
+            # Approval wins over whatever it approves ("confirm that flight");
+            # approval mixed with a new question still goes to the LLM.
+            if set(matched) - {CONFIRMATION_AGENT, PLANNING_AGENT}:
+                return RouteDecision(None, 0.0)
+            return RouteDecision(CONFIRMATION_AGENT, self._confidence(hits[CONFIRMATION_AGENT]))
+        if SELECTION_CUES.search(message):
+            # Picking one of the offered options needs the conversation to resolve.
+            return RouteDecision(None, 0.0)
+        if len(matched) != 1:
+            # Nothing matched, or several specialists did ("find a hotel and tell me the weather").
+            return RouteDecision(None, 0.0)
+        route, n = next(iter(matched.items()))
+        return RouteDecision(route, self._confidence(n))
+
+    @staticmethod
+    def _confidence(n: int) -> float:
+        # One unambiguous pattern clears the default threshold; more only add certainty.
+        return min(1.0, 0.7 + 0.15 * n)
+
+    def route(self, text: str) -> RouteDecision:
+        """Classifies and records the outcome. Low-confidence decisions come back as route=None."""
+        decision = self.classify(text)
+        with self._lock:
+            self.counters["turns"] += 1
+            if decision.route and decision.confidence >= self.threshold:
+                self.counters["short_circuited"] += 1
+                self.counters[decision.route] = self.counters.get(decision.route, 0) + 1
+            else:
+                self.counters["llm_fallbacks"] += 1
+                decision = RouteDecision(None, decision.confidence)
+        return decision
+
+    def observe_turn(self, short_circuited: bool, seconds: float) -> None:
+        with self._lock:
+            total = self._turn_seconds[short_circuited]
+            total[0] += seconds
+            total[1] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.counters)
+            (fast_total, fast_n), (llm_total, llm_n) = self._turn_seconds[True], self._turn_seconds[False]
+        turns = stats["turns"]
+        # Every short-circuited turn is one orchestrator LLM call we didn't make.
+        stats["llm_calls_saved"] = stats["short_circuited"]
+        stats["short_circuit_rate"] = round(stats["short_circuited"] / turns, 3) if turns else 0.0
+        if fast_n and llm_n:
+            stats["avg_turn_seconds_fast_path"] = round(fast_total / fast_n, 4)
+            stats["avg_turn_seconds_llm_path"] = round(llm_total / llm_n, 4)
+            stats["est_seconds_saved_per_short_circuit"] = round(llm_total / llm_n - fast_total / fast_n, 4)
+        return stats
@@ -0,0 +1,130 @@
+# File: history_compaction.py
+# Caps the conversation history each LlmAgent sends to the model. The last few
+# turns go verbatim; everything older is replaced by one short summary built from
+# session state (trip details, shortlists, selections, booking), which already
+# holds the facts those turns established. A token ceiling bounds the rest.
+# Used as a before_model_callback on the sub-agents.
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from metrics import observe, incr, get_logger
+
+log = get_logger("compaction")
+
+# HISTORY_COMPACTION=0        send the full history, as before
+# HISTORY_KEEP_TURNS          user turns kept verbatim (default 6)
+# HISTORY_TOKEN_CEILING       rough token cap for the kept history (default 3000)
+
+# ADK replays other agents' messages as user content starting with this prefix;
+# they belong to the current turn rather than starting a new one.
+OTHER_AGENT_PREFIX = "For context:"
+
+SUMMARY_FIELDS = (
+    ("user_name", "User"),
+    ("origin", "Origin"),
+    ("destination", "Destination"),
+    ("travel_date", "Travel date"),
+    ("duration_days", "Duration (days)"),
+    ("budget_level", "Budget level"),
+    ("budget_amount", "Budget amount"),
+    ("interests", "Interests"),
+    ("calculated_budget_total", "Estimated budget"),
+    ("hotel_shortlist", "Hotels shown"),
+    ("transport_shortlist", "Transport shown"),
+    ("selected_hotel_id", "Selected hotel"),
+    ("selected_transport_id", "Selected transport"),
+    ("last_booking", "Booked"),
+)
+
+
+def compaction_enabled() -> bool:
+    return os.environ.get("HISTORY_COMPACTION", "1") != "0"
+
+
+def content_tokens(content: types.Content) -> int:
+    """Rough token count of one message (about 4 characters per token)."""
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call:
+            chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+        if part.function_response:
+            chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // 4
+
+
+def _turn_starts(contents: List[types.Content]) -> List[int]:
+    """Indexes of the messages that open a user turn (a real user message, not a tool result)."""
+    starts = []
+    for i, content in enumerate(contents):
+        if content.role != "user" or not content.parts:
+            continue
+        text = " ".join(p.text for p in content.parts if p.text)
+        if text and not text.startswith(OTHER_AGENT_PREFIX):
+            starts.append(i)
+    return starts
+
+
+def state_summary(state: Dict[str, Any]) -> str:
+    lines = []
+    for key, label in SUMMARY_FIELDS:
+        value = state.get(key)
+        if value in (None, "", [], {}):
+            continue
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        lines.append(f"- {label}: {value}")
+    return "\n".join(lines)
+
+
+def compact_contents(contents: List[types.Content], state: Dict[str, Any],
+                     keep_turns: int, token_ceiling: int) -> List[types.Content]:
+    """
+    Keeps the last `keep_turns` user turns (fewer if they exceed the token
+    ceiling, but never less than the current turn) and puts a state summary
+    in front of them when anything was dropped.
+    """
+    starts = _turn_starts(contents)
+    if len(starts) <= keep_turns and sum(content_tokens(c) for c in contents) <= token_ceiling:
+        return contents
+
+    kept_starts = starts[-keep_turns:] if keep_turns > 0 else starts[-1:]
+    cut = kept_starts[0] if kept_starts else 0
+    while len(kept_starts) > 1 and sum(content_tokens(c) for c in contents[cut:]) > token_ceiling:
+        kept_starts = kept_starts[1:]
+        cut = kept_starts[0]
+    if cut == 0:
+        return contents
+
+    summary = state_summary(state)
+    text = "Summary of the earlier conversation (older messages were omitted):\n" + (summary or "- Nothing has been decided yet.")
+    return [types.Content(role="user", parts=[types.Part(text=text)])] + list(contents[cut:])
+
+
+def compact_history(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback: trims llm_request.contents in place and records prompt sizes."""
+    agent = callback_context.agent_name
+    before = sum(content_tokens(c) for c in llm_request.contents)
+    observe("prompt_tokens_uncompacted", agent, before)
+    if compaction_enabled():
+        compacted = compact_contents(
+            llm_request.contents,
+            callback_context.state.to_dict(),
+            keep_turns=int(os.environ.get("HISTORY_KEEP_TURNS", "6")),
+            token_ceiling=int(os.environ.get("HISTORY_TOKEN_CEILING", "3000")),
+        )
+        if compacted is not llm_request.contents:
+            llm_request.contents = compacted
+            incr("history_compactions", agent)
+    after = sum(content_tokens(c) for c in llm_request.contents)
+    observe("prompt_tokens", agent, after)
+    if after < before:
+        log.info(f"COMPACTION: {agent} history {before} -> {after} tokens")
+    return None
@@ -0,0 +1,116 @@
+# File: itinerary_costing.py
+# Prices whole itineraries from catalog rows instead of a flat per-day rate. Each
+# part of a trip (a hotel stay, an outbound leg, a return leg, more legs and stays
+# for multi-city trips) is a Component: candidate rows plus a price per row and a
+# quantity (nights for a stay, 1 for a leg). Every combination of one row per
+# component is priced at once with NumPy broadcasting, then the cheapest ones
+# that fit the budget are picked with argpartition, so tens of thousands of
+# combinations cost a few milliseconds.
+
+import math
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from metrics import observe, get_logger
+
+log = get_logger("costing")
+
+# ITINERARY_MAX_COMBINATIONS     cap on priced combinations (default 1000000); above it
+#                                each component keeps only its cheapest rows
+
+# Food, local travel and entry fees per person per day, on top of stay and legs.
+DAILY_EXPENSES = {"Budget": 1500, "Mid-Range": 3000, "Luxury": 7000}
+
+
+class Component(NamedTuple):
+    name: str
+    rows: List[Dict[str, Any]]
+    price_key: str
+    quantity: int = 1
+
+
+def _price(row: Dict[str, Any], price_key: str) -> Optional[float]:
+    value = row.get(price_key)
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) else None
+
+
+def _priced(component: Component) -> Component:
+    """The component without rows that have no usable price (they are not free)."""
+    rows = [row for row in component.rows if _price(row, component.price_key) is not None]
+    if len(rows) < len(component.rows):
+        log.info(f"COSTING: skipped {len(component.rows) - len(rows)} {component.name} rows without a price")
+    return component._replace(rows=rows)
+
+
+def _prices(component: Component) -> np.ndarray:
+    return np.array([_price(row, component.price_key) for row in component.rows], dtype=np.float64)
+
+
+def _trim(components: List[Component], prices: List[np.ndarray], cap: int) -> List[np.ndarray]:
+    """Index arrays keeping each component's cheapest rows, so the product stays under `cap`."""
+    keep = [np.argsort(p, kind="stable") for p in prices]
+    while int(np.prod([len(k) for k in keep])) > cap:
+        widest = max(range(len(keep)), key=lambda i: len(keep[i]))
+        if len(keep[widest]) <= 1:
+            break
+        keep[widest] = keep[widest][: max(1, len(keep[widest]) // 2)]
+    return keep
+
+
+def rank_itineraries(components: Sequence[Component], budget: Optional[float] = None,
+                     top_k: int = 3, fixed_cost: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    The top_k cheapest combinations (one row per component) whose total is within
+    `budget`, cheapest first. If none fit, or there is no budget, the cheapest
+    overall are returned with `within_budget` set accordingly. `fixed_cost` is
+    added to every total (daily expenses).
+    """
+    components = [c for c in map(_priced, components) if c.rows]
+    if not components:
+        return []
+    started = time.perf_counter()
+
+    prices = [_prices(c) * c.quantity for c in components]
+    cap = int(os.environ.get("ITINERARY_MAX_COMBINATIONS", "1000000"))
+    keep = _trim(components, prices, cap)
+    prices = [p[k] for p, k in zip(prices, keep)]
+
+    # totals[i, j, ...] = prices[0][i] + prices[1][j] + ... + fixed_cost
+    totals = np.full([len(p) for p in prices], fixed_cost, dtype=np.float64)
+    for axis, p in enumerate(prices):
+        shape = [1] * len(prices)
+        shape[axis] = len(p)
+        totals = totals + p.reshape(shape)
+    flat = totals.ravel()
+
+    candidates = np.arange(flat.size)
+    if budget is not None:
+        fitting = np.flatnonzero(flat <= budget)
+        if fitting.size:
+            candidates = fitting
+    k = min(top_k, candidates.size)
+    best = candidates[np.argpartition(flat[candidates], k - 1)[:k]] if k < candidates.size else candidates
+    best = best[np.argsort(flat[best], kind="stable")]
+
+    itineraries = []
+    for choice in zip(*np.unravel_index(best, totals.shape)):
+        total = float(flat[np.ravel_multi_index(choice, totals.shape)])
+        itineraries.append({
+            "total": total,
+            "within_budget": budget is None or total <= budget,
+            "parts": {c.name: c.rows[int(k[i])] for c, k, i in zip(components, keep, choice)},
+        })
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    observe("itinerary_costing_ms", "rank", elapsed_ms)
+    log.info(f"COSTING: ranked {flat.size} combinations in {elapsed_ms:.1f} ms")
+    return itineraries
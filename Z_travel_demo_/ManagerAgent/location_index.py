@@ -0,0 +1,180 @@
+# File: location_index.py
+# Resolves whatever the user typed ("udaipur city", "Bangalore", "Jaipr") to the
+# exact location spelling used in the catalog tables, once, so the search tools
+# can use indexed equality filters instead of ilike guesses that come back empty.
+# Built in memory from the catalog's known locations: normalization first, then
+# known aliases. Typos are matched by trigram similarity (with an edit-distance
+# check) but only offered as suggestions: "Raipur" is a real place that merely
+# looks like "Jaipur", so the user confirms before a correction is applied.
+
+import difflib
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from metrics import incr, get_logger
+
+log = get_logger("locations")
+
+# Words that don't change which place is meant.
+NOISE_WORDS = {"city", "town", "district", "the", "state", "region", "area"}
+
+# Alternate names for the same place. Each group resolves to whichever spelling
+# the catalog actually uses.
+ALIAS_GROUPS: List[Set[str]] = [
+    {"bengaluru", "bangalore", "blr"},
+    {"mumbai", "bombay"},
+    {"kolkata", "calcutta"},
+    {"chennai", "madras"},
+    {"delhi", "new delhi", "ncr"},
+    {"gurugram", "gurgaon"},
+    {"puducherry", "pondicherry", "pondy"},
+    {"thiruvananthapuram", "trivandrum"},
+    {"kochi", "cochin"},
+    {"varanasi", "benares", "banaras", "kashi"},
+    {"mysuru", "mysore"},
+    {"visakhapatnam", "vizag"},
+    {"vadodara", "baroda"},
+    {"pune", "poona"},
+    {"shimla", "simla"},
+    {"ooty", "udhagamandalam", "ootacamund"},
+    {"prayagraj", "allahabad"},
+    {"mangaluru", "mangalore"},
+    {"kozhikode", "calicut"},
+    {"leh", "leh ladakh", "ladakh"},
+]
+
+# LOCATION_FUZZY_THRESHOLD  minimum trigram similarity (0-1) for a typo suggestion (default 0.4)
+# Trigrams miss swapped letters ("udiapur"), so candidates that share any trigram
+# also match if their edit similarity reaches EDIT_SIMILARITY.
+EDIT_SIMILARITY = 0.8
+# Shorter inputs are too ambiguous to guess at ("go" is not Goa).
+MIN_FUZZY_CHARS = 4
+
+
+def normalize_location(text: str) -> str:
+    words = re.findall(r"[a-z]+", (text or "").lower())
+    kept = [w for w in words if w not in NOISE_WORDS]
+    return " ".join(kept or words)
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LocationIndex:
+    """Normalized names, aliases and a trigram index over the catalog's locations."""
+
+    def __init__(self, locations: Iterable[str]):
+        self.canonical: Dict[str, str] = {}
+        for name in locations:
+            if name:
+                self.canonical.setdefault(normalize_location(name), name.strip())
+
+        self.aliases: Dict[str, str] = {}
+        for group in ALIAS_GROUPS:
+            target = next((self.canonical[n] for n in group if n in self.canonical), None)
+            if target:
+                for alias in group:
+                    self.aliases.setdefault(alias, target)
+
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._grams: Dict[str, Set[str]] = {}
+        for norm in self.canonical:
+            grams = _trigrams(norm)
+            self._grams[norm] = grams
+            for gram in grams:
+                self._postings[gram].add(norm)
+
+    def surface_forms(self) -> Dict[str, str]:
+        """Every spelling the index recognizes verbatim, as {lowercase form: catalog name}."""
+        forms = {norm: name for norm, name in self.canonical.items()}
+        forms.update({name.lower(): name for name in self.canonical.values()})
+        forms.update(self.aliases)
+        return forms
+
+    def resolve(self, text: str) -> Optional[str]:
+        """The catalog spelling when `text` names a known location or alias exactly (after normalization)."""
+        norm = normalize_location(text)
+        if norm in self.canonical:
+            return self.canonical[norm]
+        return self.aliases.get(norm)
+
+    def closest(self, text: str, threshold: Optional[float] = None) -> Optional[str]:
+        """The most similar known location, for a "did you mean" question; never applied silently."""
+        norm = normalize_location(text)
+        if len(norm) < MIN_FUZZY_CHARS:
+            return None
+
+        threshold = threshold if threshold is not None else float(os.environ.get("LOCATION_FUZZY_THRESHOLD", "0.4"))
+        grams = _trigrams(norm)
+        overlap: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                overlap[candidate] += 1
+        best, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            jaccard = shared / len(grams | self._grams[candidate])
+            edit = difflib.SequenceMatcher(None, norm, candidate).ratio()
+            # Put both on one scale: passing either bar scores at least 1.
+            score = max(jaccard / threshold, edit / EDIT_SIMILARITY)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= 1.0:
+            return self.canonical[best]
+        return None
+
+
+# --- Shared index ---
+# Rebuilt from known_locations() once the 'locations' catalog entry expires.
+
+_index: Optional[LocationIndex] = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def location_index() -> LocationIndex:
+    global _index, _built_at
+    from catalog_cache import catalog_cache
+    from tools_common import known_locations
+
+    if _index is None or time.monotonic() - _built_at > catalog_cache.ttl_for('locations'):
+        with _lock:
+            if _index is None or time.monotonic() - _built_at > catalog_cache.ttl_for('locations'):
+                _index = LocationIndex(known_locations().values())
+                _built_at = time.monotonic()
+    return _index
+
+
+def resolve_location(text: Optional[str]) -> Optional[str]:
+    """
+    The catalog spelling for a user-supplied place, or None if it isn't a known
+    name or alias (or the catalog can't be read right now).
+    """
+    if not text:
+        return None
+    try:
+        resolved = location_index().resolve(text)
+    except Exception as e:
+        log.error(f"LOCATIONS: could not build the location index: {e}")
+        return None
+    incr("location_resolutions", "hit" if resolved else "miss")
+    return resolved
+
+
+def suggest_location(text: Optional[str]) -> Optional[str]:
+    """A known location that `text` is probably a typo of, or None."""
+    if not text:
+        return None
+    try:
+        suggestion = location_index().closest(text)
+    except Exception as e:
+        log.error(f"LOCATIONS: could not build the location index: {e}")
+        return None
+    if suggestion:
+        incr("location_resolutions", "suggested")
+    return suggestion
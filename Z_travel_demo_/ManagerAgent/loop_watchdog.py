@@ -0,0 +1,160 @@
+# File: loop_watchdog.py
+# Optional event-loop stall detector. A heartbeat task on the loop wakes every
+# few milliseconds and records how late it woke (loop lag). A monitor thread
+# watches the heartbeat; when it hasn't beaten for longer than the threshold,
+# something is blocking the loop, so the thread captures the loop thread's
+# current stack and works out which tool, agent and session it belongs to from
+# the frames' tool_context / callback_context / invocation context. Each stall
+# is logged once as a JSON record and counted in the metrics registry.
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from metrics import observe, incr, set_gauge, get_logger, session_id
+
+log = get_logger("watchdog")
+
+# LOOP_WATCHDOG=1                  turn the watchdog on
+# LOOP_STALL_MS                    a loop blocked longer than this is a stall (default 100)
+# LOOP_WATCHDOG_INTERVAL_MS        heartbeat interval (default 20)
+
+MAX_STACK_FRAMES = 25
+MAX_REPORTS = 100
+
+
+def watchdog_enabled() -> bool:
+    return os.environ.get("LOOP_WATCHDOG", "0").lower() in ("1", "true", "yes")
+
+
+def _stall_context(frame) -> Dict[str, Any]:
+    """Tool, agent and session of the code running in `frame`, read from its callers' locals."""
+    found: Dict[str, Any] = {}
+    while frame is not None and len(found) < 3:
+        names = frame.f_locals
+        for key in ("tool_context", "callback_context"):
+            context = names.get(key)
+            if context is None:
+                continue
+            if key == "tool_context" and "tool" not in found:
+                found["tool"] = frame.f_code.co_name
+            found.setdefault("agent", getattr(context, "agent_name", None))
+            if session_id(context):
+                found.setdefault("session_id", session_id(context))
+        ctx = names.get("ctx")
+        if ctx is not None and hasattr(ctx, "session") and hasattr(ctx, "agent"):
+            found.setdefault("agent", ctx.agent.name)
+            found.setdefault("session_id", ctx.session.id)
+        frame = frame.f_back
+    return found
+
+
+class LoopWatchdog:
+    """Heartbeat task plus monitor thread for one event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, stall_threshold: float = 0.1, interval: float = 0.02):
+        self.loop = loop
+        self.stall_threshold = stall_threshold
+        self.interval = interval
+        self.reports: deque = deque(maxlen=MAX_REPORTS)
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stalled_since: Optional[float] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Must be called from the loop's own thread."""
+        self._task = self.loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        log.info(f"WATCHDOG: watching the event loop (stall threshold {self.stall_threshold * 1000:.0f} ms)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            self._last_beat = now
+            observe("loop_lag_seconds", "all", lag)
+            set_gauge("loop_lag_seconds", "last", round(lag, 6))
+            if self._stalled_since is not None:
+                # The stall is over; record how long it lasted in total.
+                observe("loop_stall_seconds", "all", now - self._stalled_since)
+                self._stalled_since = None
+
+    def _monitor(self) -> None:
+        while not self._stop.wait(self.interval / 2):
+            if self.loop.is_closed():
+                return
+            if not self.loop.is_running():
+                # Between asyncio.run() calls nothing is blocked; don't count the gap.
+                self._last_beat = time.monotonic()
+                continue
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked > self.stall_threshold and self._stalled_since is None:
+                self._stalled_since = self._last_beat + self.interval
+                try:
+                    self._report(blocked)
+                except Exception as e:
+                    log.error(f"WATCHDOG: could not capture the stalled stack: {e}")
+
+    def _report(self, blocked: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        context = _stall_context(frame)
+        stack = traceback.format_list(traceback.extract_stack(frame)[-MAX_STACK_FRAMES:])
+        record = {
+            "event": "loop_stall",
+            "blocked_ms": round(blocked * 1000, 1),
+            "tool": context.get("tool"),
+            "agent": context.get("agent"),
+            "session_id": context.get("session_id"),
+            "at": f"{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}",
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.reports.append(record)
+        incr("loop_stalls", record["tool"] or record["agent"] or "unknown")
+        log.warning("LOOP STALL " + json.dumps(record, default=str))
+
+
+_watchdogs: Dict[int, LoopWatchdog] = {}
+_lock = threading.Lock()
+
+
+def ensure_watchdog() -> Optional[LoopWatchdog]:
+    """Starts the watchdog for the running loop (once per loop) when LOOP_WATCHDOG is on."""
+    if not watchdog_enabled():
+        return None
+    loop = asyncio.get_running_loop()
+    with _lock:
+        watchdog = _watchdogs.get(id(loop))
+        if watchdog is None or watchdog.loop is not loop:
+            watchdog = _watchdogs[id(loop)] = LoopWatchdog(
+                loop,
+                stall_threshold=float(os.environ.get("LOOP_STALL_MS", "100")) / 1000,
+                interval=float(os.environ.get("LOOP_WATCHDOG_INTERVAL_MS", "20")) / 1000,
+            )
+            watchdog.start()
+    return watchdog
+
+
+def stall_reports() -> List[Dict[str, Any]]:
+    """The most recent stall records across all watched loops."""
+    with _lock:
+        watchdogs = list(_watchdogs.values())
+    return [record for watchdog in watchdogs for record in watchdog.reports]
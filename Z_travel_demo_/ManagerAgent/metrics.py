@@ -0,0 +1,277 @@
+# File: metrics.py
+# In-process latency instrumentation for TravelBot. Tools, sub-agent runs and
+# database calls are timed into histograms (p50/p95/p99), with per-turn counts of
+# DB round trips and LLM calls. Everything can be dumped as JSON or Prometheus text.
+# Log output goes through a queue, so the hot path never blocks on stdout.
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# --- Non-blocking logging ---
+# Every "travelbot.*" logger hands records to a queue; a background listener
+# thread does the actual (slow) write to stdout.
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _setup_logging() -> None:
+    global _listener
+    root = logging.getLogger("travelbot")
+    if _listener is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = logging.handlers.QueueListener(_log_queue, stream, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+    root.addHandler(logging.handlers.QueueHandler(_log_queue))
+    root.setLevel(logging.INFO)
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a 'travelbot.<name>' logger that writes through the background queue."""
+    _setup_logging()
+    return logging.getLogger(f"travelbot.{name}")
+
+
+# --- Histograms and counters ---
+
+class Histogram:
+    """Count, sum and a bounded reservoir of recent samples for percentiles."""
+
+    def __init__(self, max_samples: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self.samples: deque = deque(maxlen=max_samples)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": round(self.percentile(0.50), 6),
+            "p95": round(self.percentile(0.95), 6),
+            "p99": round(self.percentile(0.99), 6),
+        }
+
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, str], Histogram] = {}
+_counters: Dict[Tuple[str, str], int] = {}
+_gauges: Dict[Tuple[str, str], float] = {}
+
+
+def observe(metric: str, label: str, value: float) -> None:
+    with _lock:
+        hist = _histograms.get((metric, label))
+        if hist is None:
+            hist = _histograms[(metric, label)] = Histogram()
+        hist.observe(value)
+
+
+def incr(counter: str, label: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[(counter, label)] = _counters.get((counter, label), 0) + amount
+
+
+def set_gauge(gauge: str, label: str, value: float) -> None:
+    with _lock:
+        _gauges[(gauge, label)] = value
+
+
+def percentile(metric: str, label: str, q: float) -> Optional[float]:
+    """A single percentile, or None if nothing has been observed yet."""
+    with _lock:
+        hist = _histograms.get((metric, label))
+        if hist is None or not hist.samples:
+            return None
+        return hist.percentile(q)
+
+
+# --- Per-turn accounting ---
+# The current turn's counters live in a context variable. run_db_call copies the
+# context into worker threads, so DB calls made there are counted too.
+
+_current_turn: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("travelbot_turn", default=None)
+
+
+def session_id(context: Any) -> str:
+    """The session id of an ADK tool or callback context, via its public session accessor."""
+    session = getattr(context, "session", None)
+    return session.id if session is not None else ""
+
+
+def start_turn(session_id: str = "") -> contextvars.Token:
+    return _current_turn.set({"session_id": session_id, "db_calls": 0, "llm_calls": 0, "started": time.perf_counter()})
+
+
+def end_turn(token: contextvars.Token) -> None:
+    turn = _current_turn.get()
+    try:
+        _current_turn.reset(token)
+    except ValueError:
+        # The generator was closed from another context; the turn data is still valid.
+        pass
+    if not turn:
+        return
+    observe("turn_seconds", "all", time.perf_counter() - turn["started"])
+    observe("turn_db_calls", "all", turn["db_calls"])
+    observe("turn_llm_calls", "all", turn["llm_calls"])
+
+
+def count_llm_call(agent_name: str) -> None:
+    incr("llm_calls", agent_name)
+    turn = _current_turn.get()
+    if turn is not None:
+        turn["llm_calls"] += 1
+
+
+@contextmanager
+def timed_db(table: str):
+    """Times one database round trip and counts it against the current turn."""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn["db_calls"] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        incr("db_errors", table)
+        raise
+    finally:
+        observe("db_seconds", table, time.perf_counter() - started)
+
+
+@contextmanager
+def timed_agent(agent_name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        incr("agent_errors", agent_name)
+        raise
+    finally:
+        observe("agent_seconds", agent_name, time.perf_counter() - started)
+
+
+def _record_tool(name: str, started: float, result: Any) -> None:
+    observe("tool_seconds", name, time.perf_counter() - started)
+    incr("tool_calls", name)
+    if isinstance(result, dict) and result.get("status") == "error":
+        incr("tool_errors", name)
+
+
+def instrument_tool(fn: Callable) -> Callable:
+    """
+    Decorator for tool functions (sync or async). Keeps the name, docstring and
+    signature ADK reads, and records wall time, calls and errors per tool.
+    """
+    name = fn.__name__
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = None
+            try:
+                result = await fn(*args, **kwargs)
+                return result
+            except Exception:
+                incr("tool_errors", name)
+                raise
+            finally:
+                _record_tool(name, started, result)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except Exception:
+            incr("tool_errors", name)
+            raise
+        finally:
+            _record_tool(name, started, result)
+    return wrapper
+
+
+# --- Export ---
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Everything recorded so far, as plain dicts."""
+    with _lock:
+        histograms: Dict[str, Dict[str, Any]] = {}
+        for (metric, label), hist in sorted(_histograms.items()):
+            histograms.setdefault(metric, {})[label] = hist.summary()
+        counters: Dict[str, Dict[str, int]] = {}
+        for (counter, label), value in sorted(_counters.items()):
+            counters.setdefault(counter, {})[label] = value
+        gauges: Dict[str, Dict[str, float]] = {}
+        for (gauge, label), value in sorted(_gauges.items()):
+            gauges.setdefault(gauge, {})[label] = value
+    return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+
+def dump_json() -> str:
+    return json.dumps(metrics_snapshot(), indent=2)
+
+
+def dump_prometheus() -> str:
+    """Prometheus text exposition format (summaries with quantiles, counters and gauges)."""
+    snapshot = metrics_snapshot()
+    lines = []
+    for metric, by_label in snapshot["histograms"].items():
+        name = f"travelbot_{metric}"
+        lines.append(f"# TYPE {name} summary")
+        for label, s in by_label.items():
+            for q in ("p50", "p95", "p99"):
+                quantile = {"p50": "0.5", "p95": "0.95", "p99": "0.99"}[q]
+                lines.append(f'{name}{{name="{label}",quantile="{quantile}"}} {s[q]}')
+            lines.append(f'{name}_sum{{name="{label}"}} {s["sum"]}')
+            lines.append(f'{name}_count{{name="{label}"}} {s["count"]}')
+    for counter, by_label in snapshot["counters"].items():
+        name = f"travelbot_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        for label, value in by_label.items():
+            lines.append(f'{name}{{name="{label}"}} {value}')
+    for gauge, by_label in snapshot["gauges"].items():
+        name = f"travelbot_{gauge}"
+        lines.append(f"# TYPE {name} gauge")
+        for label, value in by_label.items():
+            lines.append(f'{name}{{name="{label}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
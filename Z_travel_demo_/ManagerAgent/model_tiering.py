@@ -0,0 +1,150 @@
+# File: model_tiering.py
+# Runs each LlmAgent turn on a fast model and escalates to the agent's heavy model
+# only when the turn needs it: a tool came back with status 'error', the model
+# produced a malformed function call, or the turn looks complex. The agent keeps
+# its heavy model as `model`; select_model swaps llm_request.model per call.
+# Every escalation is logged and counted in the metrics registry.
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+
+from metrics import incr, get_logger, session_id
+
+log = get_logger("tiering")
+
+# MODEL_TIERING=0               always use each agent's heavy model
+# MODEL_FAST_<AGENT_NAME>       override an agent's fast model
+# MODEL_HEAVY_<AGENT_NAME>      override an agent's heavy model
+# MODEL_COMPLEX_WORDS           user messages longer than this are complex (default 60)
+
+# Per-agent policy: (fast, heavy). An agent whose fast and heavy models are the
+# same never switches; agents missing here are left alone.
+TIER_POLICY: Dict[str, Tuple[str, str]] = {
+    "authenticator_agent": ("gemini-1.5-flash", "gemini-1.5-pro"),
+    "planning_and_booking_agent": ("gemini-1.5-flash", "gemini-1.5-pro"),
+    "info_agent": ("gemini-1.5-flash", "gemini-1.5-pro"),
+    "confirmation_agent": ("gemini-1.5-flash", "gemini-1.5-pro"),
+    "fallback_agent": ("gemini-2.5-flash", "gemini-2.5-pro"),
+    "greeting_agent": ("gemini-2.5-flash", "gemini-2.5-pro"),
+}
+
+# Requests with several goals at once ("plan ... and book ...", "compare ...").
+COMPLEX_PATTERNS = re.compile(
+    r"\b(compare|versus|vs\.?|itinerary for|multi[- ]city|day[- ]by[- ]day)\b"
+    r"|\b(plan|find|search|book)\b.*\b(and|then|also)\b.*\b(plan|find|search|book|hotel|flight|train|bus)\b"
+)
+MALFORMED = "MALFORMED_FUNCTION_CALL"
+MAX_TRACKED = 4096
+
+
+def tiering_enabled() -> bool:
+    return os.environ.get("MODEL_TIERING", "1") != "0"
+
+
+def models_for(agent_name: str) -> Optional[Tuple[str, str]]:
+    policy = TIER_POLICY.get(agent_name)
+    if policy is None:
+        return None
+    suffix = agent_name.upper()
+    return (
+        os.environ.get(f"MODEL_FAST_{suffix}", policy[0]),
+        os.environ.get(f"MODEL_HEAVY_{suffix}", policy[1]),
+    )
+
+
+def is_complex_turn(text: str) -> bool:
+    text = (text or "").lower()
+    if len(text.split()) > int(os.environ.get("MODEL_COMPLEX_WORDS", "60")):
+        return True
+    return bool(COMPLEX_PATTERNS.search(text))
+
+
+# --- Escalation bookkeeping ---
+# (session id, agent) -> (invocation id, reason, carry). An escalation holds for
+# the rest of the invocation that raised it; with carry=True (a malformed call
+# ended the turn early) it also covers the session's next turn.
+
+_escalations: "OrderedDict[Tuple[str, str], Tuple[str, str, bool]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def escalate(context: CallbackContext, reason: str, carry: bool = False) -> None:
+    agent = context.agent_name
+    if models_for(agent) is None:
+        return
+    with _lock:
+        _escalations[(session_id(context), agent)] = (context.invocation_id, reason, carry)
+        _escalations.move_to_end((session_id(context), agent))
+        while len(_escalations) > MAX_TRACKED:
+            _escalations.popitem(last=False)
+    incr("model_escalations", f"{agent}:{reason}")
+    log.info(f"TIERING: escalating {agent} to its heavy model ({reason})")
+
+
+def _escalation_reason(context: CallbackContext) -> Optional[str]:
+    key = (session_id(context), context.agent_name)
+    with _lock:
+        entry = _escalations.get(key)
+        if entry is None:
+            return None
+        invocation_id, reason, carry = entry
+        if invocation_id == context.invocation_id:
+            return reason
+        if carry:
+            # First call of the following turn: use it up.
+            _escalations[key] = (context.invocation_id, reason, False)
+            return reason
+        del _escalations[key]
+        return None
+
+
+# --- Callbacks ---
+
+def select_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback: picks the fast or heavy model for this call."""
+    agent = callback_context.agent_name
+    models = models_for(agent)
+    if models is None:
+        return None
+    fast, heavy = models
+    reason = None if tiering_enabled() else "tiering disabled"
+    if reason is None:
+        reason = _escalation_reason(callback_context)
+    if reason is None and (callback_context.state.get("complex_turn") or _is_complex_request(callback_context)):
+        reason = "complex turn"
+        escalate(callback_context, reason)
+    tier = "heavy" if reason else "fast"
+    llm_request.model = heavy if reason else fast
+    incr("model_tier", f"{agent}:{tier}")
+    return None
+
+
+def _is_complex_request(callback_context: CallbackContext) -> bool:
+    content = callback_context.user_content
+    if not content or not content.parts:
+        return False
+    return is_complex_turn(" ".join(part.text for part in content.parts if part.text))
+
+
+def escalate_on_tool_error(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
+                           tool_response: Any) -> Optional[Dict[str, Any]]:
+    """after_tool_callback: a tool error sends the rest of the turn to the heavy model."""
+    if isinstance(tool_response, dict) and tool_response.get("status") == "error":
+        escalate(tool_context, f"tool error in {tool.name}")
+    return None
+
+
+def escalate_on_malformed_call(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """after_model_callback: a malformed function call escalates this turn and the next."""
+    codes = (str(getattr(llm_response, "error_code", "") or ""), str(getattr(llm_response, "finish_reason", "") or ""))
+    if any(MALFORMED in code for code in codes):
+        escalate(callback_context, "malformed function call", carry=True)
+    return None
@@ -0,0 +1,273 @@
+# File: outbox.py
+# Optional write-behind mode for the two writes on the chat path: new users and
+# bookings. With WRITE_BEHIND=1 the tools append the row to a local SQLite journal
+# and answer right away; a background thread drains the journal into Supabase in
+# batched upserts, retrying with backoff. Rows survive a restart and are replayed
+# by the flusher on startup. Both upserts are idempotent (contact / idempotency_key),
+# so a row that is flushed twice never creates a duplicate.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from supabase_client import get_supabase_client, report_supabase_success, report_supabase_failure, is_api_error
+from metrics import timed_db, incr, observe, set_gauge, get_logger
+
+log = get_logger("outbox")
+
+# WRITE_BEHIND=1                 turn the mode on
+# OUTBOX_PATH                    journal file (default data/outbox.sqlite3 in the project root)
+# OUTBOX_BATCH_SIZE              max rows per bulk upsert (default 100)
+# OUTBOX_FLUSH_SECONDS           idle poll interval of the flusher (default 0.5)
+# OUTBOX_MAX_BACKOFF_SECONDS     cap on the retry delay after failures (default 60)
+# OUTBOX_MAX_ATTEMPTS            attempts before a row the database rejects is parked as dead (default 10);
+#                                network and server failures are retried for as long as they last
+
+USERS = "users"
+BOOKINGS = "bookings"
+
+# Outside the package, so the journal is never shipped or imported as code (gitignored).
+DEFAULT_OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "outbox.sqlite3")
+
+
+def write_behind_enabled() -> bool:
+    return os.environ.get("WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+
+
+# Postgres error classes that mean the row itself is bad (22 data exception,
+# 23 integrity constraint violation, 42 syntax error or unknown column), so
+# sending it again can't help.
+PERMANENT_ERROR_CLASSES = ("22", "23", "42")
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """True if the database rejected the row; outages and timeouts are not permanent."""
+    return is_api_error(error) and str(getattr(error, "code", "") or "").startswith(PERMANENT_ERROR_CLASSES)
+
+
+def _flush_users(db, rows: List[Dict[str, Any]]) -> None:
+    with timed_db('users'):
+        db.table('users').upsert(rows, on_conflict="contact", ignore_duplicates=True).execute()
+
+
+def _flush_bookings(db, rows: List[Dict[str, Any]]) -> None:
+    with timed_db('bookings'):
+        db.table('bookings').upsert(rows, on_conflict="idempotency_key", ignore_duplicates=True).execute()
+
+
+# Per kind: how to write a batch of payloads. Users go first so a booking's
+# user_contact foreign key is always satisfied within one flush.
+FLUSHERS: Dict[str, Callable[[Any, List[Dict[str, Any]]], None]] = {
+    USERS: _flush_users,
+    BOOKINGS: _flush_bookings,
+}
+
+
+class Outbox:
+    """
+    A durable queue of pending rows in SQLite. enqueue() is a local disk write;
+    a daemon thread flushes due rows per kind in bulk and deletes them on success.
+    """
+
+    SCHEMA = """
+        create table if not exists outbox (
+            id integer primary key autoincrement,
+            kind text not null,
+            dedupe_key text not null,
+            payload text not null,
+            enqueued_at real not null,
+            attempts integer not null default 0,
+            next_attempt_at real not null default 0,
+            dead integer not null default 0,
+            last_error text,
+            unique (kind, dedupe_key)
+        );
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_backoff: float = 60.0, max_attempts: int = 10):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("pragma journal_mode=wal")
+        # FULL: a journaled booking has already been confirmed to the user, so it
+        # must survive power loss, not just a process crash (NORMAL only covers that).
+        self._conn.execute("pragma synchronous=full")
+        self._conn.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Producer side ---
+
+    def enqueue(self, kind: str, dedupe_key: str, payload: Dict[str, Any]) -> bool:
+        """Journals one row. Returns False if the same (kind, key) is already pending."""
+        with self._lock:
+            cur = self._conn.execute(
+                "insert or ignore into outbox (kind, dedupe_key, payload, enqueued_at) values (?, ?, ?, ?)",
+                (kind, dedupe_key, json.dumps(payload), time.time()),
+            )
+        self._wake.set()
+        self._publish_gauges()
+        return cur.rowcount == 1
+
+    # --- Flusher ---
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+            self._thread.start()
+            pending = self.stats()["depth"]
+            if pending:
+                log.info(f"OUTBOX: replaying {pending} pending rows from {self.path}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Cleared before draining, so a row enqueued mid-flush wakes the next wait.
+            self._wake.clear()
+            try:
+                flushed = self.flush_once()
+            except Exception as e:
+                log.error(f"OUTBOX: flush loop error: {e}")
+                flushed = 0
+            if not flushed:
+                self._wake.wait(self.flush_interval)
+
+    def _due(self, kind: str) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                "select id, payload, enqueued_at, attempts from outbox "
+                "where kind = ? and dead = 0 and next_attempt_at <= ? order by id limit ?",
+                (kind, time.time(), self.batch_size),
+            ).fetchall()
+
+    def flush_once(self) -> int:
+        """Flushes one batch per kind. Returns the number of rows written."""
+        db = get_supabase_client()
+        if not db:
+            return 0
+        written = 0
+        for kind, flush in FLUSHERS.items():
+            rows = self._due(kind)
+            if not rows:
+                continue
+            try:
+                flush(db, [json.loads(r[1]) for r in rows])
+            except Exception as e:
+                if is_api_error(e):
+                    # The database rejected the batch; retry rows one by one so a
+                    # single bad row can't hold back the rest.
+                    written += self._flush_individually(db, kind, flush, rows, e)
+                    continue
+                report_supabase_failure(e)
+                self._retry_later([r[0] for r in rows], [r[3] for r in rows], e)
+                break
+            report_supabase_success()
+            self._done(kind, rows)
+            written += len(rows)
+        self._publish_gauges()
+        return written
+
+    def _flush_individually(self, db, kind, flush, rows, batch_error) -> int:
+        log.error(f"OUTBOX: batch of {len(rows)} {kind} rows rejected ({batch_error}); retrying one by one")
+        written = 0
+        for row in rows:
+            try:
+                flush(db, [json.loads(row[1])])
+            except Exception as e:
+                self._retry_later([row[0]], [row[3]], e)
+                continue
+            self._done(kind, [row])
+            written += 1
+        return written
+
+    def _done(self, kind: str, rows) -> None:
+        now = time.time()
+        for row in rows:
+            observe("outbox_lag_seconds", kind, now - row[2])
+        incr("outbox_flushed", kind, len(rows))
+        with self._lock:
+            self._conn.executemany("delete from outbox where id = ?", [(row[0],) for row in rows])
+
+    def _retry_later(self, ids: List[int], attempts: List[int], error: Exception) -> None:
+        """
+        Schedules the rows again with capped exponential backoff. Only rows the
+        database keeps rejecting are parked as dead; a booking the user was
+        already told about is never dropped because Supabase was down a while.
+        """
+        permanent = is_permanent_error(error)
+        updates = []
+        for row_id, tries in zip(ids, attempts):
+            tries += 1
+            delay = min(self.max_backoff, 2 ** min(tries - 1, 16))
+            dead = 1 if permanent and tries >= self.max_attempts else 0
+            updates.append((tries, time.time() + delay, dead, str(error)[:500], row_id))
+            if dead:
+                incr("outbox_dead", "all")
+                log.error(f"OUTBOX: row {row_id} parked after {tries} attempts: {error}")
+        incr("outbox_retries", "all", len(ids))
+        with self._lock:
+            self._conn.executemany(
+                "update outbox set attempts = ?, next_attempt_at = ?, dead = ?, last_error = ? where id = ?",
+                updates,
+            )
+
+    # --- Observability ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and lag (age of the oldest pending row) per kind."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "select kind, count(*), min(enqueued_at), sum(dead) from outbox group by kind"
+            ).fetchall()
+        by_kind = {kind: {"depth": count - dead, "dead": dead, "lag_seconds": round(now - oldest, 3)}
+                   for kind, count, oldest, dead in rows}
+        return {"depth": sum(k["depth"] for k in by_kind.values()), "kinds": by_kind}
+
+    def _publish_gauges(self) -> None:
+        stats = self.stats()
+        for kind in FLUSHERS:
+            entry = stats["kinds"].get(kind, {"depth": 0, "lag_seconds": 0.0})
+            set_gauge("outbox_depth", kind, entry["depth"])
+            set_gauge("outbox_oldest_pending_seconds", kind, entry["lag_seconds"])
+
+
+_outbox: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    """The process-wide outbox, with its flusher started (which replays leftovers)."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                path = os.environ.get("OUTBOX_PATH") or DEFAULT_OUTBOX_PATH
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                _outbox = Outbox(
+                    path,
+                    batch_size=int(os.environ.get("OUTBOX_BATCH_SIZE", "100")),
+                    flush_interval=float(os.environ.get("OUTBOX_FLUSH_SECONDS", "0.5")),
+                    max_backoff=float(os.environ.get("OUTBOX_MAX_BACKOFF_SECONDS", "60")),
+                    max_attempts=int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "10")),
+                )
+                _outbox.start()
+    return _outbox
+
+
+def outbox_stats() -> Dict[str, Any]:
+    return get_outbox().stats() if _outbox is not None else {"depth": 0, "kinds": {}}
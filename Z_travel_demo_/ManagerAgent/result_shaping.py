@@ -0,0 +1,112 @@
+# File: result_shaping.py
+# Keeps catalog tool results small: only the columns the agents actually present,
+# a row cap per table, and a token budget that trims long text like `summary`.
+# Smaller results mean fewer bytes from PostgREST and fewer prompt tokens per turn.
+
+import json
+import os
+import threading
+from typing import Any, Dict, List
+
+# Columns the agents present to the user. Override per table with
+# RESULT_COLUMNS_<TABLE>="id,name,..." if your schema names them differently.
+TOOL_COLUMNS: Dict[str, List[str]] = {
+    "hotels": ["id", "name", "location", "category", "price_per_night", "rating"],
+    "transport_options": ["id", "provider", "mode", "origin", "destination", "price", "duration", "departure_time"],
+    "attractions": ["name", "type", "summary"],
+    "emergency_contacts": ["type", "number", "description"],
+    "destination_details": ["description"],
+}
+
+MAX_ROWS: Dict[str, int] = {
+    "hotels": 3,
+    "transport_options": 5,
+    "attractions": 5,
+    "emergency_contacts": 10,
+    "destination_details": 1,
+}
+
+# Rough prompt-token budget for one tool result (about 4 characters per token).
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("RESULT_TOKEN_BUDGET", "400"))
+LONG_FIELDS = ("summary", "description")
+MIN_FIELD_CHARS = 60
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def columns_for(table: str) -> List[str]:
+    override = os.environ.get(f"RESULT_COLUMNS_{table.upper()}")
+    if override:
+        return [c.strip() for c in override.split(",") if c.strip()]
+    return TOOL_COLUMNS.get(table, [])
+
+
+def select_columns(table: str) -> str:
+    """The PostgREST select string for a table, e.g. 'id, name, rating'."""
+    return ", ".join(columns_for(table)) or "*"
+
+
+def estimate_tokens(data: Any) -> int:
+    return len(json.dumps(data, ensure_ascii=False, default=str)) // 4
+
+
+def _trim(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:.") + "…"
+
+
+def shape_rows(table: str, rows: List[Dict[str, Any]], token_budget: int = None) -> List[Dict[str, Any]]:
+    """
+    Projects rows to the table's allow-listed columns, caps the row count and
+    then shortens long text fields (and finally drops rows) until the result
+    fits the token budget. Records the size of the rows it was given and of
+    the rows it returns (see shaping_stats).
+    """
+    budget = token_budget or DEFAULT_TOKEN_BUDGET
+    fetched = json.dumps(rows, ensure_ascii=False, default=str)
+
+    columns = columns_for(table)
+    shaped = [{c: row[c] for c in columns if c in row} if columns else dict(row) for row in rows]
+    shaped = shaped[:MAX_ROWS.get(table, len(shaped))]
+
+    limit = 240
+    while estimate_tokens(shaped) > budget and limit >= MIN_FIELD_CHARS:
+        for row in shaped:
+            for field in LONG_FIELDS:
+                if isinstance(row.get(field), str):
+                    row[field] = _trim(row[field], limit)
+        limit //= 2
+    while estimate_tokens(shaped) > budget and len(shaped) > 1:
+        shaped.pop()
+
+    returned = json.dumps(shaped, ensure_ascii=False, default=str)
+    with _stats_lock:
+        entry = _stats.setdefault(table, {"calls": 0, "bytes_fetched": 0, "bytes_returned": 0, "tokens_fetched": 0, "tokens_returned": 0})
+        entry["calls"] += 1
+        entry["bytes_fetched"] += len(fetched.encode("utf-8"))
+        entry["bytes_returned"] += len(returned.encode("utf-8"))
+        entry["tokens_fetched"] += len(fetched) // 4
+        entry["tokens_returned"] += len(returned) // 4
+    return shaped
+
+
+def shaping_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Cumulative size per table of the rows the tools fetched and of the results
+    shape_rows returned to the agent. The fetched rows are usually already
+    narrowed to TOOL_COLUMNS by select_columns() in the query (and by the row
+    limit), so trimmed_pct only covers what shape_rows itself removes: the row
+    cap, shortened text and rows dropped for the token budget. It is not the
+    saving against unshaped `select *` results, and its size depends on how
+    much each tool's query already narrowed, so don't compare it across tables.
+    """
+    with _stats_lock:
+        report = {}
+        for table, entry in _stats.items():
+            row = dict(entry)
+            row["trimmed_pct"] = round(100 * (1 - entry["bytes_returned"] / entry["bytes_fetched"]), 1) if entry["bytes_fetched"] else 0.0
+            report[table] = row
+        return report
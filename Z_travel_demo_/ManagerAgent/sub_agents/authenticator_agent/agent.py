@@ -2,64 +2,109 @@
 # This is the final, corrected version of the authenticator.
 
 # --- Part 1: Clean and Correct Imports ---
-import re
-import sys
 import os
 from google.adk.agents import LlmAgent
 from google.adk.tools.tool_context import ToolContext
 from typing import Dict, Any
 
-# This ensures we can find the supabase_client.py file in the project root
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+# supabase_client.py lives in the project root; ManagerAgent/__init__.py puts it on sys.path.
 # This is the ONLY import needed for the database connection.
-from supabase_client import get_supabase_client
+from supabase_client import get_supabase_client, report_supabase_success, report_supabase_failure, async_tool
+from metrics import instrument_tool, timed_db, get_logger, incr
+from catalog_cache import TTLCache, make_key
+from outbox import write_behind_enabled, get_outbox, USERS
+from trip_state import TripState
+from history_compaction import compact_history
+from model_tiering import select_model, escalate_on_tool_error, escalate_on_malformed_call
+
+log = get_logger("authenticator")
+
+# --- Known-user cache ---
+# Contacts that authenticated recently. A returning user found here skips the
+# database entirely; everyone else costs exactly one upsert round trip.
+# KNOWN_USERS_MAX_ENTRIES / KNOWN_USERS_TTL_SECONDS tune its size and lifetime.
+KNOWN_USERS_TABLE = "users"
+known_users = TTLCache(
+    max_entries=int(os.environ.get("KNOWN_USERS_MAX_ENTRIES", "10000")),
+    ttls={KNOWN_USERS_TABLE: float(os.environ.get("KNOWN_USERS_TTL_SECONDS", "3600"))},
+)
+
+
+def upsert_user(db, name: str, contact: str) -> bool:
+    """
+    Inserts the user unless the contact already exists, in one atomic statement
+    (INSERT ... ON CONFLICT (contact) DO NOTHING). Returns True if a new row was
+    created. Requires the unique constraint in sql/users_contact_unique.sql.
+    """
+    with timed_db('users'):
+        response = db.table('users').upsert(
+            {"full_name": name, "contact": contact},
+            on_conflict="contact",
+            ignore_duplicates=True,
+        ).execute()
+    # With ignore_duplicates, PostgREST only returns rows it actually inserted.
+    return bool(response.data)
 
 
 # --- Part 2: The Refactored, Database-Aware Tool ---
+@instrument_tool
 def process_and_authenticate_user(name: str, contact: str, tool_context: ToolContext) -> Dict[str, Any]:
     """
-    Checks if a user exists in the Supabase database. If so, authenticates them.
-    If not, adds them to the database and then authenticates them.
-    This version correctly handles cases where the user does not yet exist.
+    Authenticates the user, adding them to the Supabase database if they are new.
+    Returning users are served from the known-user cache; otherwise a single
+    upsert both checks and inserts, so concurrent sessions can't create duplicates.
     """
     try:
-        # Step A: Get the client connection from our factory function
-        db = get_supabase_client()
-        if not db:
-            return {"status": "error", "error_message": "Database connection is not available."}
-
-        print(f"TOOL CALLED: process_and_authenticate_user with Name: {name}, Contact: {contact}")
+        log.info(f"TOOL CALLED: process_and_authenticate_user with Name: {name}, Contact: {contact}")
 
         if not name or not contact:
             return {"status": "error", "message": "Name or contact information was not provided."}
 
-        # Step B: Use the 'db' variable to interact with the database
-        response = db.table('users').select('contact').eq('contact', contact).execute()
-        
         user_display_name = name.split()[0]
-
-        if response.data:
-            # If response.data is NOT empty, it means we found the user.
-            print(f"Returning user found with contact: {contact}")
+        key = make_key(contact=contact)
+        known, _ = known_users.get(KNOWN_USERS_TABLE, key)
+
+        if known:
+            incr("auth_cache_hits", "users")
+            log.info(f"Returning user found in cache with contact: {contact}")
+        elif write_behind_enabled():
+            # Journal the upsert and answer now; the outbox flusher writes it to Supabase.
+            if get_outbox().enqueue(USERS, contact, {"full_name": name, "contact": contact}):
+                log.info(f"User queued for Supabase: {name}")
+            known_users.put(KNOWN_USERS_TABLE, key, True)
         else:
-            # If response.data IS empty, it means it's a new user.
-            print(f"New user. Adding to Supabase: {name}")
-            db.table('users').insert({"full_name": name, "contact": contact}).execute()
+            # Step A: Get the client connection from our factory function
+            db = get_supabase_client()
+            if not db:
+                return {"status": "error", "error_message": "Database connection is not available."}
+
+            # Step B: One round trip decides new vs. returning and inserts if needed
+            if upsert_user(db, name, contact):
+                log.info(f"New user added to Supabase: {name}")
+            else:
+                log.info(f"Returning user found with contact: {contact}")
+            report_supabase_success()
+            known_users.put(KNOWN_USERS_TABLE, key, True)
 
         # Step C: Update the session state (short-term memory)
-        tool_context.state["user_name"] = user_display_name
-        tool_context.state["user_contact"] = contact
-        tool_context.state["user_authenticated"] = 1
+        trip = TripState.from_state(tool_context.state)
+        trip.update({"user_name": user_display_name, "user_contact": contact, "user_authenticated": 1})
+        trip.commit(tool_context.state)
         
         return {
             "status": "success",
             "message": f"Welcome {user_display_name}! You're now authenticated.",
         }
     except Exception as e:
-        print(f"ERROR in process_and_authenticate_user: {e}")
+        log.error(f"ERROR in process_and_authenticate_user: {e}")
+        report_supabase_failure(e)
         return {"status": "error", "error_message": f"A system error occurred during authentication: {str(e)}"}
 
 
+# Awaitable variant used by the agent, so a slow lookup doesn't block other sessions.
+process_and_authenticate_user_async = async_tool(process_and_authenticate_user)
+
+
 # --- Part 3: The Agent Definition (No changes needed here) ---
 # In your authenticator_agent/agent.py file
 
@@ -67,8 +112,12 @@ authenticator_agent = LlmAgent(
     name="authenticator_agent",
     model="gemini-1.5-pro",
     description="Greets new users and handles their authentication before any other action can be taken.",
+    # Fast model by default; the heavy one on tool errors, malformed calls or complex turns.
+    before_model_callback=[compact_history, select_model],
+    after_model_callback=[escalate_on_malformed_call],
+    after_tool_callback=[escalate_on_tool_error],
     tools=[
-        process_and_authenticate_user,
+        process_and_authenticate_user_async,
     ],
     
     # --- The NEW, More Robust Instruction ---
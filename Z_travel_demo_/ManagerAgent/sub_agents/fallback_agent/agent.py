@@ -1,8 +1,11 @@
 from google.adk.agents import LlmAgent
+from model_tiering import select_model, escalate_on_malformed_call
 
 fallback_agent = LlmAgent(
     name="fallback_agent",
     description="Handles queries that were not understood or could not be matched to any known function.",
+    before_model_callback=[select_model],
+    after_model_callback=[escalate_on_malformed_call],
     model="gemini-2.5-pro", # Using 1.5-flash is good for nuanced responses
     instruction="""
 You are a fallback agent for TravelBot. Your purpose is to apologize gracefully when the bot cannot understand a user's request.
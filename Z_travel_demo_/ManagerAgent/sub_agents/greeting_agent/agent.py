@@ -1,9 +1,12 @@
 from google.adk.agents import LlmAgent
+from model_tiering import select_model, escalate_on_malformed_call
 
 greeting_agent = LlmAgent(
     name="greeting_agent",
     model="gemini-2.5-pro",
     description="Welcomes the user and explains what the TravelBot can do.",
+    before_model_callback=[select_model],
+    after_model_callback=[escalate_on_malformed_call],
     instruction="""
 You are a friendly and helpful travel assistant. 
 When a new user joins, greet them warmly and briefly explain what you can help them with.
@@ -2,12 +2,14 @@ from google.adk.agents import LlmAgent
 from .sub_agents.planning_and_booking_agent.agent import planning_and_booking_agent
 from .sub_agents.info_agent.agent import info_agent
 from .sub_agents.confirmation_agent.agent import confirmation_agent
+from history_compaction import compact_history
 # from .sub_agents.search_agent.agent import search_agent
 
 orchestrator_agent = LlmAgent(
     name="orchestrator_agent",
     model="gemini-1.5-flash",
     description="The master orchestrator. It analyzes user intent and delegates to the correct specialist.",
+    before_model_callback=compact_history,
     sub_agents=[
         planning_and_booking_agent,
         info_agent,
@@ -1,95 +1,109 @@
 # File: manager/sub_agents/confirmation_agent/agent.py
 
-import random
-import string
-import sys
-import os
 from google.adk.agents import LlmAgent
 from google.adk.tools.tool_context import ToolContext
 from typing import Dict, Any, Optional
 
-# This ensures we can find the supabase_client.py file in the project root
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from supabase_client import get_supabase_client
+from supabase_client import async_tool
+from tools_common import select_option
+from booking_commit import commit_booking
+from metrics import instrument_tool, get_logger, session_id
+from history_compaction import compact_history
+from model_tiering import select_model, escalate_on_tool_error, escalate_on_malformed_call
 
+log = get_logger("confirmation")
 
-# --- The Tool (No changes needed, it is already robust and correct) ---
-def confirm_booking(tool_context: ToolContext, selected_hotel_id: str, selected_transport_id: Optional[str] = None) -> Dict[str, Any]:
+
+# --- The Tool ---
+@instrument_tool
+def confirm_booking(tool_context: ToolContext, selected_hotel_id: Optional[str] = None, selected_transport_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Finalizes a booking by creating a permanent record in the Supabase 'bookings' table.
-    It now handles cases where only a hotel is booked.
+    The IDs are optional: by default it books the hotel (and transport, if any)
+    picked with select_option, or the only hotel that was offered. Validation and
+    the insert happen in one database call, and calling it again with the same
+    selections returns the original confirmation instead of booking twice.
     """
     try:
-        db = get_supabase_client()
-        if not db:
-            return {"status": "error", "error_message": "Database connection is not available."}
-
         user_contact = tool_context.state.get("user_contact")
         if not user_contact:
             return {"status": "error", "error_message": "User is not authenticated. Cannot complete booking."}
 
-        print(f"TOOL CALLED: confirm_booking for User: {user_contact}, Hotel: {selected_hotel_id}, Transport: {selected_transport_id}")
-
-        hotel_response = db.table('hotels').select('name').eq('id', selected_hotel_id).single().execute()
-        if not hotel_response.data:
-            return {"status": "error", "error_message": f"Could not find the selected hotel with ID {selected_hotel_id}."}
-        
-        hotel_name = hotel_response.data['name']
-        transport_info = "Not included"
-        
-        if selected_transport_id:
-             transport_response = db.table('transport_options').select('provider, mode').eq('id', selected_transport_id).single().execute()
-             if transport_response.data:
-                transport_info = f"{transport_response.data['provider']} ({transport_response.data['mode']})"
-
-        confirmation_number = 'TRV-' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-
-        booking_data = {
-            "confirmation_number": confirmation_number,
-            "user_contact": user_contact,
-            "booked_hotel_id": selected_hotel_id,
-            "booked_transport_id": selected_transport_id,
+        hotel_shortlist = tool_context.state.get("hotel_shortlist") or []
+        if not selected_hotel_id:
+            selected_hotel_id = tool_context.state.get("selected_hotel_id")
+        if not selected_hotel_id and len(hotel_shortlist) == 1:
+            selected_hotel_id = hotel_shortlist[0]["id"]
+        if not selected_hotel_id:
+            if hotel_shortlist:
+                names = ", ".join(f"{i + 1}. {h['name']}" for i, h in enumerate(hotel_shortlist))
+                return {"status": "error", "error_message": f"Which hotel would you like to book? The options are: {names}."}
+            return {"status": "error", "error_message": "No hotel has been chosen yet. Let's find you a hotel first."}
+        if not selected_transport_id:
+            selected_transport_id = tool_context.state.get("selected_transport_id")
+
+        log.info(f"TOOL CALLED: confirm_booking for User: {user_contact}, Hotel: {selected_hotel_id}, Transport: {selected_transport_id}")
+
+        result = commit_booking(session_id(tool_context), user_contact, selected_hotel_id, selected_transport_id or None)
+        if result.get("status") != "success":
+            return {"status": "error", "error_message": result.get("error_message", "The booking could not be completed.")}
+
+        if result.get("pending"):
+            # Journaled, but the IDs couldn't be checked; the booking isn't confirmed yet.
+            return {
+                "status": "pending",
+                "reference": result["confirmation_number"],
+                "message": "The booking request was received but could not be verified right now. It will be confirmed once the booking system is reachable.",
+            }
+
+        tool_context.state["last_booking"] = {
+            "confirmation_id": result["confirmation_number"],
+            "hotel": result["hotel_name"],
+            "transport": result["transport_info"],
         }
-
-        db.table('bookings').insert(booking_data).execute()
-
         return {
             "status": "success",
-            "confirmation_id": confirmation_number,
-            "booked_hotel": hotel_name,
-            "booked_transport": transport_info,
+            "confirmation_id": result["confirmation_number"],
+            "booked_hotel": result["hotel_name"],
+            "booked_transport": result["transport_info"],
         }
 
     except Exception as e:
-        print(f"ERROR in confirm_booking: {e}")
+        log.error(f"ERROR in confirm_booking: {e}")
         return {"status": "error", "error_message": f"A system error occurred during final booking: {str(e)}"}
 
 
+# Awaitable variant used by the agent, so the booking write runs off the event loop.
+confirm_booking_async = async_tool(confirm_booking)
+
+
 # --- The Recreated Agent with a More Robust Prompt ---
 confirmation_agent = LlmAgent(
     name="confirmation_agent",
     model="gemini-1.5-pro",
     description="Handles the final booking confirmation step when a user gives explicit approval.",
+    # Fast model by default; the heavy one on tool errors, malformed calls or complex turns.
+    before_model_callback=[compact_history, select_model],
+    after_model_callback=[escalate_on_malformed_call],
+    after_tool_callback=[escalate_on_tool_error],
+    # Everything it needs is in state (see the instruction), so skip the transcript.
+    include_contents="none",
     tools=[
-        confirm_booking,
+        select_option,
+        confirm_booking_async,
     ],
     instruction="""
-    You are the final confirmation specialist for TravelBot. Your one and only job is to finalize a booking when a user gives their explicit approval (e.g., "book it", "confirm that", "go ahead").
-
-    **Your Standard Operating Procedure (SOP):**
-
-    1.  **SCAN CONTEXT:** Your first action is to meticulously scan the immediately preceding conversation history.
-
-    2.  **LOCATE ID:** Your goal is to locate the booking ID(s). The previous agent MUST have presented options in a specific format like `Item Name (ID: xxx)`. You are looking for this exact pattern.
-
-    3.  **EXTRACT IDs:**
-        - Find the `id` for the hotel that the user has just seen and wants to book. This is your `selected_hotel_id`.
-        - If a transport option was also presented and agreed upon, find its `id`. This is your `selected_transport_id`. If there's no transport, that's okay.
-
-    4.  **EXECUTE TOOL:** Call the `confirm_booking` tool with the ID(s) you have found. It is mandatory to provide at least a `selected_hotel_id`.
-
-    5.  **REPORT RESULT:**
-        - **On Success:** If the tool's `status` is 'success', use the `confirmation_id`, `booked_hotel`, and `booked_transport` from its response to create a clear, celebratory confirmation message for the user.
-        - **On Failure:** If the `status` is 'error', you MUST relay the exact `error_message` from the tool's response to the user and suggest they try again.
+    You are the booking specialist for TravelBot. Your one job is to finalize a booking once the user gives explicit approval (e.g., "book it", "confirm that", "go ahead").
+
+    Options shown to the user:
+    - Hotels: {hotel_shortlist?}
+    - Transport: {transport_shortlist?}
+    Already picked: hotel `{selected_hotel_id?}`, transport `{selected_transport_id?}`.
+
+    1.  If the user says which option they want (an ID, a name, "the second one", "the cheapest"), call `select_option` with `kind` ("hotel" or "transport") and their words as `choice`.
+    2.  Call `confirm_booking` with no arguments. It books the picked options from memory.
+    3.  On 'success', use `confirmation_id`, `booked_hotel` and `booked_transport` to write a short, celebratory confirmation.
+        On 'pending', tell the user their request is received under `reference` and relay the `message`; do NOT call it confirmed.
+        On 'error', relay the `error_message` to the user.
     """
 )
\ No newline at end of file
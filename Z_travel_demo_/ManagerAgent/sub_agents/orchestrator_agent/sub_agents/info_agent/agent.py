@@ -2,9 +2,11 @@
 
 # --- All necessary imports ---
 from google.adk.agents import LlmAgent
-from google.adk.tools import agent_tool
 from tools_common import *
 from .weather_details.agent import weather_details
+from weather_cache import CachedWeatherTool
+from history_compaction import compact_history
+from model_tiering import select_model, escalate_on_tool_error, escalate_on_malformed_call
 
 
 
@@ -12,11 +14,16 @@ info_agent = LlmAgent(
     name="info_agent",
     model="gemini-1.5-pro", # Corrected to a real, powerful model for synthesis
     description="A fact-finding expert that answers specific questions about destinations or flight statuses.",
+    # Fast model by default; the heavy one on tool errors, malformed calls or complex turns.
+    before_model_callback=[compact_history, select_model],
+    after_model_callback=[escalate_on_malformed_call],
+    after_tool_callback=[escalate_on_tool_error],
     tools=[
-        store_trip_parameters,
-        agent_tool.AgentTool(agent=weather_details),
-        get_destination_info,
-        get_emergency_contacts,
+        store_trip_parameters_async,
+        # Forecasts are cached per (location, date window); the agent only runs on a miss.
+        CachedWeatherTool(agent=weather_details),
+        get_destination_info_async,
+        get_emergency_contacts_async,
         get_current_state,
     ],
     instruction="""
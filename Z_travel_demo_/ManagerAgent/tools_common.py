@@ -1,15 +1,81 @@
-from google.adk.agents import LlmAgent
-from google.adk.tools.tool_context import ToolContext
-from typing import Dict, Any, List, Optional
+import asyncio
+import base64
+import json
 import re
 import os
-import sys
-from supabase import create_client, Client
-from dotenv import load_dotenv
 from google.adk.tools.tool_context import ToolContext
-from typing import Dict, Any, Optional, Literal
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from supabase_client import get_supabase_client
+from typing import Dict, Any, List, Optional, Literal, Tuple
+from supabase_client import get_supabase_client, report_supabase_success, report_supabase_failure, async_tool, run_db_call
+from catalog_cache import catalog_cache, make_key
+from db_resilience import DatabaseUnavailable
+from catalog_snapshot import active_snapshot
+from result_shaping import shape_rows, select_columns, columns_for, MAX_ROWS
+from location_index import resolve_location, suggest_location
+from trip_state import TripState, FIELDS, VERSION_KEY, CLEARED
+from metrics import instrument_tool, timed_db, get_logger
+
+log = get_logger("tools")
+
+def normalize_trip_parameters(
+    destination: Optional[str] = None,
+    duration_days: Optional[str] = None,
+    budget: Optional[str] = None,
+    interests: Optional[List[str]] = None,
+    origin: Optional[str] = None,
+    travel_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Turns raw trip details (as the LLM or the rule-based extractor passes them)
+    into the state values the search tools expect. Returns only the keys that
+    were provided.
+    """
+    updates: Dict[str, Any] = {}
+
+    # --- Destination ---
+    if destination:
+        updates['destination'] = destination
+
+    # --- Duration (Robust Integer Parsing from String) ---
+    if duration_days:
+        numeric_part = re.search(r'\d+', str(duration_days))
+        if numeric_part:
+            updates['duration_days'] = int(numeric_part.group(0))
+
+    # --- Origin ---
+    if origin:
+        updates['origin'] = origin
+
+    # --- Travel Date ---
+    if travel_date:
+        updates['travel_date'] = travel_date
+
+    # --- Budget (Robust Classification from String) ---
+    if budget:
+        budget_str = str(budget).lower()
+        numeric_part = re.search(r'\d[\d,]*', budget_str)
+        budget_val = int(numeric_part.group(0).replace(',', '')) if numeric_part else None
+        if budget_val is not None:
+            # The level comes from the same parsed amount ("25,000" is 25000, not 25).
+            if budget_val <= 15000: updates['budget_level'] = "Budget"
+            elif budget_val >= 50000: updates['budget_level'] = "Luxury"
+            else: updates['budget_level'] = "Mid-Range"
+        elif "low" in budget_str or "budget" in budget_str:
+            updates['budget_level'] = "Budget"
+        elif "high" in budget_str or "luxury" in budget_str:
+            updates['budget_level'] = "Luxury"
+        else:
+            updates['budget_level'] = "Mid-Range"
+        # An actual amount is kept for costing itineraries against it; a tier
+        # word on its own replaces any amount given earlier.
+        updates['budget_amount'] = budget_val if budget_val is not None and budget_val >= 1000 else None
+
+    # ... other parameters like interests, origin, etc. ...
+    if interests:
+        updates['interests'] = interests
+
+    return updates
+
+@instrument_tool
 def store_trip_parameters(
     tool_context: ToolContext,
     destination: Optional[str] = None,
@@ -25,92 +91,63 @@ def store_trip_parameters(
     This version uses simple types that the ADK framework can understand.
     """
     try:
-        print(f"ROBUST TOOL CALLED: store_trip_parameters with O:{origin}, D:{destination}, Dur:{duration_days}, B:{budget}")
-
-        # ... (The internal logic for robust parsing you added before is still perfect) ...
-        # --- Destination ---
-        if destination:
-            tool_context.state['destination'] = destination
+        log.info(f"ROBUST TOOL CALLED: store_trip_parameters with O:{origin}, D:{destination}, Dur:{duration_days}, B:{budget}")
 
-        # --- Duration (Robust Integer Parsing from String) ---
-        if duration_days:
-            numeric_part = re.search(r'\d+', str(duration_days))
-            if numeric_part:
-                tool_context.state['duration_days'] = int(numeric_part.group(0))
+        # Resolve places to the catalog's spelling once, here, so every search can match exactly.
+        # A likely typo is not corrected silently; the user is asked to confirm it.
+        resolved, suggested = {}, {}
+        for key, value in (("destination", destination), ("origin", origin)):
+            canonical = resolve_location(value)
+            if canonical and canonical != value:
+                resolved[key] = canonical
+            elif value and not canonical:
+                suggestion = suggest_location(value)
+                if suggestion:
+                    suggested[key] = suggestion
+        destination = resolved.get("destination", destination)
+        origin = resolved.get("origin", origin)
 
-        
-        # --- Origin ---
-        if origin:
-            tool_context.state['origin'] = origin
-            
-        # --- Travel Date ---
-        if travel_date:
-            tool_context.state['travel_date'] = travel_date
-            
-        
-        # --- Budget (Robust Classification from String) ---
-        if budget:
-            budget_str = str(budget).lower()
-            if "low" in budget_str or "budget" in budget_str:
-                tool_context.state['budget_level'] = "Budget"
-            elif "high" in budget_str or "luxury" in budget_str:
-                tool_context.state['budget_level'] = "Luxury"
-            else:
-                numeric_part = re.search(r'\d+', budget_str)
-                if numeric_part:
-                    budget_val = int(numeric_part.group(0))
-                    if budget_val <= 15000: tool_context.state['budget_level'] = "Budget"
-                    elif budget_val >= 50000: tool_context.state['budget_level'] = "Luxury"
-                    else: tool_context.state['budget_level'] = "Mid-Range"
-                else:
-                    tool_context.state['budget_level'] = "Mid-Range"
-        
-        # ... other parameters like interests, origin, etc. ...
-        if interests:
-            tool_context.state['interests'] = interests
+        updates = normalize_trip_parameters(destination, duration_days, budget, interests, origin, travel_date)
+        trip = TripState.from_state(tool_context.state)
+        trip.update(updates)
+        changed = trip.commit(tool_context.state)
 
-        return {"status": "success", "message": "State updated successfully."}
+        result = {"status": "success", "message": "State updated successfully." if changed else "Nothing new to save."}
+        if resolved:
+            result["resolved_locations"] = resolved
+        if suggested:
+            result["did_you_mean"] = suggested
+            result["message"] += " " + " ".join(
+                f"'{destination if key == 'destination' else origin}' isn't in my database; ask the user whether they meant {name}."
+                for key, name in suggested.items())
+        return result
     
     except Exception as e:
-        print(f"FATAL ERROR in store_trip_parameters: {e}")
+        log.error(f"FATAL ERROR in store_trip_parameters: {e}")
         return {"status": "error", "error_message": f"A critical error occurred while saving trip details: {e}"}
 
+@instrument_tool
 def clear_trip_state(tool_context: ToolContext) -> Dict[str, Any]:
     """Resets all travel planning information in the conversation state."""
-    # This tool is correct. No changes needed.
     try:
-        print("TOOL CALLED: clear_trip_state")
-        keys_to_clear = ['destination', 'duration_days', 'budget_level', 'interests', 'origin', 'travel_date', 'calculated_budget_total']
-        for key in keys_to_clear:
-            if key in tool_context.state: del tool_context.state[key]
+        log.info("TOOL CALLED: clear_trip_state")
+        trip = TripState.from_state(tool_context.state)
+        trip.clear_trip()
+        trip.commit(tool_context.state)
         return {"status": "success", "message": "Previous trip state cleared."}
     except Exception as e:
         return {"status": "error", "error_message": f"Failed to clear state: {e}"}
 
 # --- Logic & Generative Tools (No DB connection needed) ---
 
-def get_budget_estimate(tool_context: ToolContext) -> dict:
-    """Calculates a budget using state variables."""
-    # This tool is correct. Removed the unnecessary DB call.
-    try:
-        duration_days = int(tool_context.state.get("duration_days"))
-        budget_level = tool_context.state.get("budget_level")
-        if not all([duration_days, budget_level]):
-            return {"status": "error", "error_message": "Missing duration or budget_level."}
-        base_cost_per_day = 8000
-        multipliers = {"Budget": 0.7, "Mid-Range": 1.2, "Luxury": 2.5}
-        total = base_cost_per_day * duration_days * multipliers.get(budget_level, 1.2)
-        tool_context.state["calculated_budget_total"] = total
-        return {"status": "success", "budget_estimate": {"total_cost": f"₹{total:,.0f}", "level": budget_level}}
-    except Exception as e:
-        return {"status": "error", "error_message": f"Budget calculation failed: {str(e)}"}
-
+@instrument_tool
 def generate_packing_list(tool_context: ToolContext) -> Dict[str, Any]:
     """Generates a suggested packing list based on the state."""
     # This tool is correct. No changes needed.
     try:
-        duration = int(tool_context.state.get("duration_days", 3))
-        interests = tool_context.state.get("interests", [])
+        trip = TripState.from_state(tool_context.state)
+        duration = trip.duration_days or 3
+        interests = trip.interests or []
         items = ["Phone & Charger", "ID", "Cards & Cash", "Toiletries", f"{duration} sets of clothes"]
         if "adventure" in interests: items.extend(["Hiking Shoes", "First-Aid Kit"])
         if "beach" in interests: items.extend(["Swimsuit", "Sunglasses"])
@@ -118,53 +155,359 @@ def generate_packing_list(tool_context: ToolContext) -> Dict[str, Any]:
     except Exception as e:
         return {"status": "error", "error_message": f"Failed to generate packing list: {e}"}
 
+@instrument_tool
 def get_current_state(tool_context: ToolContext) -> Dict[str, Any]:
-    """A debugging tool that retrieves and returns the current session state."""
+    """A debugging tool that retrieves and returns the current trip and user details."""
     try:
-        print("TOOL CALLED: get_current_state")
-        current_state_dict = dict(tool_context.state)
-        print(f"Current State: {current_state_dict}")
+        log.info("TOOL CALLED: get_current_state")
+        trip = TripState.from_state(tool_context.state)
+        log.info(f"Current State: {trip.to_compact()}")
         return {
             "status": "success",
-            "current_state": current_state_dict
+            "current_state": trip.as_dict(),
+            "version": trip.version,
         }
     except Exception as e:
-        print(f"ERROR in get_current_state: {e}")
+        log.error(f"ERROR in get_current_state: {e}")
         return {
             "status": "error",
             "error_message": f"An error occurred while retrieving the state: {str(e)}"
         } 
 
+def _goal_done(tool_context: ToolContext, goal: str) -> None:
+    # The pre-extractor remembers what the user asked for until the matching search has run.
+    trip = TripState.from_state(tool_context.state)
+    if trip.pending_goal == goal:
+        trip.pending_goal = None
+        trip.commit(tool_context.state)
+
+# --- Shortlists ---
+# The options a search presented are kept in state as compact {id, name, price}
+# entries, so selection and booking work from state instead of the transcript.
+
+SHORTLIST_KEYS = {"hotel": "hotel_shortlist", "transport": "transport_shortlist"}
+SELECTION_KEYS = {"hotel": "selected_hotel_id", "transport": "selected_transport_id"}
+ORDINALS = {
+    "first": 0, "1st": 0, "one": 0, "second": 1, "2nd": 1, "two": 1, "third": 2, "3rd": 2, "three": 2,
+    "fourth": 3, "4th": 3, "four": 3, "fifth": 4, "5th": 4, "five": 4,
+}
+
+def _remember_shortlist(tool_context: ToolContext, kind: str, rows: List[Dict[str, Any]]) -> None:
+    if kind == "hotel":
+        shortlist = [{"id": r.get('id'), "name": r.get('name'), "price": r.get('price_per_night')} for r in rows]
+    else:
+        shortlist = [{"id": r.get('id'), "name": f"{r.get('provider')} ({r.get('mode')})", "price": r.get('price')} for r in rows]
+    trip = TripState.from_state(tool_context.state)
+    if getattr(trip, SHORTLIST_KEYS[kind]) != shortlist:
+        setattr(trip, SHORTLIST_KEYS[kind], shortlist)
+        # A new list of options invalidates an earlier pick of the same kind.
+        setattr(trip, SELECTION_KEYS[kind], None)
+        trip.commit(tool_context.state)
+
+def resolve_choice(shortlist: List[Dict[str, Any]], choice: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolves a user's pick against a shortlist: an ID, a (partial) name, an
+    ordinal ("the second one", "option 3", "last") or "cheapest"/"most expensive".
+    """
+    if not shortlist or not choice:
+        return None
+    text = choice.strip().lower()
+    for item in shortlist:
+        if str(item.get('id', '')).lower() == text:
+            return item
+    priced = [item for item in shortlist if isinstance(item.get('price'), (int, float))]
+    if priced and re.search(r"\b(cheapest|lowest|least expensive)\b", text):
+        return min(priced, key=lambda item: item['price'])
+    if priced and re.search(r"\b(most expensive|priciest|costliest|highest)\b", text):
+        return max(priced, key=lambda item: item['price'])
+    if re.search(r"\blast\b", text):
+        return shortlist[-1]
+    number = re.search(r"(?:option|number|no\.?|#)\s*(\d+)|^(\d+)$", text)
+    index = int(number.group(1) or number.group(2)) - 1 if number else None
+    if index is None:
+        index = next((ORDINALS[word] for word in re.findall(r"[a-z0-9]+", text) if word in ORDINALS), None)
+    if index is not None and 0 <= index < len(shortlist):
+        return shortlist[index]
+    for item in shortlist:
+        name = str(item.get('name', '')).lower()
+        if name and (name in text or text in name):
+            return item
+    return None
+
+@instrument_tool
+def select_option(tool_context: ToolContext, kind: Literal["hotel", "transport"], choice: str) -> Dict[str, Any]:
+    """
+    Records which of the presented hotels or transport options the user picked.
+    `choice` is what the user said about it: an ID, a name, "the second one",
+    "the cheapest", etc.
+    """
+    shortlist = tool_context.state.get(SHORTLIST_KEYS.get(kind, "")) or []
+    if not shortlist:
+        return {"status": "error", "error_message": f"I haven't shown you any {kind} options yet. Shall I search for some?"}
+    item = resolve_choice(shortlist, choice)
+    if not item:
+        names = ", ".join(f"{i + 1}. {entry['name']}" for i, entry in enumerate(shortlist))
+        return {"status": "error", "error_message": f"I couldn't tell which {kind} you meant. The options are: {names}."}
+    trip = TripState.from_state(tool_context.state)
+    setattr(trip, SELECTION_KEYS[kind], item['id'])
+    trip.commit(tool_context.state)
+    log.info(f"TOOL CALLED: select_option picked {kind} {item['id']} for '{choice}'")
+    return {"status": "success", "selected": item}
+
+# --- Catalog queries ---
+# Each helper is a single PostgREST round trip over the shared pooled client.
+# The tools below put the catalog cache in front of them.
+
+def _db():
+    db = get_supabase_client()
+    if not db:
+        raise RuntimeError("Database connection is not available.")
+    return db
+
+def _read_failed(e: Exception, message: str) -> Dict[str, Any]:
+    """The error result for a failed catalog read."""
+    report_supabase_failure(e)
+    if isinstance(e, DatabaseUnavailable):
+        # Retrying right away would only be refused again; say so to the model.
+        return {"status": "error", "error_message": f"{e} Tell the user and don't call this tool again this turn."}
+    return {"status": "error", "error_message": f"{message}: {str(e)}"}
+
+def _canonical(location: Optional[str]) -> Optional[str]:
+    # State normally holds the resolved spelling already; this covers older sessions
+    # and values set before the catalog could be read.
+    return resolve_location(location) or location
+
+def _where_location(query, column: str, location: str):
+    # A resolved catalog spelling matches exactly (and can use the index). Anything
+    # the location index couldn't resolve, or values read while the index is
+    # unavailable, falls back to the case-insensitive match the tools used before.
+    if resolve_location(location) == location:
+        return query.eq(column, location)
+    return query.ilike(column, location)
+
+def _where_locations(query, column: str, locations: List[str]):
+    """_where_location() for a batch: in_() when every name is resolved, else one ilike per name."""
+    if all(resolve_location(location) == location for location in locations):
+        return query.in_(column, locations)
+    return query.or_(",".join(f"{column}.ilike.{_quote(location)}" for location in locations))
+
+# search_hotels shows the best-rated few for the trip's destination and budget level.
+HOTEL_SEARCH_LIMIT = 3
+
+def _fetch_hotels(destination: str, budget_level: str) -> List[Dict[str, Any]]:
+    with timed_db('hotels'):
+        query = _where_location(_db().table('hotels').select(select_columns('hotels')), 'location', destination)
+        response = query.eq('category', budget_level) \
+            .order('rating', desc=True) \
+            .limit(HOTEL_SEARCH_LIMIT) \
+            .execute()
+    report_supabase_success()
+    return response.data or []
+
+# --- Transport pagination ---
+# Transport results come a page at a time, ranked in the database and continued
+# with keyset pagination: the cursor remembers the sort value and id of the last
+# row shown, so "more options" fetches only the next page. Rows with no value
+# in the sort column come last.
+
+# A page never holds more rows than shape_rows() lets through.
+TRANSPORT_PAGE_SIZE = min(int(os.environ.get("TRANSPORT_PAGE_SIZE", str(MAX_ROWS['transport_options']))), MAX_ROWS['transport_options'])
+# Sort keys the tools accept, and the column behind each one. Override with
+# TRANSPORT_SORT_COLUMN_<KEY> if your schema names them differently. Duration
+# sorts on the numeric column from sql/transport_duration_minutes.sql, since the
+# text column orders "10h" before "6h".
+TRANSPORT_SORTS = {"price": "price", "duration": "duration_minutes", "departure_time": "departure_time"}
+
+def _sort_column(sort_by: str) -> str:
+    key = sort_by if sort_by in TRANSPORT_SORTS else "price"
+    return os.environ.get(f"TRANSPORT_SORT_COLUMN_{key.upper()}", TRANSPORT_SORTS[key])
+
+def _encode_cursor(position: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":"), default=str).encode()).decode()
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+def _quote(value: Any) -> str:
+    # PostgREST or=() filters need reserved characters (commas, parentheses, ...) quoted.
+    return f'"{value}"' if isinstance(value, str) else str(value)
+
+def _fetch_transport_page(origin: str, destination: str, mode: Optional[str], sort_column: str,
+                          after: Optional[List[Any]], limit: int) -> List[Dict[str, Any]]:
+    columns = columns_for('transport_options')
+    select = ", ".join(columns + ([sort_column] if columns and sort_column not in columns else [])) or "*"
+    query = _db().table('transport_options').select(select)
+    query = _where_location(_where_location(query, 'origin', origin), 'destination', destination)
+    if mode:
+        query = query.eq('mode', mode.capitalize())
+    if after:
+        value, last_id = after
+        if value is None:
+            query = query.is_(sort_column, 'null').gt('id', last_id)
+        else:
+            query = query.or_(
+                f"{sort_column}.gt.{_quote(value)},"
+                f"and({sort_column}.eq.{_quote(value)},id.gt.{_quote(last_id)}),"
+                f"{sort_column}.is.null"
+            )
+    with timed_db('transport_options'):
+        response = query.order(sort_column, nullsfirst=False).order('id').limit(limit).execute()
+    report_supabase_success()
+    return response.data or []
+
+def _page_from_snapshot(rows: List[Dict[str, Any]], sort_column: str, after: Optional[List[Any]], limit: int) -> List[Dict[str, Any]]:
+    """Same ordering and keyset rule as the database query, applied to snapshot rows."""
+    def key(row):
+        value = row.get(sort_column)
+        return (value is None, value if value is not None else 0, row.get('id'))
+    ordered = sorted(rows, key=key)
+    if after:
+        last = key({sort_column: after[0], 'id': after[1]})
+        ordered = [row for row in ordered if key(row) > last]
+    return ordered[:limit]
+
+def _transport_page(tool_context: ToolContext, origin: str, destination: str, mode: Optional[str],
+                    sort_by: str, after: Optional[List[Any]], page: int) -> Dict[str, Any]:
+    """Loads one page (plus one row to know if there's more), records the cursor and the shortlist."""
+    sort_column = _sort_column(sort_by)
+    snapshot = active_snapshot()
+    rows = snapshot.transport(origin, destination, mode) if snapshot else None
+    if rows is not None:
+        rows = _page_from_snapshot(rows, sort_column, after, TRANSPORT_PAGE_SIZE + 1)
+    else:
+        rows = catalog_cache.get_or_load(
+            'transport_options',
+            make_key(origin=origin, destination=destination, mode=mode, sort=sort_column, after=json.dumps(after, default=str)),
+            lambda: _fetch_transport_page(origin, destination, mode, sort_column, after, TRANSPORT_PAGE_SIZE + 1),
+        )
+
+    has_more = len(rows) > TRANSPORT_PAGE_SIZE
+    rows = rows[:TRANSPORT_PAGE_SIZE]
+    # Shaping can drop rows from the end to fit the token budget; the next page
+    # starts after the last row the user actually sees, so none are skipped.
+    results = shape_rows('transport_options', rows)
+    has_more = has_more or len(results) < len(rows)
+    cursor = None
+    if has_more and results:
+        last = rows[len(results) - 1]
+        cursor = _encode_cursor({"origin": origin, "destination": destination, "mode": mode, "sort_by": sort_by,
+                                 "after": [last.get(sort_column), last.get('id')], "page": page + 1})
+    trip = TripState.from_state(tool_context.state)
+    trip.transport_cursor = cursor
+    trip.commit(tool_context.state)
+
+    _remember_shortlist(tool_context, "transport", results)
+    return {"transport_options": results, "sorted_by": sort_by, "page": page, "has_more": has_more}
+
+# Batched variants for comparisons: one in_-filtered query covers every
+# destination/category (or route) combination; grouping happens here.
+COMPARE_ROW_LIMIT = int(os.environ.get("COMPARE_ROW_LIMIT", "500"))
+
+def _fetch_hotels_batch(destinations: List[str], categories: List[str]) -> List[Dict[str, Any]]:
+    with timed_db('hotels'):
+        query = _where_locations(_db().table('hotels').select(select_columns('hotels')), 'location', destinations)
+        response = query.in_('category', categories) \
+            .order('rating', desc=True) \
+            .limit(COMPARE_ROW_LIMIT) \
+            .execute()
+    report_supabase_success()
+    return response.data or []
+
+def _fetch_transport_batch(origins: List[str], destinations: List[str], mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    query = _db().table('transport_options').select(select_columns('transport_options'))
+    query = _where_locations(_where_locations(query, 'origin', origins), 'destination', destinations)
+    if mode:
+        query = query.eq('mode', mode.capitalize())
+    with timed_db('transport_options'):
+        response = query.order('price').limit(COMPARE_ROW_LIMIT).execute()
+    report_supabase_success()
+    return response.data or []
+
+def _fetch_attractions(destination: str, interests: List[str]) -> List[Dict[str, Any]]:
+    query = _where_location(_db().table('attractions').select(select_columns('attractions')), 'location', destination)
+    if interests:
+        # Note: Supabase Python `in_` filter expects a list of strings
+        interest_list = [i.capitalize() for i in interests]
+        query = query.in_('type', interest_list)
+    with timed_db('attractions'):
+        response = query.limit(5).execute()
+    report_supabase_success()
+    return response.data or []
+
+def _fetch_destination_details(destination: str) -> Dict[str, Any]:
+    db = _db()
+    # Query 1: Get the general description
+    with timed_db('destination_details'):
+        desc_response = _where_location(db.table('destination_details').select('description'), 'location', destination).maybe_single().execute()
+    # Query 2: Get the top attractions
+    with timed_db('attractions'):
+        attr_response = _where_location(db.table('attractions').select('name, type'), 'location', destination).limit(4).execute()
+    report_supabase_success()
+    return {
+        "description": desc_response.data.get('description') if desc_response and desc_response.data else None,
+        "attractions": attr_response.data or [],
+    }
+
+def _fetch_known_locations() -> Dict[str, str]:
+    db = _db()
+    with timed_db('hotels'):
+        hotels = db.table('hotels').select('location').execute().data or []
+    with timed_db('transport_options'):
+        routes = db.table('transport_options').select('origin, destination').execute().data or []
+    with timed_db('attractions'):
+        attractions = db.table('attractions').select('location').execute().data or []
+    with timed_db('destination_details'):
+        details = db.table('destination_details').select('location').execute().data or []
+    report_supabase_success()
+    names = [row.get('location') for row in hotels + attractions + details]
+    for row in routes:
+        names.extend([row.get('origin'), row.get('destination')])
+    return {name.strip().lower(): name.strip() for name in names if name}
+
+def known_locations() -> Dict[str, str]:
+    """Every location the catalog knows about, as {lowercased name: catalog spelling}."""
+    return catalog_cache.get_or_load('locations', make_key(), _fetch_known_locations)
+
+def _fetch_emergency_contacts() -> List[Dict[str, Any]]:
+    with timed_db('emergency_contacts'):
+        response = _db().table('emergency_contacts').select(select_columns('emergency_contacts')).execute()
+    report_supabase_success()
+    return response.data or []
+
+
+@instrument_tool
 def search_hotels(tool_context: ToolContext) -> Dict[str, Any]:
     """
     Searches for hotels in the Supabase database. This tool is a robust,
-    self-contained unit that handles its own connection, validation, and errors.
+    self-contained unit that handles its own validation and errors, and uses
+    the shared pooled connection from supabase_client.
     """
-    try:
-        # It creates its own database connection every time.
-        url: str = os.environ.get("SUPABASE_URL")
-        key: str = os.environ.get("SUPABASE_KEY")
-        if not url or not key:
-            return {"status": "error", "error_message": "Supabase credentials are not configured."}
-        supabase: Client = create_client(url, key)
+    return _search_hotels(tool_context)[0]
 
+def _search_hotels(tool_context: ToolContext) -> Tuple[Dict[str, Any], Optional[List[Dict[str, Any]]]]:
+    """search_hotels' result plus the catalog rows it was built from (None if the search didn't run)."""
+    try:
         # It checks the state for the data it needs BEFORE querying.
-        destination = tool_context.state.get("destination")
+        destination = _canonical(tool_context.state.get("destination"))
         budget_level = tool_context.state.get("budget_level")
 
         if not destination or not budget_level:
-            return {"status": "error", "error_message": "To search for hotels, I need to know both your destination and your budget level (e.g., Budget, Mid-Range, or Luxury)."}
+            return {"status": "error", "error_message": "To search for hotels, I need to know both your destination and your budget level (e.g., Budget, Mid-Range, or Luxury)."}, None
 
-        print(f"TOOL CALLED: Searching Supabase for hotels in {destination}, category: {budget_level}")
+        log.info(f"TOOL CALLED: Searching Supabase for hotels in {destination}, category: {budget_level}")
 
-        response = supabase.table('hotels').select('*') \
-            .ilike('location', destination) \
-            .eq('category', budget_level) \
-            .order('rating', desc=True) \
-            .limit(3) \
-            .execute()
+        snapshot = active_snapshot()
+        rows = snapshot.hotels(destination, budget_level, limit=HOTEL_SEARCH_LIMIT) if snapshot else None
+        if rows is None:
+            rows = catalog_cache.get_or_load(
+                'hotels',
+                make_key(destination=destination, budget_level=budget_level),
+                lambda: _fetch_hotels(destination, budget_level),
+            )
 
-        results = response.data
+        results = shape_rows('hotels', rows)
+        _remember_shortlist(tool_context, "hotel", results)
+        _goal_done(tool_context, "hotels")
 
         # It gracefully handles the "no results" case.
         if not results:
@@ -172,54 +515,45 @@ def search_hotels(tool_context: ToolContext) -> Dict[str, Any]:
                 "status": "success",
                 "hotels": [],
                 "message": f"My search was successful, but I couldn't find any {budget_level} hotels for {destination} in my database. You might want to try a different budget category."
-            }
+            }, rows
         
         for hotel in results:
             price = hotel.get('price_per_night', 0)
             hotel['price_per_night'] = f"₹{price:,}" # Added comma for thousands
 
-        return {"status": "success", "hotels": results}
+        return {"status": "success", "hotels": results}, rows
 
     except Exception as e:
-        print(f"FATAL ERROR in search_hotels: {e}")
-        return {"status": "error", "error_message": f"A critical technical error occurred while searching for hotels: {str(e)}"}
+        log.error(f"FATAL ERROR in search_hotels: {e}")
+        return _read_failed(e, "A critical technical error occurred while searching for hotels"), None
 
 
 # --- Tool 2: find_flights_trains_or_buses ---
+@instrument_tool
 def find_flights_trains_or_buses(
     tool_context: ToolContext,
-    mode: Optional[Literal["Flight", "Train", "Bus", "Car"]] = None
+    mode: Optional[Literal["Flight", "Train", "Bus", "Car"]] = None,
+    sort_by: Optional[Literal["price", "duration", "departure_time"]] = None,
 ) -> Dict[str, Any]:
     """
-    Searches for transport options in the Supabase database. This robust tool
-    handles its own connection, validation, and errors.
+    Searches for transport options in the Supabase database and returns the
+    first page, ranked by price (default), duration or departure_time. If
+    `has_more` is true, more_transport_options returns the next page.
     """
     try:
-        url: str = os.environ.get("SUPABASE_URL")
-        key: str = os.environ.get("SUPABASE_KEY")
-        if not url or not key:
-            return {"status": "error", "error_message": "Supabase credentials are not configured."}
-        supabase: Client = create_client(url, key)
-
-        origin = tool_context.state.get("origin")
-        destination = tool_context.state.get("destination")
+        origin = _canonical(tool_context.state.get("origin"))
+        destination = _canonical(tool_context.state.get("destination"))
+        sort_by = sort_by or "price"
 
         if not origin or not destination:
             return {"status": "error", "error_message": "To find transport options, I need to know both where you're starting from and where you're going."}
 
-        print(f"TOOL CALLED: Searching Supabase transport from {origin} to {destination}, Mode: {mode or 'Any'}")
-
-        query = supabase.table('transport_options').select('*') \
-            .ilike('origin', origin) \
-            .ilike('destination', destination)
-
-        if mode:
-            query = query.eq('mode', mode.capitalize())
+        log.info(f"TOOL CALLED: Searching Supabase transport from {origin} to {destination}, Mode: {mode or 'Any'}, Sort: {sort_by}")
 
-        response = query.execute()
-        results = response.data
+        page = _transport_page(tool_context, origin, destination, mode, sort_by, after=None, page=1)
+        _goal_done(tool_context, "transport")
 
-        if not results:
+        if not page["transport_options"]:
             search_description = f" for mode '{mode}'" if mode else ""
             return {
                 "status": "success",
@@ -227,42 +561,327 @@ def find_flights_trains_or_buses(
                 "message": f"My search was successful, but I couldn't find any direct transport options{search_description} from {origin} to {destination} in my database. Would you like me to check for other modes of transport?"
             }
 
-        return {"status": "success", "transport_options": results}
+        return {"status": "success", **page}
+
+    except Exception as e:
+        log.error(f"FATAL ERROR in find_flights_trains_or_buses: {e}")
+        return _read_failed(e, "A critical technical error occurred while searching for transport")
+
+
+@instrument_tool
+def more_transport_options(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Returns the next page of the last transport search, when the user asks for
+    more options. It continues where the previous page ended instead of
+    searching again.
+    """
+    try:
+        cursor = tool_context.state.get("transport_cursor")
+        if not cursor:
+            return {"status": "success", "transport_options": [], "message": "That was every option I have for this route."}
+        position = _decode_cursor(cursor)
+        log.info(f"TOOL CALLED: more_transport_options page {position['page']} for {position['origin']} -> {position['destination']}")
+
+        page = _transport_page(tool_context, position["origin"], position["destination"], position["mode"],
+                               position["sort_by"], after=position["after"], page=position["page"])
+        return {"status": "success", **page}
+
+    except Exception as e:
+        log.error(f"FATAL ERROR in more_transport_options: {e}")
+        return _read_failed(e, "A critical technical error occurred while loading more transport options")
+
+
+# --- Tool 2b: comparisons across several destinations, budget levels or routes ---
+BUDGET_LEVELS = ("Budget", "Mid-Range", "Luxury")
+
+def _unique(values: List[Any]) -> List[Any]:
+    return list(dict.fromkeys(v for v in values if v))
+
+def _by_price(row: Dict[str, Any]) -> tuple:
+    """Sort key: cheapest first, rows without a price last (not as if they were free)."""
+    price = row.get('price')
+    return (price is None, price)
+
+def _group_top_k(rows: List[Dict[str, Any]], fields: tuple, groups: List[tuple], top_k: int, sort_key=None) -> Dict[tuple, List[Dict[str, Any]]]:
+    """Buckets rows by `fields` (case-insensitively) and keeps the first top_k per requested group."""
+    wanted = {tuple(str(v).lower() for v in group): group for group in groups}
+    grouped: Dict[tuple, List[Dict[str, Any]]] = {group: [] for group in groups}
+    for row in (sorted(rows, key=sort_key) if sort_key else rows):
+        group = wanted.get(tuple(str(row.get(f, '')).lower() for f in fields))
+        if group is not None and len(grouped[group]) < top_k:
+            grouped[group].append(row)
+    return grouped
+
+@instrument_tool
+def compare_hotels(
+    tool_context: ToolContext,
+    destinations: Optional[List[str]] = None,
+    budget_levels: Optional[List[str]] = None,
+    top_k: int = 3,
+) -> Dict[str, Any]:
+    """
+    Compares the best-rated hotels across several destinations and/or budget
+    levels in one search, e.g. destinations=["Udaipur", "Jaipur", "Jodhpur"] or
+    budget_levels=["Budget", "Mid-Range"]. Missing lists fall back to the trip's
+    destination and budget level (or all three levels).
+    """
+    try:
+        destinations = _unique([_canonical(d) for d in (destinations or [tool_context.state.get("destination")])])
+        if budget_levels:
+            levels = _unique([normalize_trip_parameters(budget=b).get('budget_level') for b in budget_levels])
+        else:
+            levels = [tool_context.state.get("budget_level")] if tool_context.state.get("budget_level") else list(BUDGET_LEVELS)
+        top_k = max(1, min(int(top_k or 3), MAX_ROWS['hotels']))
+
+        if not destinations:
+            return {"status": "error", "error_message": "Which destinations would you like me to compare hotels in?"}
+
+        log.info(f"TOOL CALLED: compare_hotels in {destinations}, levels: {levels}, top {top_k}")
+        groups = [(d, level) for d in destinations for level in levels]
+
+        snapshot = active_snapshot()
+        found = {g: snapshot.hotels(g[0], g[1], limit=top_k) for g in groups} if snapshot else {}
+        pending = [g for g in groups if found.get(g) is None]
+        if pending:
+            rows = catalog_cache.get_or_load(
+                'hotels',
+                make_key(destinations=[g[0] for g in pending], budget_levels=[g[1] for g in pending]),
+                lambda: _fetch_hotels_batch(_unique([g[0] for g in pending]), _unique([g[1] for g in pending])),
+            )
+            found.update(_group_top_k(rows, ('location', 'category'), pending, top_k))
+
+        comparison, shortlist = [], []
+        for destination, level in groups:
+            hotels = shape_rows('hotels', found.get((destination, level)) or [])
+            shortlist.extend(dict(h) for h in hotels)
+            for hotel in hotels:
+                hotel['price_per_night'] = f"₹{hotel.get('price_per_night', 0):,}"
+            comparison.append({"destination": destination, "budget_level": level, "hotels": hotels})
+        _remember_shortlist(tool_context, "hotel", shortlist)
+        _goal_done(tool_context, "hotels")
+
+        empty = [f"{c['budget_level']} in {c['destination']}" for c in comparison if not c['hotels']]
+        result = {"status": "success", "comparison": comparison}
+        if empty:
+            result["message"] = f"I couldn't find any hotels for: {', '.join(empty)}."
+        return result
+
+    except Exception as e:
+        log.error(f"FATAL ERROR in compare_hotels: {e}")
+        return _read_failed(e, "A critical technical error occurred while comparing hotels")
+
+@instrument_tool
+def compare_transport(
+    tool_context: ToolContext,
+    origins: Optional[List[str]] = None,
+    destinations: Optional[List[str]] = None,
+    mode: Optional[Literal["Flight", "Train", "Bus", "Car"]] = None,
+    top_k: int = 3,
+) -> Dict[str, Any]:
+    """
+    Compares the cheapest transport options for every origin/destination pair
+    in one search, e.g. origins=["Delhi"], destinations=["Jaipur", "Udaipur"].
+    Missing lists fall back to the trip's origin and destination.
+    """
+    try:
+        origins = _unique([_canonical(o) for o in (origins or [tool_context.state.get("origin")])])
+        destinations = _unique([_canonical(d) for d in (destinations or [tool_context.state.get("destination")])])
+        top_k = max(1, min(int(top_k or 3), MAX_ROWS['transport_options']))
+
+        if not origins or not destinations:
+            return {"status": "error", "error_message": "To compare transport, I need to know where you're starting from and where you're going."}
+
+        log.info(f"TOOL CALLED: compare_transport {origins} -> {destinations}, Mode: {mode or 'Any'}")
+        routes = [(o, d) for o in origins for d in destinations if o.lower() != d.lower()]
+
+        snapshot = active_snapshot()
+        found = {}
+        for route in routes:
+            rows = snapshot.transport(route[0], route[1], mode) if snapshot else None
+            if rows is not None:
+                found[route] = sorted(rows, key=_by_price)[:top_k]
+        pending = [r for r in routes if r not in found]
+        if pending:
+            rows = catalog_cache.get_or_load(
+                'transport_options',
+                make_key(origins=[r[0] for r in pending], destinations=[r[1] for r in pending], mode=mode),
+                lambda: _fetch_transport_batch(_unique([r[0] for r in pending]), _unique([r[1] for r in pending]), mode),
+            )
+            found.update(_group_top_k(rows, ('origin', 'destination'), pending, top_k, sort_key=_by_price))
+
+        comparison, shortlist = [], []
+        for origin, destination in routes:
+            options = shape_rows('transport_options', found.get((origin, destination)) or [])
+            shortlist.extend(options)
+            comparison.append({"origin": origin, "destination": destination, "transport_options": options})
+        _remember_shortlist(tool_context, "transport", shortlist)
+        _goal_done(tool_context, "transport")
+
+        empty = [f"{c['origin']} to {c['destination']}" for c in comparison if not c['transport_options']]
+        result = {"status": "success", "comparison": comparison}
+        if empty:
+            result["message"] = f"I couldn't find any direct transport for: {', '.join(empty)}."
+        return result
+
+    except Exception as e:
+        log.error(f"FATAL ERROR in compare_transport: {e}")
+        return _read_failed(e, "A critical technical error occurred while comparing transport")
+
+
+# --- Budget estimate ---
+# Prices real itineraries (hotel stay + outbound + return + daily expenses) from
+# the catalog via itinerary_costing. The flat per-day rate is only used when the
+# catalog has no hotels for the trip or NumPy isn't installed.
+
+COSTING_CANDIDATES = int(os.environ.get("COSTING_CANDIDATES", "50"))
+FLAT_COST_PER_DAY = 8000
+FLAT_MULTIPLIERS = {"Budget": 0.7, "Mid-Range": 1.2, "Luxury": 2.5}
+
+def _costing_rows(origin: Optional[str], destination: str, budget_level: str,
+                  hotels: Optional[List[Dict[str, Any]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Candidate hotels and both legs for one trip, from the snapshot or one batched
+    query each. Hotels already fetched by the caller are priced instead of re-read.
+    """
+    snapshot = active_snapshot()
+    if hotels is None and snapshot:
+        hotels = snapshot.hotels(destination, budget_level, limit=COSTING_CANDIDATES)
+    if hotels is None:
+        rows = catalog_cache.get_or_load(
+            'hotels',
+            make_key(destinations=[destination], budget_levels=[budget_level]),
+            lambda: _fetch_hotels_batch([destination], [budget_level]),
+        )
+        hotels = _group_top_k(rows, ('location', 'category'), [(destination, budget_level)], COSTING_CANDIDATES)[(destination, budget_level)]
+
+    legs = {"outbound": [], "return": []}
+    if origin and origin.lower() != destination.lower():
+        routes = {"outbound": (origin, destination), "return": (destination, origin)}
+        found = {leg: snapshot.transport(*route) for leg, route in routes.items()} if snapshot else {}
+        pending = [leg for leg in routes if found.get(leg) is None]
+        if pending:
+            rows = catalog_cache.get_or_load(
+                'transport_options',
+                make_key(origins=[routes[leg][0] for leg in pending], destinations=[routes[leg][1] for leg in pending], mode=None),
+                lambda: _fetch_transport_batch(_unique([routes[leg][0] for leg in pending]), _unique([routes[leg][1] for leg in pending])),
+            )
+            grouped = _group_top_k(rows, ('origin', 'destination'), [routes[leg] for leg in pending], COSTING_CANDIDATES)
+            found.update({leg: grouped[routes[leg]] for leg in pending})
+        legs = {leg: found.get(leg) or [] for leg in routes}
+    return {"hotels": hotels, **legs}
+
+def _describe_itinerary(itinerary: Dict[str, Any], nights: int) -> Dict[str, Any]:
+    parts = itinerary["parts"]
+    described = {"total_cost": f"₹{itinerary['total']:,.0f}", "within_budget": itinerary["within_budget"]}
+    hotel = parts.get("hotel")
+    if hotel:
+        described["hotel"] = {"id": hotel.get('id'), "name": hotel.get('name'), "nights": nights,
+                              "price_per_night": f"₹{hotel.get('price_per_night') or 0:,}"}
+    for leg in ("outbound", "return"):
+        option = parts.get(leg)
+        if option:
+            described[leg] = {"id": option.get('id'), "provider": option.get('provider'), "mode": option.get('mode'),
+                              "price": f"₹{option.get('price') or 0:,}"}
+    return described
+
+@instrument_tool
+def get_budget_estimate(tool_context: ToolContext, top_k: int = 3) -> dict:
+    """
+    Estimates the trip cost from real catalog prices: every combination of a
+    hotel for the trip's budget level, an outbound and a return option, plus
+    daily expenses. Returns the top_k cheapest itineraries that fit the user's
+    budget amount (if they gave one).
+    """
+    return _estimate_budget(tool_context, top_k)
+
+def _estimate_budget(tool_context: ToolContext, top_k: int = 3, hotels: Optional[List[Dict[str, Any]]] = None) -> dict:
+    """get_budget_estimate, optionally pricing hotel rows the caller already has."""
+    try:
+        trip = TripState.from_state(tool_context.state)
+        duration_days, budget_level, budget_amount = trip.duration_days, trip.budget_level, trip.budget_amount
+        if not all([duration_days, budget_level]):
+            return {"status": "error", "error_message": "Missing duration or budget_level."}
+        destination = _canonical(trip.destination)
+        origin = _canonical(trip.origin)
+        top_k = max(1, min(int(top_k or 3), 5))
+        nights = max(1, duration_days - 1)
 
+        itineraries = []
+        if destination:
+            try:
+                from itinerary_costing import Component, DAILY_EXPENSES, rank_itineraries
+            except ImportError:
+                log.error("TOOL: NumPy is not installed; using the flat per-day budget rate")
+            else:
+                try:
+                    rows = _costing_rows(origin, destination, budget_level, hotels)
+                except Exception as e:
+                    log.error(f"TOOL: could not load prices for costing ({e}); using the flat per-day budget rate")
+                    report_supabase_failure(e)
+                    rows = {"hotels": []}
+                if rows["hotels"]:
+                    itineraries = rank_itineraries(
+                        [Component("hotel", rows["hotels"], "price_per_night", nights),
+                         Component("outbound", rows["outbound"], "price"),
+                         Component("return", rows["return"], "price")],
+                        budget=float(budget_amount) if budget_amount else None,
+                        top_k=top_k,
+                        fixed_cost=DAILY_EXPENSES.get(budget_level, DAILY_EXPENSES["Mid-Range"]) * duration_days,
+                    )
+
+        if not itineraries:
+            total = FLAT_COST_PER_DAY * duration_days * FLAT_MULTIPLIERS.get(budget_level, 1.2)
+            trip.calculated_budget_total = total
+            trip.commit(tool_context.state)
+            return {"status": "success", "budget_estimate": {"total_cost": f"₹{total:,.0f}", "level": budget_level, "method": "flat_rate"}}
+
+        total = itineraries[0]["total"]
+        trip.calculated_budget_total = total
+        trip.commit(tool_context.state)
+        estimate = {
+            "total_cost": f"₹{total:,.0f}",
+            "level": budget_level,
+            "method": "catalog_prices",
+            "itineraries": [_describe_itinerary(i, nights) for i in itineraries],
+        }
+        if budget_amount:
+            estimate["budget"] = f"₹{int(budget_amount):,}"
+            estimate["fits_budget"] = itineraries[0]["within_budget"]
+        if origin and not (rows["outbound"] and rows["return"]):
+            estimate["note"] = f"No transport between {origin} and {destination} is in my database, so travel there and back isn't included."
+        return {"status": "success", "budget_estimate": estimate}
     except Exception as e:
-        print(f"FATAL ERROR in find_flights_trains_or_buses: {e}")
-        return {"status": "error", "error_message": f"A critical technical error occurred while searching for transport: {str(e)}"}
+        log.error(f"ERROR in get_budget_estimate: {e}")
+        return {"status": "error", "error_message": f"Budget calculation failed: {str(e)}"}
 
 
 # --- Tool 3: get_location_suggestions ---
+@instrument_tool
 def get_location_suggestions(tool_context: ToolContext) -> dict:
     """
     Retrieves attraction suggestions from Supabase. This robust tool handles
-    its own connection, validation, and errors.
+    its own validation and errors over the shared pooled connection.
     """
     try:
-        url: str = os.environ.get("SUPABASE_URL")
-        key: str = os.environ.get("SUPABASE_KEY")
-        if not url or not key: return {"status": "error", "error_message": "Supabase credentials not set."}
-        db: Client = create_client(url, key)
-
-        destination = tool_context.state.get("destination")
+        destination = _canonical(tool_context.state.get("destination"))
         interests = tool_context.state.get("interests", [])
         
         if not destination:
             return {"status": "error", "error_message": "I need a destination before I can suggest attractions."}
 
-        print(f"TOOL CALLED: Searching Supabase for attractions in {destination}, Interests: {interests}")
-        
-        query = db.table('attractions').select('name, type, summary').ilike('location', destination)
-        
-        if interests:
-            # Note: Supabase Python `in_` filter expects a list of strings
-            interest_list = [i.capitalize() for i in interests]
-            query = query.in_('type', interest_list)
+        log.info(f"TOOL CALLED: Searching Supabase for attractions in {destination}, Interests: {interests}")
         
-        response = query.limit(5).execute()
-        results = response.data
+        snapshot = active_snapshot()
+        results = snapshot.attractions(destination, interests) if snapshot else None
+        if results is None:
+            results = catalog_cache.get_or_load(
+                'attractions',
+                make_key(destination=destination, interests=interests),
+                lambda: _fetch_attractions(destination, interests),
+            )
+
+        results = shape_rows('attractions', results)
+        _goal_done(tool_context, "suggestions")
 
         if not results:
             return {
@@ -273,64 +892,54 @@ def get_location_suggestions(tool_context: ToolContext) -> dict:
 
         return {"status": "success", "suggestions": results}
     except Exception as e:
-        print(f"FATAL ERROR in get_location_suggestions: {e}")
-        return {"status": "error", "error_message": f"A database error occurred while getting suggestions: {e}"}
+        log.error(f"FATAL ERROR in get_location_suggestions: {e}")
+        return _read_failed(e, "A database error occurred while getting suggestions")
 
+@instrument_tool
 def get_destination_info(tool_context: ToolContext, destination: Optional[str]) -> dict:
     """
     Retrieves a general description and a list of popular attractions for a
     destination by querying the Supabase database.
     """
     try:
-        # Get the database connection
-        db = get_supabase_client() 
-        if not db:
-             return {"status": "error", "error_message": "Database connection is not available."}
-
-        target_destination = destination or tool_context.state.get("destination")
+        target_destination = _canonical(destination or tool_context.state.get("destination"))
 
         if not target_destination:
             return {"status": "error", "error_message": "A destination has not been set. Please tell me which city you're interested in."}
             
-        print(f"TOOL CALLED: get_destination_info for {target_destination} from Supabase")
+        log.info(f"TOOL CALLED: get_destination_info for {target_destination} from Supabase")
         
-        # Query 1: Get the general description (using the 'db' variable)
-        desc_response = db.table('destination_details').select('description').eq('location', destination.capitalize()).single().execute()
-        description = desc_response.data.get('description', f"A popular travel destination in India.") if desc_response.data else f"A popular travel destination."
-
-        # Query 2: Get the top attractions (using the 'db' variable)
-        attr_response = db.table('attractions').select('name, type').eq('location', destination.capitalize()).limit(4).execute()
-        attractions = attr_response.data if attr_response.data else []
+        details = catalog_cache.get_or_load(
+            'destination_details',
+            make_key(destination=target_destination),
+            lambda: _fetch_destination_details(target_destination),
+        )
+        description = details["description"] or "A popular travel destination."
+        description = shape_rows('destination_details', [{"description": description}])[0]["description"]
 
         return {
             "status": "success",
             "destination_info": {
                 "summary": description,
-                "popular_attractions": attractions
+                "popular_attractions": details["attractions"]
             }
         }
         
     except Exception as e:
-        print(f"ERROR in get_destination_info: {e}")
-        return {"status": "error", "error_message": f"An error occurred while fetching destination info: {str(e)}"}
+        log.error(f"ERROR in get_destination_info: {e}")
+        return _read_failed(e, "An error occurred while fetching destination info")
 
 
 # --- Tool 2: get_emergency_contacts (Corrected) ---
+@instrument_tool
 def get_emergency_contacts(tool_context: ToolContext) -> dict:
     """
     Retrieves the general emergency contact numbers for India from the Supabase database.
     """
     try:
-        # Get the database connection
-        db = get_supabase_client() 
-        if not db:
-             return {"status": "error", "error_message": "Database connection is not available."}
-
-        print(f"TOOL CALLED: get_emergency_contacts from Supabase")
+        log.info("TOOL CALLED: get_emergency_contacts from Supabase")
         
-        # Make the query using the 'db' variable
-        response = db.table('emergency_contacts').select('type, number, description').execute()
-        contacts = response.data
+        contacts = shape_rows('emergency_contacts', catalog_cache.get_or_load('emergency_contacts', make_key(), _fetch_emergency_contacts))
 
         if not contacts:
             return {"status": "success", "contacts": [], "message": "I could not find any emergency contacts in the database."}
@@ -341,6 +950,106 @@ def get_emergency_contacts(tool_context: ToolContext) -> dict:
         }
 
     except Exception as e:
-        print(f"ERROR in get_emergency_contacts: {e}")
-        return {"status": "error", "error_message": f"An error occurred while fetching emergency contacts: {str(e)}"}
+        log.error(f"ERROR in get_emergency_contacts: {e}")
+        return _read_failed(e, "An error occurred while fetching emergency contacts")
+
+
+# --- Tool 4: plan_trip (bundle) ---
+# The lookups run in parallel worker threads, so each gets a staged copy of the
+# state: its writes are held back and applied one lookup at a time on the event
+# loop afterwards. Sharing tool_context.state would let their TripState commits
+# race and lose trip_version increments or _goal_done updates.
+
+class _StagedState(dict):
+    """A copy of the session state that records what was written to it."""
+
+    def __init__(self, state):
+        super().__init__(state.to_dict() if hasattr(state, "to_dict") else state)
+        self.writes: Dict[str, Any] = {}
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self.writes[key] = value
+
+    def pop(self, key: str, *default: Any) -> Any:
+        # TripState.commit() removes cleared fields from mappings that allow it.
+        self.writes[key] = CLEARED
+        return super().pop(key, *default)
+
+class _StagedContext:
+    """The tool context with a staged state; everything else is the real context."""
+
+    def __init__(self, tool_context: ToolContext):
+        self._context = tool_context
+        self.state = _StagedState(tool_context.state)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._context, name)
+
+def _apply_staged(tool_context: ToolContext, staged: _StagedContext) -> None:
+    writes = {key: value for key, value in staged.state.writes.items() if key != VERSION_KEY}
+    trip = TripState.from_state(tool_context.state)
+    trip.update(writes)
+    trip.commit(tool_context.state)
+    for key, value in writes.items():
+        if key not in FIELDS:
+            tool_context.state[key] = value
+
+def _hotels_then_budget(hotel_context: _StagedContext, budget_context: _StagedContext) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    hotels, rows = _search_hotels(hotel_context)
+    # The search only holds every costing candidate when it came back short of
+    # its limit; then the estimate prices those rows instead of reading them
+    # again. Otherwise it loads the full candidate set, like get_budget_estimate.
+    exhaustive = rows is not None and len(rows) < HOTEL_SEARCH_LIMIT
+    return hotels, _estimate_budget(budget_context, hotels=rows if exhaustive else None)
+
+@instrument_tool
+async def plan_trip(tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Runs the hotel, transport, attraction and budget lookups for the current
+    trip concurrently and returns them together. Each part carries its own
+    status, so one failed lookup doesn't hide the others.
+    """
+    log.info(f"TOOL CALLED: plan_trip for {tool_context.state.get('origin')} -> {tool_context.state.get('destination')}")
+
+    staged = {part: _StagedContext(tool_context) for part in ("hotels", "budget", "transport", "suggestions")}
+    outcomes = await asyncio.gather(
+        run_db_call(_hotels_then_budget, staged["hotels"], staged["budget"]),
+        run_db_call(find_flights_trains_or_buses, staged["transport"]),
+        run_db_call(get_location_suggestions, staged["suggestions"]),
+        return_exceptions=True,
+    )
+
+    results: Dict[str, Any] = {}
+    for parts, outcome in zip((("hotels", "budget"), ("transport",), ("suggestions",)), outcomes):
+        if isinstance(outcome, Exception):
+            outcome = tuple({"status": "error", "error_message": f"The {part} lookup failed: {outcome}"} for part in parts)
+        elif len(parts) == 1:
+            outcome = (outcome,)
+        results.update(zip(parts, outcome))
+
+    # Back on the event loop: apply each lookup's state writes in turn.
+    for part in ("hotels", "transport", "suggestions", "budget"):
+        _apply_staged(tool_context, staged[part])
+
+    plan = {part: results[part] for part in ("hotels", "transport", "suggestions", "budget")}
+    succeeded = [part for part, result in plan.items() if result.get("status") == "success"]
+    if not succeeded:
+        return {"status": "error", "error_message": "I couldn't gather any part of the trip plan. Please check the trip details and try again.", "plan": plan}
+    return {"status": "success", "plan": plan}
+
 
+# --- Async variants of the database tools ---
+# Same names and signatures as above, but the blocking PostgREST call runs on
+# the bounded supabase-io thread pool, so concurrent sessions overlap their I/O.
+# store_trip_parameters reads the catalog when the location index is cold.
+store_trip_parameters_async = async_tool(store_trip_parameters)
+search_hotels_async = async_tool(search_hotels)
+find_flights_trains_or_buses_async = async_tool(find_flights_trains_or_buses)
+more_transport_options_async = async_tool(more_transport_options)
+get_budget_estimate_async = async_tool(get_budget_estimate)
+compare_hotels_async = async_tool(compare_hotels)
+compare_transport_async = async_tool(compare_transport)
+get_location_suggestions_async = async_tool(get_location_suggestions)
+get_destination_info_async = async_tool(get_destination_info)
+get_emergency_contacts_async = async_tool(get_emergency_contacts)
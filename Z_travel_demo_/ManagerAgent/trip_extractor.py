@@ -0,0 +1,242 @@
+# File: trip_extractor.py
+# Rule-based extraction of trip details from the raw user message. It runs before
+# planning_and_booking_agent so the agent doesn't have to spend a whole model turn
+# ("Phase 1") just to call store_trip_parameters.
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from tools_common import normalize_trip_parameters
+from location_index import location_index
+from trip_state import TripState
+from metrics import get_logger
+
+log = get_logger("trip_extractor")
+
+INTEREST_WORDS = {
+    "adventure": "adventure", "trekking": "adventure", "hiking": "adventure", "rafting": "adventure",
+    "beach": "beach", "beaches": "beach",
+    "history": "history", "historical": "history", "heritage": "history", "forts": "history", "palaces": "history",
+    "nature": "nature", "mountains": "nature", "lakes": "nature",
+    "culture": "culture", "cultural": "culture",
+    "food": "food", "cuisine": "food",
+    "shopping": "shopping",
+    "nightlife": "nightlife",
+    "spiritual": "spiritual", "temples": "spiritual", "religious": "spiritual",
+    "wildlife": "wildlife", "safari": "wildlife",
+}
+
+# What the user is trying to get done, and the state each goal needs.
+GOAL_PATTERNS = {
+    "hotels": re.compile(r"\b(hotels?|stay|accommodation|room)\b"),
+    "transport": re.compile(r"\b(flights?|trains?|bus(es)?|cabs?|transport|get there|travel from)\b"),
+    "suggestions": re.compile(r"\b(things to do|attractions|suggest|places to (see|visit)|sightseeing)\b"),
+}
+GOAL_REQUIREMENTS = {
+    "hotels": ("destination", "budget_level"),
+    "transport": ("origin", "destination"),
+    "suggestions": ("destination",),
+}
+QUESTIONS = {
+    "destination": "Where would you like to go?",
+    "origin": "Where will you be travelling from?",
+    "budget_level": "What is your budget like?",
+    "duration_days": "How many days are you planning for?",
+}
+
+DURATION = re.compile(r"\b(\d+)\s*(?:-\s*)?(days?|nights?)\b")
+WEEK = re.compile(r"\b(a|one|1)\s+week\b")
+WEEKEND = re.compile(r"\bweekend\b")
+BUDGET_NUMBER = re.compile(r"(?:₹|rs\.?|inr|budget(?: of| is)?)\s*(\d[\d,]*)|\b(\d[\d,]{3,})\b")
+BUDGET_WORDS = re.compile(r"\b(luxury|luxurious|high[- ]end|cheap|low[- ]cost|budget|mid[- ]range|moderate)\b")
+# Checked in this order, so "my budget is luxury" reads as luxury, not as "budget".
+BUDGET_TIERS = (
+    ("luxury", re.compile(r"\b(luxury|luxurious|high[- ]end|premium)\b")),
+    ("mid-range", re.compile(r"\b(mid[- ]range|moderate|mid)\b")),
+    ("budget", re.compile(r"\b(cheap|low[- ]cost|affordable|budget[- ](?:trip|hotels?|friendly|stay)|on a budget)\b")),
+)
+DATE = re.compile(
+    r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*(?:,?\s+\d{4})?"
+    r"|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?"
+    r"|today|tomorrow|next (?:week|month|monday|tuesday|wednesday|thursday|friday|saturday|sunday))\b"
+)
+# Words that carry no request of their own; a message made only of these plus
+# extracted details is a "details only" turn.
+FILLER = set("""
+a an the i im i'm am is are my me we our us it its to from in for of on at and or with about around
+want would like need planning plan trip travel travelling traveling going go visit visiting
+budget days day nights night week weekend date rs inr please ok okay yes yeah sure also just
+interested into love enjoy something
+""".split())
+ACTION_WORDS = re.compile(
+    r"\b(find|search|show|book|suggest|recommend|what|how|which|where|when|can|could|list|compare|cheapest|more"
+    r"|tell|about|weather|emergency)\b|\?"
+)
+# Questions for info_agent. A city named in one ("weather in Jaipur tomorrow")
+# is not the trip's destination, so these turns never touch trip state.
+INFO_WORDS = re.compile(
+    r"\b(tell me|(?:know|info|information|more) about|weather|forecast|temperature|emergency|police|ambulance|helpline|flight status)\b"
+)
+
+
+class Prefill(NamedTuple):
+    state_delta: Dict[str, Any]   # values to write to session state before the agent runs
+    reply: Optional[str]          # a templated reply when no LLM call is needed this turn
+
+
+def _trip_endpoints(message: str, hits: List[tuple]) -> Dict[str, str]:
+    """
+    Origin and destination from the (start, end, location) matches in a message,
+    read in the order they appear: "from X" is the origin, "to X" the
+    destination, and in "X to Y" X is the origin. A lone city with no cue is
+    the destination; several cities with no cues are left for the planner.
+    """
+    hits = sorted(hits)
+    roles: Dict[str, str] = {}
+    unplaced = []
+    for i, (start, end, location) in enumerate(hits):
+        if location in roles.values():
+            continue
+        before = (message[:start].split()[-1:] or [""])[0]
+        after = (message[end:].split()[:1] or [""])[0]
+        if before == "from" and "origin" not in roles:
+            roles["origin"] = location
+        elif before in ("to", "towards") and "destination" not in roles:
+            roles["destination"] = location
+        elif after == "to" and i + 1 < len(hits) and "origin" not in roles:
+            roles["origin"] = location
+        else:
+            unplaced.append(location)
+    unplaced = [location for location in unplaced if location not in roles.values()]
+    if len(unplaced) == 1 and "destination" not in roles:
+        roles["destination"] = unplaced[0]
+    return roles
+
+
+def extract_trip_parameters(text: str, locations: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Pulls destination/origin (catalog locations and their aliases, returned in
+    the catalog's spelling), duration, budget, travel date and interests out of
+    a message and normalizes them exactly like store_trip_parameters does.
+    """
+    message = " ".join((text or "").lower().split())
+    raw: Dict[str, Any] = {}
+
+    if locations is None:
+        try:
+            locations = location_index().surface_forms()
+        except Exception as e:
+            # Without the catalog we can still pick up duration, budget and the rest.
+            log.error(f"TRIP EXTRACTOR: could not load known locations: {e}")
+            locations = {}
+    hits = []
+    for name in sorted(locations, key=len, reverse=True):
+        match = re.search(rf"\b{re.escape(name)}\b", message)
+        if not match:
+            continue
+        hits.append((match.start(), match.end(), locations[name]))
+        # Blank it out so "udaipur" doesn't also match inside a longer name.
+        message = message[:match.start()] + " " * len(name) + message[match.end():]
+    raw.update(_trip_endpoints(message, hits))
+
+    duration = DURATION.search(message)
+    if duration:
+        raw["duration_days"] = duration.group(1)
+    elif WEEK.search(message):
+        raw["duration_days"] = "7"
+    elif WEEKEND.search(message):
+        raw["duration_days"] = "2"
+
+    for number in BUDGET_NUMBER.finditer(message):
+        value = (number.group(1) or number.group(2)).replace(",", "")
+        # Skip numbers that are really durations ("10 days") or years.
+        if duration and number.start() <= duration.start() < number.end() + 1:
+            continue
+        if len(value) == 4 and value.startswith(("19", "20")) and not number.group(1):
+            continue
+        raw["budget"] = value
+        break
+    if "budget" not in raw:
+        raw_budget = next((tier for tier, pattern in BUDGET_TIERS if pattern.search(message)), None)
+        if raw_budget:
+            raw["budget"] = raw_budget
+
+    date = DATE.search(message)
+    if date:
+        raw["travel_date"] = date.group(1)
+
+    interests: List[str] = []
+    for word in re.findall(r"[a-z]+", message):
+        interest = INTEREST_WORDS.get(word)
+        if interest and interest not in interests:
+            interests.append(interest)
+    if interests:
+        raw["interests"] = interests
+
+    return normalize_trip_parameters(**raw)
+
+
+def _is_details_only(text: str, extracted: Dict[str, Any]) -> bool:
+    message = " ".join((text or "").lower().split())
+    if not extracted or ACTION_WORDS.search(message):
+        return False
+    for value in extracted.values():
+        for part in (value if isinstance(value, list) else [value]):
+            message = message.replace(str(part).lower(), " ")
+    leftover = [w for w in re.findall(r"[a-z']+", message) if w not in FILLER and w not in INTEREST_WORDS]
+    leftover = [w for w in leftover if not BUDGET_WORDS.fullmatch(w) and not DATE.fullmatch(w)]
+    return len(leftover) <= 1
+
+
+def prefill_turn(text: str, state: Dict[str, Any]) -> Prefill:
+    """
+    Decides what to do with a planning turn before any LLM is involved:
+    - informational questions are left alone: no state writes, no reply;
+    - details are written to state up front;
+    - a details-only message that completes a pending search goes straight to
+      the planner (Phase 2), with nothing left for Phase 1 to do;
+    - any other details-only message is answered with a template asking for
+      the next missing detail, so it costs zero LLM calls.
+    """
+    if INFO_WORDS.search((text or "").lower()):
+        return Prefill({}, None)
+    extracted = extract_trip_parameters(text)
+    trip = TripState.from_state(state)
+    trip.update(extracted)
+    merged = dict(state)
+    merged.update(extracted)
+
+    message = (text or "").lower()
+    goal = next((name for name, pattern in GOAL_PATTERNS.items() if pattern.search(message)), None)
+    if goal:
+        trip.pending_goal = goal
+    goal = trip.pending_goal
+
+    prefilled = ", ".join(sorted(key for key, value in extracted.items() if value is not None))
+    if prefilled != (trip.trip_prefilled or ""):
+        trip.trip_prefilled = prefilled
+    delta = trip.delta()
+
+    if not _is_details_only(text, extracted):
+        return Prefill(delta, None)
+
+    if goal:
+        missing = [key for key in GOAL_REQUIREMENTS[goal] if not merged.get(key)]
+        if not missing:
+            return Prefill(delta, None)
+    else:
+        missing = [key for key in ("destination", "budget_level", "duration_days") if not merged.get(key)]
+
+    noted = []
+    if "destination" in extracted: noted.append(f"heading to {extracted['destination']}")
+    if "origin" in extracted: noted.append(f"travelling from {extracted['origin']}")
+    if "duration_days" in extracted: noted.append(f"{extracted['duration_days']} days")
+    if "budget_level" in extracted: noted.append(f"a {extracted['budget_level']} stay")
+    if "travel_date" in extracted: noted.append(f"leaving {extracted['travel_date']}")
+    if "interests" in extracted: noted.append(f"interested in {', '.join(extracted['interests'])}")
+    reply = f"Got it: {', '.join(noted)}." if noted else "Got it."
+    if missing:
+        reply += " " + QUESTIONS[missing[0]]
+    else:
+        reply += " Would you like me to find hotels, transport options, or things to do?"
+    return Prefill(delta, reply)
@@ -0,0 +1,138 @@
+# File: trip_state.py
+# A typed view of the trip details kept in session state. Tools load a TripState
+# from tool_context.state, read and assign attributes, and commit() writes back
+# only the fields whose value actually changed, plus a version number. ADK
+# persists a turn's state writes as that event's state_delta, so unchanged
+# details are no longer rewritten into every event. The fields stay as top-level
+# session keys because the agent instructions template them ({destination?}).
+# to_compact() / from_compact() give a positional form for snapshots and logs.
+# A cleared field is removed from state: deleted where the mapping allows it,
+# otherwise (ADK's State can't delete keys) written as CLEARED, which templates
+# render as nothing and from_state() reads back as None.
+
+import json
+from typing import Any, Dict, List, Mapping, MutableMapping
+
+VERSION_KEY = "trip_version"
+CLEARED = ""
+# Bump when FIELDS changes order; from_compact() refuses other layouts.
+COMPACT_LAYOUT = 1
+
+# Field order is the compact layout: append new fields at the end, never reorder.
+FIELDS = (
+    "destination", "origin", "travel_date", "duration_days", "budget_level", "budget_amount",
+    "interests", "calculated_budget_total", "pending_goal", "trip_prefilled",
+    "hotel_shortlist", "transport_shortlist", "selected_hotel_id", "selected_transport_id",
+    "transport_cursor",
+    "user_name", "user_contact", "user_authenticated",
+)
+# The signed-in user; everything else describes the trip.
+USER_FIELDS = ("user_name", "user_contact", "user_authenticated")
+TRIP_FIELDS = tuple(field for field in FIELDS if field not in USER_FIELDS)
+
+_INT_FIELDS = {"duration_days", "budget_amount", "user_authenticated"}
+
+
+def _coerce(field: str, value: Any) -> Any:
+    if value is None or value == CLEARED:
+        return None
+    if field in _INT_FIELDS:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if field == "interests" and isinstance(value, str):
+        return [value]
+    return value
+
+
+class TripState:
+    """Trip and user details with dirty tracking. Assigning an equal value is a no-op."""
+
+    __slots__ = FIELDS + ("version", "_dirty")
+
+    def __init__(self, **values: Any):
+        object.__setattr__(self, "version", 0)
+        object.__setattr__(self, "_dirty", set())
+        for field in FIELDS:
+            object.__setattr__(self, field, _coerce(field, values.get(field)))
+
+    def __setattr__(self, field: str, value: Any) -> None:
+        if field not in FIELDS:
+            raise AttributeError(f"TripState has no field '{field}'")
+        value = _coerce(field, value)
+        if getattr(self, field) != value:
+            object.__setattr__(self, field, value)
+            self._dirty.add(field)
+
+    def __repr__(self) -> str:
+        return f"TripState(v{self.version}, {self.as_dict()})"
+
+    # --- Loading and saving ---
+
+    @classmethod
+    def from_state(cls, state: Mapping[str, Any]) -> "TripState":
+        trip = cls(**{field: state.get(field) for field in FIELDS})
+        object.__setattr__(trip, "version", int(state.get(VERSION_KEY) or 0))
+        return trip
+
+    def update(self, values: Mapping[str, Any]) -> None:
+        for field, value in values.items():
+            if field in FIELDS:
+                setattr(self, field, value)
+
+    def clear_trip(self) -> None:
+        """Forgets the trip; the signed-in user stays."""
+        for field in TRIP_FIELDS:
+            setattr(self, field, None)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def delta(self) -> Dict[str, Any]:
+        """
+        The changed fields (in layout order, cleared ones as CLEARED) and the next
+        version, or {} if nothing changed.
+        """
+        if not self._dirty:
+            return {}
+        changes = {field: CLEARED if getattr(self, field) is None else getattr(self, field)
+                   for field in FIELDS if field in self._dirty}
+        changes[VERSION_KEY] = self.version + 1
+        return changes
+
+    def commit(self, state: MutableMapping[str, Any]) -> Dict[str, Any]:
+        """Writes the delta into `state`, marks everything clean and returns what was written."""
+        changes = self.delta()
+        for key, value in changes.items():
+            if value == CLEARED and hasattr(state, "__delitem__"):
+                state.pop(key, None)
+            else:
+                state[key] = value
+        if changes:
+            object.__setattr__(self, "version", changes[VERSION_KEY])
+            self._dirty.clear()
+        return changes
+
+    # --- Representations ---
+
+    def as_dict(self, fields=FIELDS) -> Dict[str, Any]:
+        """The fields that are set."""
+        return {field: getattr(self, field) for field in fields if getattr(self, field) is not None}
+
+    def to_compact(self) -> str:
+        """[layout, version, value per field...] as JSON, trailing unset fields dropped."""
+        values: List[Any] = [getattr(self, field) for field in FIELDS]
+        while values and values[-1] is None:
+            values.pop()
+        return json.dumps([COMPACT_LAYOUT, self.version] + values, separators=(",", ":"), ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_compact(cls, data: str) -> "TripState":
+        layout, version, *values = json.loads(data)
+        if layout != COMPACT_LAYOUT:
+            raise ValueError(f"Unknown trip state layout {layout}")
+        trip = cls(**dict(zip(FIELDS, values)))
+        object.__setattr__(trip, "version", version)
+        return trip
@@ -0,0 +1,189 @@
+# File: weather_cache.py
+# Forecast cache in front of the weather_details AgentTool. Weather questions are
+# our slowest path (gemini-2.5-pro + google_search), and the same city/day gets
+# asked again and again, so answers are cached per (location, date window, start
+# date). The start date is the calendar day the window resolves to, so a cached
+# "tomorrow" is never served for the wrong day after midnight.
+# A pluggable local provider lets tests and benchmarks run without the network.
+
+import abc
+import datetime
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.tools import agent_tool
+from google.adk.tools.tool_context import ToolContext
+
+from catalog_cache import TTLCache
+from metrics import get_logger
+
+log = get_logger("weather")
+
+FORECAST_TABLE = "forecasts"
+# WEATHER_CACHE_TTL_SECONDS  how long a forecast is reused (default 3 hours)
+# WEATHER_FORECAST_FILE      JSON file for the local stand-in provider
+forecast_cache = TTLCache(
+    max_entries=int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", "256")),
+    ttls={FORECAST_TABLE: float(os.environ.get("WEATHER_CACHE_TTL_SECONDS", str(3 * 3600)))},
+)
+
+LOCATION = re.compile(
+    r"\b(?:in|at|for|of)\s+([a-z][a-z .'-]*?)"
+    r"(?=\s+(?:for|on|this|next|today|tomorrow|tonight|right|now|currently|over|during|around|in)\b|[?.!,]|$)"
+)
+WINDOWS = (
+    (re.compile(r"\btoday\b|\bright now\b|\bcurrent(ly)?\b"), "today"),
+    (re.compile(r"\btomorrow\b"), "tomorrow"),
+    (re.compile(r"\b(this )?weekend\b"), "weekend"),
+    (re.compile(r"\bnext week\b"), "next week"),
+    (re.compile(r"\bthis week\b"), "this week"),
+)
+NEXT_DAYS = re.compile(r"\bnext (\d+) days?\b")
+NOT_PLACES = {"weather", "forecast", "the weather", "the forecast", "temperature", "the next", "next"}
+# What the weather agent (or AgentTool around it) says when it has no forecast:
+# "Error running sub-agent: ...", a model error message, or an apology. None of
+# these may be cached for hours.
+NO_FORECAST = re.compile(
+    r"^\s*error\b|\b(could ?n[o']t|unable to|can ?n[o']t|not able to|failed to|sorry|unavailable"
+    r"|no (weather|forecast) (data|information|results))\b",
+    re.IGNORECASE,
+)
+
+
+def is_forecast(result: Any) -> bool:
+    """True if the weather agent's output is an actual forecast, worth caching."""
+    if isinstance(result, dict):
+        return result.get("status", "success") == "success" and not result.get("error_message")
+    return isinstance(result, str) and bool(result.strip()) and not NO_FORECAST.search(result)
+
+
+def window_start(window: str, today: Optional[datetime.date] = None) -> datetime.date:
+    """The calendar date a relative window ("tomorrow", "weekend", ...) starts on."""
+    today = today or datetime.date.today()
+    if window == "tomorrow":
+        return today + datetime.timedelta(days=1)
+    if window == "weekend":
+        # Saturday, or today if the weekend has already started.
+        return today + datetime.timedelta(days=max(0, 5 - today.weekday()))
+    if window == "next week":
+        return today + datetime.timedelta(days=7 - today.weekday())
+    return today
+
+
+def forecast_key(request: str, today: Optional[datetime.date] = None) -> Tuple[str, str, str]:
+    """
+    Normalizes a weather request to (location, window, start date), e.g.
+    "Weather forecast in Manali for the next 3 days" -> ("manali", "next 3 days", "2025-06-01").
+    """
+    text = " ".join((request or "").lower().split())
+    location = ""
+    for match in LOCATION.finditer(text):
+        candidate = match.group(1).strip(" .'-")
+        if candidate and candidate not in NOT_PLACES and not candidate.startswith("the next"):
+            location = candidate
+            break
+    days = NEXT_DAYS.search(text)
+    if days:
+        window = f"next {days.group(1)} days"
+    else:
+        window = next((label for pattern, label in WINDOWS if pattern.search(text)), "next 3 days")
+    # If no place could be parsed, fall back to the whole request so unrelated
+    # questions never share an entry.
+    return (location or text, window, window_start(window, today).isoformat())
+
+
+class ForecastProvider(abc.ABC):
+    """Interface for a local forecast source. Return None to fall through to the weather agent."""
+
+    @abc.abstractmethod
+    def get_forecast(self, location: str, window: str) -> Optional[str]:
+        ...
+
+
+class FileForecastProvider(ForecastProvider):
+    """
+    Reads forecasts from a JSON file shaped like
+    {"manali": {"next 3 days": "Sunny, 12-18°C", "default": "..."}}.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self._data: Dict[str, Dict[str, str]] = {k.lower(): v for k, v in json.load(f).items()}
+
+    def get_forecast(self, location: str, window: str) -> Optional[str]:
+        by_window = self._data.get(location)
+        if not by_window:
+            return None
+        return by_window.get(window) or by_window.get("default")
+
+
+_provider: Optional[ForecastProvider] = None
+_provider_loaded = False
+_counter_lock = threading.Lock()
+_counters = {"requests": 0, "cache_hits": 0, "provider_answers": 0, "agent_calls": 0, "agent_failures": 0}
+
+
+def set_forecast_provider(provider: Optional[ForecastProvider]) -> None:
+    global _provider, _provider_loaded
+    _provider, _provider_loaded = provider, True
+
+
+def get_forecast_provider() -> Optional[ForecastProvider]:
+    global _provider, _provider_loaded
+    if not _provider_loaded:
+        path = os.environ.get("WEATHER_FORECAST_FILE")
+        _provider = FileForecastProvider(path) if path else None
+        _provider_loaded = True
+    return _provider
+
+
+def _count(name: str) -> None:
+    with _counter_lock:
+        _counters[name] += 1
+
+
+def weather_cache_stats() -> Dict[str, Any]:
+    with _counter_lock:
+        stats = dict(_counters)
+    stats["hit_rate"] = round(stats["cache_hits"] / stats["requests"], 3) if stats["requests"] else 0.0
+    stats["cache"] = forecast_cache.stats()
+    return stats
+
+
+class CachedWeatherTool(agent_tool.AgentTool):
+    """
+    Drop-in replacement for AgentTool(agent=weather_details). Serves cached or
+    locally provided forecasts and only runs the weather agent on a miss. Only
+    real forecasts are cached; errors and "couldn't find it" answers are passed
+    through and asked again next time.
+    """
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        request = args.get("request") or " ".join(str(v) for v in args.values())
+        key = forecast_key(request)
+        _count("requests")
+
+        found, forecast = forecast_cache.get(FORECAST_TABLE, key)
+        if found:
+            _count("cache_hits")
+            log.info(f"WEATHER CACHE: hit for {key}")
+            return forecast
+
+        provider = get_forecast_provider()
+        location, window, _ = key
+        forecast = provider.get_forecast(location, window) if provider else None
+        if forecast is not None:
+            _count("provider_answers")
+        else:
+            _count("agent_calls")
+            forecast = await super().run_async(args=args, tool_context=tool_context)
+
+        if is_forecast(forecast):
+            forecast_cache.put(FORECAST_TABLE, key, forecast)
+        else:
+            _count("agent_failures")
+            log.info(f"WEATHER CACHE: not caching a failed forecast for {key}")
+        return forecast
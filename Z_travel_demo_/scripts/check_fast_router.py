@@ -0,0 +1,61 @@
+# File: scripts/check_fast_router.py
+# Routing checks for the keyword pre-router: the orchestrator's seed phrases
+# must be short-circuited to their specialist, and choices between offered
+# options, mixed requests and bare keywords with no request must be left to the
+# LLM router. Exits 1 when any case fails.
+#
+#   python scripts/check_fast_router.py
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "ManagerAgent"))
+
+from fast_router import KeywordRouter, PLANNING_AGENT, INFO_AGENT, CONFIRMATION_AGENT, GREETING  # noqa: E402
+
+# message -> route taken without the orchestrator (None: ask the LLM)
+CASES = {
+    # Seed phrases from orchestrator_agent's instruction.
+    "book it": CONFIRMATION_AGENT,
+    "confirm that": CONFIRMATION_AGENT,
+    "yes, book it": CONFIRMATION_AGENT,
+    "go ahead and finalize": CONFIRMATION_AGENT,
+    "emergency numbers": INFO_AGENT,
+    "weather": INFO_AGENT,
+    "what is the weather in Jaipur tomorrow": INFO_AGENT,
+    "tell me about Goa": INFO_AGENT,
+    "hotels in udaipur": PLANNING_AGENT,
+    "find a hotel": PLANNING_AGENT,
+    "show me trains": PLANNING_AGENT,
+    "plan a trip to Goa": PLANNING_AGENT,
+    "Goa for 3 days, mid-range": PLANNING_AGENT,
+    "hi": GREETING,
+    "thanks": GREETING,
+    # Choosing between offered options needs the conversation.
+    "book the second hotel": None,
+    "confirm the train": None,
+    "pick option 2": None,
+    "go with the cheaper one": None,
+    # Several specialists, or nothing to go on.
+    "book it and tell me the weather": None,
+    "find a hotel and tell me the weather": None,
+    "20000": None,
+}
+
+
+def main() -> int:
+    router = KeywordRouter()
+    failures = []
+    for message, expected in CASES.items():
+        got = router.route(message).route
+        if got != expected:
+            failures.append(f"{message!r}: routed to {got}, expected {expected}")
+    for failure in failures:
+        print("FAIL " + failure)
+    print(f"{len(CASES) - len(failures)}/{len(CASES)} phrasings OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
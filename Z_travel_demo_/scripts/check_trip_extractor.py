@@ -0,0 +1,75 @@
+# File: scripts/check_trip_extractor.py
+# Phrasing checks for the rule-based trip extractor: which city a message names
+# as the origin and which as the destination, how dates are read, and that
+# informational questions never write trip state. Uses a fixed location list,
+# so it needs no database. Exits 1 when any case fails.
+#
+#   python scripts/check_trip_extractor.py
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "ManagerAgent"))
+
+from trip_extractor import extract_trip_parameters, prefill_turn, _is_details_only  # noqa: E402
+
+LOCATIONS = {"jaipur": "Jaipur", "delhi": "Delhi", "new delhi": "Delhi", "mumbai": "Mumbai", "goa": "Goa", "udaipur": "Udaipur"}
+
+# message -> (origin, destination)
+CASES = {
+    "Jaipur to Delhi": ("Jaipur", "Delhi"),
+    "Mumbai to Goa for 3 days": ("Mumbai", "Goa"),
+    "from Mumbai to Goa": ("Mumbai", "Goa"),
+    "I want to go to Goa from Mumbai": ("Mumbai", "Goa"),
+    "visit Udaipur from New Delhi": ("Delhi", "Udaipur"),
+    "hotels in Udaipur": (None, "Udaipur"),
+    "trains from Delhi": ("Delhi", None),
+    "Mumbai or Goa, not sure yet": (None, None),
+}
+
+# message -> travel_date
+DATES = {
+    "Delhi to Jaipur on 12 March 2025": "12 march 2025",
+    "Goa on march 12, 2025": "march 12, 2025",
+    "Goa on 2025-03-12": "2025-03-12",
+    "Goa on 12 march": "12 march",
+    "Goa tomorrow": "tomorrow",
+}
+
+# Questions for info_agent: no trip state written, no templated reply, and
+# never mistaken for a details-only message.
+INFO_TURNS = [
+    "tell me about Goa",
+    "what is the weather in Jaipur tomorrow",
+    "emergency numbers in Goa",
+]
+
+
+def main() -> int:
+    failures = []
+    for message, expected in CASES.items():
+        extracted = extract_trip_parameters(message, locations=LOCATIONS)
+        got = (extracted.get("origin"), extracted.get("destination"))
+        if got != expected:
+            failures.append(f"{message!r}: origin/destination {got}, expected {expected}")
+    for message, expected in DATES.items():
+        got = extract_trip_parameters(message, locations=LOCATIONS).get("travel_date")
+        if got != expected:
+            failures.append(f"{message!r}: travel_date {got!r}, expected {expected!r}")
+    for message in INFO_TURNS:
+        prefill = prefill_turn(message, {"destination": "Udaipur"})
+        if prefill.state_delta or prefill.reply:
+            failures.append(f"{message!r}: informational turn prefilled {prefill}")
+        if _is_details_only(message, extract_trip_parameters(message, locations=LOCATIONS)):
+            failures.append(f"{message!r}: treated as a details-only message")
+    for failure in failures:
+        print("FAIL " + failure)
+    total = len(CASES) + len(DATES) + 2 * len(INFO_TURNS)
+    print(f"{total - len(failures)}/{total} phrasings OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
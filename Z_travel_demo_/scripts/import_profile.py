@@ -0,0 +1,78 @@
+# File: scripts/import_profile.py
+# Measures what a cold worker pays to import root_agent. Runs a fresh interpreter
+# with `python -X importtime`, prints the slowest imports and fails (exit 1) when
+# the total is over budget, so a heavy import creeping back in shows up in CI.
+#
+#   python scripts/import_profile.py                 # report, 1500 ms budget
+#   python scripts/import_profile.py --budget-ms 800 --top 25
+#   IMPORT_BUDGET_MS=800 python scripts/import_profile.py
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, NamedTuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGET = "from ManagerAgent.agent import root_agent"
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def run_importtime(statement: str) -> List[ImportTiming]:
+    """Imports `statement` in a clean interpreter and parses its -X importtime report."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Importing failed: {statement}")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        # "import time:       123 |       4567 |   package.module"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
+
+
+def report(timings: List[ImportTiming], top: int) -> int:
+    """Prints the heaviest imports and returns the total import time in microseconds."""
+    # Top-level entries (depth 0) together account for the whole import.
+    total_us = sum(t.cumulative_us for t in timings if t.depth == 0)
+    print(f"Total import time: {total_us / 1000:.1f} ms across {len(timings)} modules\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        print(f"{t.cumulative_us / 1000:>14.1f} {t.self_us / 1000:>9.1f}  {'  ' * t.depth}{t.module}")
+    return total_us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile the import time of root_agent.")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="import statement to profile")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15, help="how many imports to list")
+    args = parser.parse_args()
+
+    total_us = report(run_importtime(args.target), args.top)
+    total_ms = total_us / 1000
+    if total_ms > args.budget_ms:
+        print(f"\nOVER BUDGET: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    print(f"\nWithin budget: {total_ms:.1f} ms <= {args.budget_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,619 @@
+# File: scripts/load_test.py
+# Capacity benchmark for the chatbot. Drives N concurrent scripted conversations
+# (the Readme's "hi -> auth -> Udaipur hotel -> pick -> confirm" flow) through a
+# ManagerAgent with the real sub-agents, tools and callbacks, but with:
+#   - ScriptedLlm, a deterministic stand-in model that emits the tool calls each
+#     agent is expected to make, after a configurable latency;
+#   - MemoryPostgrest, an in-memory stand-in for the Supabase tables that speaks
+#     the subset of the PostgREST query builder the tools use, after a
+#     configurable per-call latency (a blocking sleep, like a real round trip);
+#   - the SQLite booking backend for commit_booking.
+# For each concurrency level it reports turns/sec, p50/p95/p99 turn latency, DB
+# round trips per turn and event-loop lag. Results can be saved as a baseline;
+# later runs fail (exit 1) when they regress past the tolerance.
+#
+#   python scripts/load_test.py                         # 1, 10, 100, 1000 sessions
+#   python scripts/load_test.py --levels 1,50 --model-latency-ms 200
+#   python scripts/load_test.py --save-baseline         # record scripts/load_test_baseline.json
+#   LOAD_TEST_TOLERANCE=0.3 python scripts/load_test.py # compare with a 30% tolerance
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "scripts", "load_test_baseline.json")
+APP_NAME = "travelbot_load_test"
+
+# The run must not touch real services or background writers.
+os.environ["CATALOG_SNAPSHOT"] = "0"
+os.environ["WRITE_BEHIND"] = "0"
+os.environ.pop("BOOKING_SQLITE_PATH", None)
+sys.path.insert(0, PROJECT_ROOT)
+
+
+# --- Catalog fixture ---
+
+CITIES = ["Udaipur", "Jaipur", "Jodhpur", "Delhi", "Mumbai", "Goa", "Manali", "Shimla"]
+CATEGORIES = {"Budget": 1800, "Mid-Range": 5000, "Luxury": 14000}
+MODES = {"Train": (500, "6h"), "Bus": (350, "10h"), "Flight": (4200, "1h30m")}
+
+
+def _minutes(duration: str) -> int:
+    hours, minutes = re.search(r"(\d+)h", duration), re.search(r"(\d+)m", duration)
+    return int(hours.group(1) if hours else 0) * 60 + int(minutes.group(1) if minutes else 0)
+
+
+def build_catalog(seed: int = 7) -> Dict[str, List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    hotels, transport, attractions, details = [], [], [], []
+    for city in CITIES:
+        prefix = city[:3].upper()
+        for n, (category, price) in enumerate((c, p) for c, p in CATEGORIES.items() for _ in range(3)):
+            hotels.append({
+                "id": f"{prefix}{n + 1:02d}", "name": f"Hotel {city} {n + 1}", "location": city,
+                "category": category, "price_per_night": price + 100 * rng.randint(0, 20),
+                "rating": round(rng.uniform(3.5, 4.9), 1),
+            })
+        for n, kind in enumerate(("History", "Nature", "Food", "Culture")):
+            attractions.append({"id": f"{prefix}A{n}", "name": f"{city} {kind} Spot", "location": city,
+                                "type": kind, "summary": f"A well-known {kind.lower()} stop in {city}."})
+        details.append({"location": city, "description": f"{city} is a popular destination."})
+    for origin in CITIES:
+        for destination in CITIES:
+            if origin == destination:
+                continue
+            for mode, (price, duration) in MODES.items():
+                transport.append({
+                    "id": f"{mode[0]}{origin[:3].upper()}{destination[:3].upper()}", "provider": f"{origin}-{destination} {mode}",
+                    "mode": mode, "origin": origin, "destination": destination,
+                    "price": price + 50 * rng.randint(0, 10), "duration": duration,
+                    # Generated column from sql/transport_duration_minutes.sql.
+                    "duration_minutes": _minutes(duration),
+                    "departure_time": f"{rng.randint(5, 22):02d}:00",
+                })
+    return {
+        "hotels": hotels, "transport_options": transport, "attractions": attractions,
+        "destination_details": details,
+        "emergency_contacts": [
+            {"type": "Police", "number": "100", "description": "Police control room"},
+            {"type": "Ambulance", "number": "108", "description": "Emergency medical services"},
+        ],
+        "users": [], "bookings": [],
+    }
+
+
+# --- In-memory PostgREST stand-in ---
+
+def _parse_value(raw: str) -> Any:
+    raw = raw.strip()
+    if raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1]
+    try:
+        return float(raw) if "." in raw else int(raw)
+    except ValueError:
+        return raw
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+    return parts + [current] if current else parts
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if op == "is":
+        return left is None if str(right).lower() == "null" else left == right
+    if op == "ilike":
+        return bool(re.fullmatch(re.escape(str(right)).replace("%", ".*"), str(left or ""), re.IGNORECASE))
+    if left is None:
+        return False
+    if isinstance(left, (int, float)) and isinstance(right, str):
+        try:
+            right = float(right)
+        except ValueError:
+            return False
+    return {"eq": left == right, "neq": left != right, "gt": left > right, "gte": left >= right,
+            "lt": left < right, "lte": left <= right}[op]
+
+
+def _or_filter(expr: str) -> Callable[[Dict[str, Any]], bool]:
+    """A row predicate for a PostgREST or=(...) expression (supports nested and()/or())."""
+    clauses = []
+    for part in _split_top_level(expr):
+        part = part.strip()
+        for group in ("and", "or"):
+            if part.startswith(group + "(") and part.endswith(")"):
+                inner = [_or_filter(p) for p in _split_top_level(part[len(group) + 1:-1])]
+                combine = all if group == "and" else any
+                clauses.append(lambda row, inner=inner, combine=combine: combine(f(row) for f in inner))
+                break
+        else:
+            column, op, value = part.split(".", 2)
+            clauses.append(lambda row, c=column, o=op, v=_parse_value(value): _compare(o, row.get(c), v))
+    return lambda row: any(clause(row) for clause in clauses)
+
+
+class _Query:
+    def __init__(self, db: "MemoryPostgrest", table: str):
+        self._db, self._table = db, table
+        self._columns: Optional[List[str]] = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._orders: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._write: Optional[tuple] = None
+
+    # Reads
+    def select(self, columns: str = "*"):
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column, value): return self._where(lambda r: _compare("eq", r.get(column), value))
+    def neq(self, column, value): return self._where(lambda r: _compare("neq", r.get(column), value))
+    def gt(self, column, value): return self._where(lambda r: _compare("gt", r.get(column), value))
+    def gte(self, column, value): return self._where(lambda r: _compare("gte", r.get(column), value))
+    def lt(self, column, value): return self._where(lambda r: _compare("lt", r.get(column), value))
+    def lte(self, column, value): return self._where(lambda r: _compare("lte", r.get(column), value))
+    def is_(self, column, value): return self._where(lambda r: _compare("is", r.get(column), value))
+    def in_(self, column, values): return self._where(lambda r, v=set(values): r.get(column) in v)
+    def or_(self, expr): return self._where(_or_filter(expr))
+
+    def ilike(self, column, pattern):
+        regex = re.compile("^" + re.escape(pattern).replace("%", ".*") + "$", re.IGNORECASE)
+        return self._where(lambda r: bool(regex.match(str(r.get(column) or ""))))
+
+    def _where(self, predicate):
+        self._filters.append(predicate)
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        self._orders.append((column, desc, bool(nullsfirst)))
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def range(self, start, end):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def maybe_single(self):
+        self._single = True
+        return self
+
+    # Writes
+    def upsert(self, rows, on_conflict: str = "id", ignore_duplicates: bool = False):
+        self._write = ("upsert", rows if isinstance(rows, list) else [rows], on_conflict, ignore_duplicates)
+        return self
+
+    def insert(self, rows):
+        self._write = ("insert", rows if isinstance(rows, list) else [rows], None, False)
+        return self
+
+    def execute(self):
+        self._db._round_trip(self._table)
+        if self._write:
+            return SimpleNamespace(data=self._db._apply_write(self._table, *self._write))
+        rows = [r for r in self._db._rows(self._table) if all(f(r) for f in self._filters)]
+        for column, desc, nullsfirst in reversed(self._orders):
+            present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: r[column], reverse=desc)
+            missing = [r for r in rows if r.get(column) is None]
+            rows = missing + present if nullsfirst else present + missing
+        rows = rows[self._offset:self._offset + self._limit if self._limit is not None else None]
+        if self._columns:
+            rows = [{c: r.get(c) for c in self._columns} for r in rows]
+        if self._single:
+            # Like supabase-py, maybe_single() with no match gives no response at all.
+            return SimpleNamespace(data=rows[0]) if rows else None
+        return SimpleNamespace(data=rows)
+
+
+class MemoryPostgrest:
+    """
+    Thread-safe in-memory tables behind a supabase-py-like table() interface.
+    Bookings don't go through it: the harness installs the SQLite booking backend.
+    """
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]], latency: float = 0.0):
+        self._tables = {name: [dict(r) for r in rows] for name, rows in tables.items()}
+        self._latency = latency
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    def _round_trip(self, table: str) -> None:
+        with self._lock:
+            self.calls[table] = self.calls.get(table, 0) + 1
+        if self._latency:
+            time.sleep(self._latency)
+
+    def _rows(self, table: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._tables.get(table, []))
+
+    def _apply_write(self, table, op, rows, on_conflict, ignore_duplicates) -> List[Dict[str, Any]]:
+        with self._lock:
+            stored = self._tables.setdefault(table, [])
+            written = []
+            for row in rows:
+                existing = next((r for r in stored if on_conflict and r.get(on_conflict) == row.get(on_conflict)), None)
+                if existing is None:
+                    stored.append(dict(row))
+                    written.append(dict(row))
+                elif op == "upsert" and not ignore_duplicates:
+                    existing.update(row)
+                    written.append(dict(existing))
+            return written
+
+
+# --- Scripted model ---
+
+def _conversation(n: int) -> List[str]:
+    return [
+        "hi",
+        f"My full name is Lucky{n} and my phone number is 9{n:09d}",
+        "i want to book a hotel in Udaipur",
+        "20000",
+        "the first one please",
+        "confirm it",
+        "emergency numbers in Udaipur",
+    ]
+
+
+def _trip_details(text: str) -> Dict[str, str]:
+    """The store_trip_parameters arguments a planner would pull out of a scripted message."""
+    details = {}
+    city = next((c for c in CITIES if re.search(rf"\b{c.lower()}\b", text)), None)
+    if city:
+        details["destination"] = city
+    amount = re.search(r"\b\d{4,}\b", text)
+    if amount:
+        details["budget"] = amount.group(0)
+    return details
+
+
+def build_scripted_llm(latency: float):
+    from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+    from google.genai import types
+
+    def _text(content) -> str:
+        return " ".join(p.text for p in (content.parts or []) if p.text) if content else ""
+
+    def _call(tool_name: str, **args) -> "types.Part":
+        return types.Part(function_call=types.FunctionCall(name=tool_name, args=args))
+
+    class ScriptedLlm(BaseLlm):
+        """
+        Deterministic model: picks the tool call the agent is expected to make
+        from its available tools and the user's message, and answers with a short
+        text once the tool result is in.
+        """
+
+        @classmethod
+        def supported_models(cls) -> List[str]:
+            return [r"scripted-.*"]
+
+        async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+            if latency:
+                await asyncio.sleep(latency)
+            yield LlmResponse(content=types.Content(role="model", parts=[self._respond(llm_request)]))
+
+        def _respond(self, llm_request: LlmRequest) -> "types.Part":
+            contents = llm_request.contents or []
+            last = contents[-1] if contents else None
+            stored = False
+            if last and any(p.function_response for p in last.parts or []):
+                result = next(p.function_response for p in last.parts if p.function_response)
+                # Phase 1 done: carry on to the search, as the planner would.
+                stored = result.name == "store_trip_parameters" and (result.response or {}).get("status") == "success"
+                if not stored:
+                    return types.Part(text=f"Done ({result.name}): {json.dumps(result.response, default=str)[:200]}")
+
+            user_texts = [_text(c) for c in contents if c.role == "user" and _text(c) and not _text(c).startswith("For context:")]
+            text = (user_texts[-1] if user_texts else "").lower()
+            tools = set(llm_request.tools_dict)
+
+            if "process_and_authenticate_user" in tools:
+                match = re.search(r"name is (\w+).*?(?:number|contact|email) is (\S+)", text)
+                if match:
+                    return _call("process_and_authenticate_user", name=match.group(1).title(), contact=match.group(2))
+                return types.Part(text="Hello! Welcome to TravelBot. Could you please provide your full name and contact information?")
+            if "confirm_booking" in tools:
+                return _call("confirm_booking")
+            if "search_hotels" in tools:
+                details = _trip_details(text)
+                if details and not stored and "store_trip_parameters" in tools:
+                    return _call("store_trip_parameters", **details)
+                if "select_option" in tools and re.search(r"\b(first|second|third|cheapest|option|one)\b", text):
+                    kind = "transport" if re.search(r"\b(train|bus|flight)\b", text) else "hotel"
+                    return _call("select_option", kind=kind, choice=text)
+                if re.search(r"\bmore\b", text) and "more_transport_options" in tools:
+                    return _call("more_transport_options")
+                if re.search(r"\b(train|bus|flight|transport)\b", text):
+                    return _call("find_flights_trains_or_buses")
+                return _call("search_hotels")
+            if "get_emergency_contacts" in tools and "emergency" in text:
+                return _call("get_emergency_contacts")
+            if "get_destination_info" in tools:
+                return _call("get_destination_info")
+            if "transfer_to_agent" in tools:
+                if re.search(r"\b(confirm|book (it|that))\b", text):
+                    return _call("transfer_to_agent", agent_name="confirmation_agent")
+                if re.search(r"\b(weather|emergency|tell me about)\b", text):
+                    return _call("transfer_to_agent", agent_name="info_agent")
+                return _call("transfer_to_agent", agent_name="planning_and_booking_agent")
+            return types.Part(text="How can I help with your travel plans?")
+
+    return ScriptedLlm(model="scripted-v1")
+
+
+# --- Harness ---
+
+def build_root_agent(model_latency: float):
+    """A ManagerAgent over the real sub-agents with every LlmAgent switched to ScriptedLlm."""
+    from google.adk.agents import LlmAgent
+    from ManagerAgent.agent import ManagerAgent
+    from ManagerAgent.sub_agents.authenticator_agent.agent import authenticator_agent
+    from ManagerAgent.sub_agents.orchestrator_agent.agent import orchestrator_agent
+    from ManagerAgent.sub_agents.fallback_agent.agent import fallback_agent
+
+    llm = build_scripted_llm(model_latency)
+
+    def walk(agent):
+        yield agent
+        for sub in agent.sub_agents:
+            yield from walk(sub)
+
+    for top in (authenticator_agent, orchestrator_agent, fallback_agent):
+        for agent in walk(top):
+            if isinstance(agent, LlmAgent):
+                agent.model = llm
+    return ManagerAgent(
+        name="ManagerAgent",
+        authenticator_agent=authenticator_agent,
+        orchestrator_agent=orchestrator_agent,
+        fallback_agent=fallback_agent,
+    )
+
+
+def install_fakes(db_latency: float) -> MemoryPostgrest:
+    from supabase_client import set_supabase_client
+    from booking_commit import SqliteBookingBackend, set_booking_backend
+
+    catalog = build_catalog()
+    db = MemoryPostgrest(catalog, latency=db_latency)
+    set_supabase_client(db)
+    backend = SqliteBookingBackend()
+    backend.seed_catalog(catalog["hotels"], catalog["transport_options"])
+    set_booking_backend(backend)
+    return db
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task: lag = actual - requested sleep."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def _event_problem(event) -> Optional[str]:
+    """Why this event means the turn failed: the fallback agent answered, or the model/tool reported an error."""
+    if event.author == "fallback_agent":
+        return "fell back to fallback_agent"
+    if getattr(event, "error_code", None) or getattr(event, "error_message", None):
+        return f"{event.error_code}: {event.error_message}"
+    for response in event.get_function_responses() if event.content else []:
+        if response.name == "get_emergency_contacts" and not (response.response or {}).get("contacts"):
+            return "get_emergency_contacts returned no contacts"
+    return None
+
+
+def _booking_confirmed(event) -> bool:
+    for response in event.get_function_responses() if event.content else []:
+        if response.name == "confirm_booking" and (response.response or {}).get("status") == "success":
+            return True
+    return False
+
+
+async def run_level(root_agent, db: MemoryPostgrest, sessions: int, offset: int) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+    from catalog_cache import invalidate_catalog
+
+    invalidate_catalog()
+    service = InMemorySessionService()
+    runner = Runner(app_name=APP_NAME, agent=root_agent, session_service=service)
+    latencies: List[float] = []
+    errors = 0
+    booked = 0
+
+    async def conversation(n: int) -> None:
+        nonlocal errors, booked
+        user_id, session_id = f"user{n}", f"session{n}"
+        await service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        for text in _conversation(n):
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            started = time.perf_counter()
+            problem = None
+            try:
+                async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                    problem = problem or _event_problem(event)
+                    if _booking_confirmed(event):
+                        booked += 1
+            except Exception as e:
+                problem = f"raised {e!r}"
+            latencies.append(time.perf_counter() - started)
+            if problem:
+                errors += 1
+                print(f"  session {n}: turn '{text}' failed: {problem}", file=sys.stderr)
+
+    monitor = LoopLagMonitor()
+    calls_before = db.total_calls()
+    monitor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(offset + i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+
+    turns = len(latencies)
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "errors": errors,
+        "bookings": booked,
+        "seconds": round(elapsed, 3),
+        "turns_per_sec": round(turns / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_pct(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_pct(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_pct(latencies, 0.99) * 1000, 2),
+        "db_calls_per_turn": round((db.total_calls() - calls_before) / turns, 3) if turns else 0.0,
+        "loop_lag_p99_ms": round(_pct(monitor.samples, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(monitor.samples, default=0.0) * 1000, 2),
+    }
+
+
+# --- Baselines ---
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions against the baseline: throughput down, latency or lag up, or more DB calls."""
+    problems = []
+    for level, now in results.items():
+        before = baseline.get(level)
+        if not before:
+            continue
+        if now["turns_per_sec"] < before["turns_per_sec"] * (1 - tolerance):
+            problems.append(f"{level} sessions: {now['turns_per_sec']} turns/sec < baseline {before['turns_per_sec']}")
+        for key in ("p95_ms", "p99_ms", "loop_lag_p99_ms"):
+            # A few milliseconds of jitter is not a regression.
+            if now[key] > max(before[key] * (1 + tolerance), before[key] + 5):
+                problems.append(f"{level} sessions: {key} {now[key]} > baseline {before[key]}")
+        if now["db_calls_per_turn"] > before["db_calls_per_turn"] + 0.01:
+            problems.append(f"{level} sessions: {now['db_calls_per_turn']} DB calls/turn > baseline {before['db_calls_per_turn']}")
+        if now["errors"] > before.get("errors", 0):
+            problems.append(f"{level} sessions: {now['errors']} failed turns (baseline {before.get('errors', 0)})")
+    return problems
+
+
+async def main_async(args) -> int:
+    importlib.import_module("ManagerAgent")  # puts the shared helper modules on sys.path
+
+    db = install_fakes(args.db_latency_ms / 1000)
+    root_agent = build_root_agent(args.model_latency_ms / 1000)
+
+    # Warm-up: imports, tool declarations, the location index. It doubles as a
+    # smoke test: a script that never books measures only the error paths.
+    warmup = await run_level(root_agent, db, 1, offset=10 ** 7)
+    if warmup["errors"] or not warmup["bookings"]:
+        print(f"Warm-up conversation failed ({warmup['errors']} failed turns, {warmup['bookings']} bookings); "
+              "the scripted flow is broken, not measuring.", file=sys.stderr)
+        return 2
+
+    results: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    print(f"{'sessions':>8} {'turns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/turn':>8} {'lag p99':>8} {'lag max':>8} {'errors':>7} {'booked':>7}")
+    for level in args.levels:
+        r = await run_level(root_agent, db, level, offset)
+        offset += level
+        results[str(level)] = r
+        print(f"{level:>8} {r['turns_per_sec']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['db_calls_per_turn']:>8} {r['loop_lag_p99_ms']:>8} {r['loop_lag_max_ms']:>8} {r['errors']:>7} {r['bookings']:>7}")
+        if not r["bookings"]:
+            print(f"\nNo session reached confirm_booking at {level} sessions; the run is not measuring the booking flow.",
+                  file=sys.stderr)
+            return 2
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"settings": {"db_latency_ms": args.db_latency_ms, "model_latency_ms": args.model_latency_ms},
+                       "levels": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline yet; run with --save-baseline to record one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    settings = {"db_latency_ms": args.db_latency_ms, "model_latency_ms": args.model_latency_ms}
+    if baseline.get("settings") != settings:
+        print(f"\nBaseline was recorded with {baseline.get('settings')}; not comparing.")
+        return 0
+    problems = compare(results, baseline["levels"], args.tolerance)
+    if problems:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(problems))
+        return 1
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test ManagerAgent with a scripted model and in-memory tables.")
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 100, 1000],
+                        help="comma-separated concurrent session counts")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="simulated PostgREST round trip")
+    parser.add_argument("--model-latency-ms", type=float, default=50.0, help="simulated model response time")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=float(os.environ.get("LOAD_TEST_TOLERANCE", "0.2")))
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
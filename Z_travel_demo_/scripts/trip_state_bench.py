@@ -0,0 +1,131 @@
+# File: scripts/trip_state_bench.py
+# Compares how much session state the tools persist with loose keys (every tool
+# call writes every key it touches, as store_trip_parameters and the search tools
+# did) against TripState (only changed fields plus trip_version). It replays the
+# same scripted planning conversation in many sessions with their turns
+# interleaved, and reports the bytes written as state deltas, the time to
+# serialize them, and the size of a full-session record (loose dict JSON vs
+# TripState.to_compact()). Needs no database or model.
+#
+#   python scripts/trip_state_bench.py                  # 1000 sessions
+#   python scripts/trip_state_bench.py --sessions 10000 --repeat 5
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ManagerAgent"))
+
+from trip_state import TripState  # noqa: E402
+
+HOTELS = [{"id": f"UDA0{i}", "name": f"Hotel {i}", "price": 1800 + 900 * i} for i in range(3)]
+TRANSPORT = [{"id": f"TRN1{i}", "name": f"Express {i} (Train)", "price": 500 + 150 * i} for i in range(5)]
+
+
+def conversation(rng: random.Random) -> List[Dict[str, Any]]:
+    """What the tools write on each turn of one planning conversation."""
+    trip = {"destination": rng.choice(["Udaipur", "Jaipur", "Goa", "Manali"]), "duration_days": rng.randint(2, 7)}
+    turns = [dict(trip)]
+    trip.update({"origin": "Delhi", "budget_level": "Mid-Range", "budget_amount": 25000})
+    # The model re-sends every known detail to store_trip_parameters.
+    turns.append(dict(trip))
+    turns.append({**trip, "hotel_shortlist": HOTELS, "selected_hotel_id": None, "pending_goal": None})
+    turns.append({"selected_hotel_id": HOTELS[1]["id"]})
+    turns.append({**trip, "transport_shortlist": TRANSPORT, "selected_transport_id": None, "transport_cursor": "eyJwYWdlIjoyfQ"})
+    turns.append({"interests": ["history", "food"], **trip})
+    turns.append({"calculated_budget_total": 21450.0})
+    turns.append({"selected_transport_id": TRANSPORT[0]["id"]})
+    return turns
+
+
+def loose_turn(state: Dict[str, Any], writes: Dict[str, Any]) -> Dict[str, Any]:
+    state.update(writes)
+    return dict(writes)
+
+
+def trip_state_turn(state: Dict[str, Any], writes: Dict[str, Any]) -> Dict[str, Any]:
+    trip = TripState.from_state(state)
+    trip.update(writes)
+    return trip.commit(state)
+
+
+def run(sessions: int, turn_fn: Callable, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    scripts = [conversation(rng) for _ in range(sessions)]
+    states: List[Dict[str, Any]] = [{} for _ in range(sessions)]
+    delta_bytes, apply_s, serialize_s = 0, 0.0, 0.0
+    # Interleave the sessions turn by turn, as concurrent users would.
+    for turn in range(max(len(s) for s in scripts)):
+        for i, script in enumerate(scripts):
+            if turn < len(script):
+                started = time.perf_counter()
+                delta = turn_fn(states[i], script[turn])
+                serializing = time.perf_counter()
+                if delta:
+                    delta_bytes += len(json.dumps(delta, separators=(",", ":")))
+                done = time.perf_counter()
+                apply_s += serializing - started
+                serialize_s += done - serializing
+    turns = sum(len(s) for s in scripts)
+    return {"states": states, "delta_bytes": delta_bytes, "apply_s": apply_s, "serialize_s": serialize_s,
+            "seconds": apply_s + serialize_s, "turns": turns}
+
+
+def record_sizes(states: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Bytes and serialize time of the full per-session record, both representations."""
+    started = time.perf_counter()
+    loose = sum(len(json.dumps({k: v for k, v in s.items() if v is not None}, separators=(",", ":"))) for s in states)
+    loose_s = time.perf_counter() - started
+    trips = [TripState.from_state(s) for s in states]
+    started = time.perf_counter()
+    compact = sum(len(t.to_compact()) for t in trips)
+    compact_s = time.perf_counter() - started
+
+    tracemalloc.start()
+    held = [dict(s) for s in states]
+    loose_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    held = [TripState.from_state(s) for s in states]
+    slots_mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return {"loose": loose, "compact": compact, "loose_s": loose_s, "compact_s": compact_s,
+            "loose_mem": loose_mem, "slots_mem": slots_mem}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TripState deltas against loose state keys.")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in (("loose keys", loose_turn), ("TripState", trip_state_turn)):
+        runs = [run(args.sessions, fn, args.seed) for _ in range(args.repeat)]
+        results[name] = min(runs, key=lambda r: r["seconds"])
+
+    loose, typed = results["loose keys"], results["TripState"]
+    print(f"{args.sessions} sessions, {loose['turns']} turns\n")
+    print(f"{'':>12} {'delta KB':>10} {'B/turn':>8} {'serialize us/turn':>18} {'apply us/turn':>14}")
+    for name, r in results.items():
+        print(f"{name:>12} {r['delta_bytes'] / 1024:>10.1f} {r['delta_bytes'] / r['turns']:>8.0f} "
+              f"{r['serialize_s'] / r['turns'] * 1e6:>18.1f} {r['apply_s'] / r['turns'] * 1e6:>14.1f}")
+    print(f"\nDelta bytes saved: {1 - typed['delta_bytes'] / loose['delta_bytes']:.0%}")
+
+    sizes = record_sizes(typed["states"])
+    print(f"\nFull session record: dict JSON {sizes['loose'] / args.sessions:.0f} B in {sizes['loose_s'] * 1e3:.1f} ms, "
+          f"compact {sizes['compact'] / args.sessions:.0f} B in {sizes['compact_s'] * 1e3:.1f} ms")
+    print(f"In memory: dict {sizes['loose_mem'] / args.sessions:.0f} B/session, "
+          f"TripState {sizes['slots_mem'] / args.sessions:.0f} B/session")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
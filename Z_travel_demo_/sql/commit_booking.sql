@@ -0,0 +1,61 @@
+-- Idempotent, single-round-trip booking commit used by confirm_booking.
+-- Validates the hotel (and optional transport) IDs and inserts the booking in one
+-- call. Retries with the same idempotency key return the original booking instead
+-- of writing a new row. Run once in the Supabase SQL editor.
+
+alter table public.bookings
+    add column if not exists idempotency_key text;
+
+create unique index if not exists bookings_idempotency_key_key
+    on public.bookings (idempotency_key);
+
+create or replace function public.commit_booking(
+    p_idempotency_key text,
+    p_confirmation_number text,
+    p_user_contact text,
+    p_hotel_id text,
+    p_transport_id text default null
+) returns json
+language plpgsql
+as $$
+declare
+    v_hotel_name text;
+    v_transport_info text := 'Not included';
+    v_booking public.bookings%rowtype;
+    v_replayed boolean := false;
+begin
+    select name into v_hotel_name from public.hotels where id = p_hotel_id;
+    if v_hotel_name is null then
+        return json_build_object(
+            'status', 'error',
+            'error_message', format('Could not find the selected hotel with ID %s.', p_hotel_id));
+    end if;
+
+    if p_transport_id is not null then
+        select provider || ' (' || mode || ')' into v_transport_info
+        from public.transport_options where id = p_transport_id;
+        if v_transport_info is null then
+            return json_build_object(
+                'status', 'error',
+                'error_message', format('Could not find the selected transport with ID %s.', p_transport_id));
+        end if;
+    end if;
+
+    insert into public.bookings (idempotency_key, confirmation_number, user_contact, booked_hotel_id, booked_transport_id)
+    values (p_idempotency_key, p_confirmation_number, p_user_contact, p_hotel_id, p_transport_id)
+    on conflict (idempotency_key) do nothing
+    returning * into v_booking;
+
+    if v_booking.id is null then
+        select * into v_booking from public.bookings where idempotency_key = p_idempotency_key;
+        v_replayed := true;
+    end if;
+
+    return json_build_object(
+        'status', 'success',
+        'confirmation_number', v_booking.confirmation_number,
+        'hotel_name', v_hotel_name,
+        'transport_info', v_transport_info,
+        'replayed', v_replayed);
+end;
+$$;
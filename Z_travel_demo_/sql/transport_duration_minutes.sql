@@ -0,0 +1,15 @@
+-- "Fastest" transport needs a numeric sort key: duration is text like "6h" or
+-- "1h30m", which sorts lexically ("10h" before "6h"). This stored generated
+-- column holds the same duration in minutes; find_flights_trains_or_buses sorts
+-- and builds its keyset cursors on it. Run once in the Supabase SQL editor.
+
+alter table public.transport_options
+    add column if not exists duration_minutes integer generated always as (
+        case when duration ~ '\d' then
+            coalesce(substring(duration from '(\d+)\s*h')::integer, 0) * 60
+            + coalesce(substring(duration from '(\d+)\s*m')::integer, 0)
+        end
+    ) stored;
+
+create index if not exists transport_options_route_duration_idx
+    on public.transport_options (origin, destination, duration_minutes, id);
@@ -0,0 +1,4 @@
+-- Authentication upserts users with ON CONFLICT (contact) DO NOTHING, which needs
+-- contact to be unique. bookings.user_contact already references users(contact),
+-- so most schemas have this; the statement is a no-op if the index exists.
+create unique index if not exists users_contact_key on public.users (contact);
@@ -1,13 +1,109 @@
 # File: supabase_client.py
+import asyncio
+import contextvars
+import functools
+import logging
 import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+# supabase, httpx and dotenv are imported on first use, not at import time:
+# a cold worker shouldn't pay for them before it actually talks to the database.
+if TYPE_CHECKING:
+    import httpx
+    from supabase import Client
+
+log = logging.getLogger("travelbot.supabase")
 
 # This variable will hold our single, shared database connection.
 # The underscore indicates it's intended for internal use in this module.
-_supabase_client: Client = None
+_supabase_client: "Client" = None
+# The httpx pool behind it, so a reset can close its sockets instead of leaking them.
+_http_client: "httpx.Client" = None
+_client_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Loads the .env file once, the first time something needs configuration from it."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+# --- Connection policy (overridable through the .env file) ---
+# Read when the client is built, after load_dotenv() has run.
+def _setting(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+# SUPABASE_POOL_SIZE          max pooled keep-alive connections (default 10)
+# SUPABASE_KEEPALIVE_SECONDS  how long an idle connection stays open (default 60)
+# SUPABASE_CONNECT_TIMEOUT    TCP/TLS connect timeout in seconds (default 3)
+# SUPABASE_READ_TIMEOUT       per-request read timeout in seconds (default 10)
+# SUPABASE_MAX_FAILURES       consecutive failures before reconnecting (default 3)
+# SUPABASE_HEALTH_CHECK_SECONDS  min interval between health checks (default 30)
+
+_consecutive_failures = 0
+_failure_lock = threading.Lock()
+_last_health_check = 0.0
+
+# Bounded pool that async tools use to run blocking PostgREST calls off the
+# event loop. It is sized to the HTTP pool so threads never queue on sockets.
+_db_executor: ThreadPoolExecutor = None
+
+
+def _build_http_client() -> "httpx.Client":
+    """Creates the keep-alive HTTP pool shared by every PostgREST call."""
+    import httpx
+    pool_size = int(_setting("SUPABASE_POOL_SIZE", 10))
+    return httpx.Client(
+        http2=False,
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=_setting("SUPABASE_KEEPALIVE_SECONDS", 60),
+        ),
+        timeout=httpx.Timeout(
+            _setting("SUPABASE_READ_TIMEOUT", 10),
+            connect=_setting("SUPABASE_CONNECT_TIMEOUT", 3),
+        ),
+    )
+
+
+def _build_client(url: str, key: str) -> "Client":
+    global _http_client
+    from supabase import create_client, ClientOptions
+    read_timeout = _setting("SUPABASE_READ_TIMEOUT", 10)
+    http_client = _build_http_client()
+    try:
+        options = ClientOptions(
+            postgrest_client_timeout=read_timeout,
+            httpx_client=http_client,
+        )
+    except TypeError:
+        # Older supabase-py releases don't accept a custom httpx client;
+        # they still pool connections, we just can't size the pool.
+        http_client.close()
+        http_client = None
+        options = ClientOptions(postgrest_client_timeout=read_timeout)
+    client = create_client(url, key, options=options)
+    _http_client = http_client
+    return client
 
-def get_supabase_client() -> Client:
+
+def _close_http_client(http_client) -> None:
+    if http_client is None:
+        return
+    try:
+        http_client.close()
+    except Exception as e:
+        log.warning(f"Could not close the old Supabase HTTP pool: {e}")
+
+
+def get_supabase_client() -> "Client":
     """
     This is a "factory" function. It creates the Supabase client once
     and then returns the same instance on every subsequent call.
@@ -19,20 +115,152 @@ def get_supabase_client() -> Client:
     if _supabase_client:
         return _supabase_client
 
-    # --- First-time initialization ---
-    load_dotenv()
-    url: str = os.environ.get("SUPABASE_URL")
-    key: str = os.environ.get("SUPABASE_KEY")
+    with _client_lock:
+        # Another thread may have finished the setup while we waited.
+        if _supabase_client:
+            return _supabase_client
+
+        # --- First-time initialization ---
+        load_env()
+        url: str = os.environ.get("SUPABASE_URL")
+        key: str = os.environ.get("SUPABASE_KEY")
+
+        if not url or not key:
+            log.warning("⚠️ Supabase credentials not found in .env file. Database tools will fail.")
+            return None
+
+        try:
+            # Create the client and store it in our global variable for future use.
+            _supabase_client = _build_client(url, key)
+            log.info("✅ Successfully connected to Supabase.")
+            return _supabase_client
+        except Exception as e:
+            log.error(f"🔥 Failed to connect to Supabase: {e}")
+            return None
+
+
+def set_supabase_client(client) -> None:
+    """
+    Installs a client object in place of the real one (anything with the same
+    table()/rpc() query interface), e.g. an in-memory stand-in for benchmarks.
+    """
+    global _supabase_client, _http_client, _consecutive_failures
+    with _client_lock:
+        old_http, _http_client = _http_client, None
+        _supabase_client = client
+    with _failure_lock:
+        _consecutive_failures = 0
+    _close_http_client(old_http)
+
 
-    if not url or not key:
-        print("⚠️ Supabase credentials not found in .env file. Database tools will fail.")
-        return None
+def reset_supabase_client() -> None:
+    """
+    Drops the shared client so the next call to get_supabase_client() reconnects,
+    and closes the old client's connection pool.
+    """
+    global _supabase_client, _http_client, _consecutive_failures
+    with _client_lock:
+        old_http, _http_client = _http_client, None
+        _supabase_client = None
+    with _failure_lock:
+        _consecutive_failures = 0
+    _close_http_client(old_http)
+
+
+def report_supabase_success() -> None:
+    global _consecutive_failures
+    with _failure_lock:
+        _consecutive_failures = 0
+
+
+def is_api_error(error: Exception) -> bool:
+    """True if PostgREST answered with an error (as opposed to a network failure)."""
+    from postgrest.exceptions import APIError
+    return isinstance(error, APIError)
+
+
+def report_supabase_failure(error: Exception) -> None:
+    """
+    Tools call this from their error handlers. Once the failures pile up
+    the pooled client is discarded and rebuilt on the next request.
+    """
+    global _consecutive_failures
+    if getattr(error, "fail_fast", False):
+        # A read the circuit breaker refused or cut off; it tracks those itself.
+        return
+    if is_api_error(error):
+        # PostgREST answered (bad filter, no row for .single(), ...), so the
+        # connection itself is fine and there's nothing to reconnect.
+        return
+    with _failure_lock:
+        _consecutive_failures += 1
+        failures = _consecutive_failures
+        # Only the thread that crosses the limit reconnects.
+        reconnect = failures >= _setting("SUPABASE_MAX_FAILURES", 3)
+        if reconnect:
+            _consecutive_failures = 0
+    if reconnect:
+        log.info(f"🔁 {failures} consecutive Supabase failures (last: {error}). Reconnecting.")
+        reset_supabase_client()
+
+
+def check_supabase_health(force: bool = False) -> bool:
+    """
+    Runs a tiny query against the pool at most once per SUPABASE_HEALTH_CHECK_SECONDS.
+    A failed check resets the client so the next tool call gets a fresh connection.
+    """
+    global _last_health_check
+    now = time.monotonic()
+    if not force and now - _last_health_check < _setting("SUPABASE_HEALTH_CHECK_SECONDS", 30):
+        return _supabase_client is not None
+    _last_health_check = now
 
+    db = get_supabase_client()
+    if not db:
+        return False
     try:
-        # Create the client and store it in our global variable for future use.
-        _supabase_client = create_client(url, key)
-        print("✅ Successfully connected to Supabase.")
-        return _supabase_client
+        db.table('hotels').select('id').limit(1).execute()
+        report_supabase_success()
+        return True
     except Exception as e:
-        print(f"🔥 Failed to connect to Supabase: {e}")
-        return None
\ No newline at end of file
+        log.error(f"🔥 Supabase health check failed: {e}")
+        reset_supabase_client()
+        return False
+
+
+# --- Async offload ---
+
+def _get_db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        with _client_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(
+                    max_workers=int(_setting("SUPABASE_POOL_SIZE", 10)),
+                    thread_name_prefix="supabase-io",
+                )
+    return _db_executor
+
+
+async def run_db_call(fn, *args, **kwargs):
+    """
+    Runs a blocking database function on the bounded supabase-io pool and
+    awaits the result, so one slow query doesn't freeze other sessions.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    # Carry context variables (current tool, session, ...) into the worker thread.
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_get_db_executor(), ctx.run, call)
+
+
+def async_tool(fn):
+    """
+    Wraps a synchronous database tool into a coroutine function with the same
+    name, docstring and signature, so ADK registers it exactly like the
+    original but awaits it instead of blocking the event loop.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_db_call(fn, *args, **kwargs)
+    return wrapper